@@ -44,12 +44,28 @@ export default function IndexerForm({
         use_google_api: useGoogleApi
       })
 
-      // Poll for results
+      // Poll this job's counters, then page through its results once it is done
+      const jobId = response.data.job_id
+      const fetchAllResults = async () => {
+        const allResults: any[] = []
+        let cursor: number | null = 0
+        while (cursor !== null) {
+          const page: any = await axios.get(`${apiUrl}/api/jobs/${jobId}`, {
+            params: { cursor, limit: 5000 }
+          })
+          allResults.push(...page.data.results)
+          cursor = page.data.next_cursor
+        }
+        return allResults
+      }
+      
       const checkStatus = async () => {
-        const statusResponse = await axios.get(`${apiUrl}/api/status`)
+        const statusResponse = await axios.get(`${apiUrl}/api/jobs/${jobId}`, {
+          params: { limit: 0 }
+        })
         
-        if (statusResponse.data.status === 'complete') {
-          setResults(statusResponse.data.results)
+        if (statusResponse.data.status === 'complete' || statusResponse.data.status === 'cancelled') {
+          setResults(await fetchAllResults())
           setStats({
             total: statusResponse.data.total,
             successful: statusResponse.data.successful,
@@ -0,0 +1,194 @@
+"""
+Adaptive concurrency for Google Instant Indexer
+Per-host AIMD limits and retry backoff shared by every indexing method
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+# Responses that mean "slow down": retried, and they shrink the host's limit
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None,
+                  base: float = 0.5, cap: float = 30.0) -> float:
+    """
+    Full-jitter exponential backoff for retry number attempt (0-based)
+    A Retry-After from the server is a floor, never shortened
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class _HostState:
+    def __init__(self, limit: float, ssthresh: float):
+        self.limit = limit
+        self.ssthresh = ssthresh
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.successes = 0
+        self.throttled = 0
+        self.async_waiters: deque = deque()
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial_limit: int = 10, min_limit: int = 1, max_limit: int = 256,
+                 decrease_factor: float = 0.5, cooldown: float = 1.0, max_block: float = 60.0):
+        """
+        Initialize the limiter
+
+        Args:
+            initial_limit: Concurrent requests allowed to a host it has not seen yet
+            min_limit: Floor the limit never drops below
+            max_limit: Ceiling the limit never grows past
+            decrease_factor: Multiplier applied to the limit on throttling
+            cooldown: Seconds after a decrease during which further throttles
+                      do not shrink the limit again (one cut per burst)
+            max_block: Longest Retry-After honoured by pausing the whole host
+        """
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.max_block = max_block
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._hosts: Dict[str, _HostState] = {}
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            # Slow start: grow by one per success until the first throttle
+            state = _HostState(float(max(self.min_limit, min(self.initial_limit, self.max_limit))),
+                               float(self.max_limit))
+            self._hosts[host] = state
+        return state
+
+    def _try_acquire(self, state: _HostState) -> Optional[float]:
+        """Take a slot; returns None on success, else seconds worth waiting"""
+        now = time.time()
+        if state.blocked_until > now:
+            return state.blocked_until - now
+        if state.in_flight < int(state.limit):
+            state.in_flight += 1
+            return None
+        return 1.0
+
+    def acquire(self, host: str):
+        """Block until host has a free slot"""
+        with self._cond:
+            state = self._state(host)
+            while True:
+                wait = self._try_acquire(state)
+                if wait is None:
+                    return
+                self._cond.wait(wait)
+
+    async def acquire_async(self, host: str):
+        """Wait without blocking the event loop until host has a free slot"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                state = self._state(host)
+                wait = self._try_acquire(state)
+                if wait is None:
+                    return
+                waiter = loop.create_future()
+                state.async_waiters.append((loop, waiter))
+            try:
+                # The timeout covers Retry-After pauses and wake-ups lost to cancelled waiters
+                await asyncio.wait_for(waiter, timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def _wake(self, state: _HostState):
+        self._cond.notify_all()
+        free = int(state.limit) - state.in_flight
+        while free > 0 and state.async_waiters:
+            loop, waiter = state.async_waiters.popleft()
+            if waiter.done():
+                continue
+            loop.call_soon_threadsafe(_resolve, waiter)
+            free -= 1
+
+    def release(self, host: str, throttled: bool = False, retry_after: Optional[float] = None,
+                adapt: bool = True):
+        """
+        Give a slot back and adapt the host's limit to the outcome
+        Success grows the limit (additively once past slow start);
+        throttling cuts it multiplicatively and honours Retry-After.
+        adapt=False (e.g. a connection error) leaves the limit alone
+        """
+        with self._lock:
+            state = self._state(host)
+            state.in_flight = max(0, state.in_flight - 1)
+            now = time.time()
+            if adapt and throttled:
+                state.throttled += 1
+                if now - state.last_decrease >= self.cooldown:
+                    state.limit = max(float(self.min_limit), state.limit * self.decrease_factor)
+                    state.ssthresh = state.limit
+                    state.last_decrease = now
+                if retry_after:
+                    state.blocked_until = max(state.blocked_until, now + min(retry_after, self.max_block))
+            elif adapt:
+                state.successes += 1
+                if state.limit < state.ssthresh:
+                    state.limit = min(state.limit + 1, state.ssthresh)
+                else:
+                    state.limit += 1 / state.limit
+                state.limit = min(state.limit, float(self.max_limit))
+            self._wake(state)
+
+    def limit(self, host: str) -> int:
+        with self._lock:
+            return int(self._state(host).limit)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Current limit and counters per host"""
+        with self._lock:
+            now = time.time()
+            return {
+                host: {
+                    "limit": int(state.limit),
+                    "in_flight": state.in_flight,
+                    "successes": state.successes,
+                    "throttled": state.throttled,
+                    "paused_for": round(max(0.0, state.blocked_until - now), 1)
+                }
+                for host, state in self._hosts.items()
+            }
+
+
+def _resolve(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
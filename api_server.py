@@ -1,18 +1,33 @@
 """
 FastAPI Backend for Google Instant Indexer
 Handles API requests from Next.js frontend
+
+Nothing blocks the event loop: status checks use the async client on one
+shared session, and blocking work (building an indexer, deduping and
+queueing URLs, SQLite and file access) runs on a thread pool
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Callable, List, Optional
+import aiohttp
+import asyncio
+import concurrent.futures
+import json
 import sys
 import os
+from urllib.parse import urlparse
 
 # Add parent directory to path to import google_indexer
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from google_indexer import GoogleInstantIndexer
+from job_manager import JobManager
+from job_queue import SQLiteJobQueue
+import metrics
+from url_normalizer import dedupe_urls
+from result_sink import NDJSONResultSink
 
 app = FastAPI(title="Google Instant Indexer API")
 
@@ -27,8 +42,48 @@ app.add_middleware(
 
 # Global state
 indexer = None
-indexing_in_progress = False
-last_results = []
+job_manager = None
+# Session shared by every status check (created on startup, inside the loop)
+http_session: Optional[aiohttp.ClientSession] = None
+
+# Threads for blocking work handed off by the endpoints (asyncio.to_thread)
+API_THREADS = int(os.environ.get("INDEXER_API_THREADS", "32"))
+
+# Job scheduling
+JOB_WORKERS = int(os.environ.get("INDEXER_JOB_WORKERS", "4"))
+JOB_CHUNK_SIZE = int(os.environ.get("INDEXER_JOB_CHUNK_SIZE", "500"))
+# Shared SQLite job queue: when set, this server only enqueues jobs and
+# worker.py processes run them, so any number of server workers agree on status
+QUEUE_DB = os.environ.get("INDEXER_QUEUE_DB")
+# Jobs checkpoint their URLs and results here so POST /api/jobs/{id}/resume
+# can finish them after a restart ("" turns checkpoints off)
+CHECKPOINT_DIR = os.environ.get("INDEXER_CHECKPOINT_DIR", "checkpoints")
+
+# Result pagination and event streaming
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+EVENTS_POLL_INTERVAL = 0.5
+
+# Bulk index status checks
+MAX_CHECK_URLS = 1000
+
+# Invalid URLs listed back in an /api/index response
+MAX_INVALID_REPORTED = 100
+
+# Optional NDJSON log of every result (e.g. results.ndjson.gz), rotated by size
+RESULTS_FILE = os.environ.get("INDEXER_RESULTS_FILE")
+RESULTS_MAX_BYTES = int(os.environ.get("INDEXER_RESULTS_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Optional JSON overrides for the indexer's endpoints (see DEFAULT_ENDPOINTS)
+ENDPOINTS = json.loads(os.environ["INDEXER_ENDPOINTS"]) if os.environ.get("INDEXER_ENDPOINTS") else None
+
+# IndexNow key (also served at https://<host>/<key>.txt); unset disables IndexNow
+INDEXNOW_KEY = os.environ.get("INDEXER_INDEXNOW_KEY") or None
+
+# Batch sitemaps: written to SITEMAP_DIR, pinged once per host when
+# SITEMAP_BASE_URL is the public URL serving that directory (else per-URL pings)
+SITEMAP_DIR = os.environ.get("INDEXER_SITEMAP_DIR", "sitemaps")
+SITEMAP_BASE_URL = os.environ.get("INDEXER_SITEMAP_BASE_URL") or None
 
 # Models
 class IndexRequest(BaseModel):
@@ -40,13 +95,53 @@ class ConfigRequest(BaseModel):
     use_google_api: bool = False
     service_account_file: Optional[str] = None
 
+class CheckRequest(BaseModel):
+    urls: List[str]
+    force: bool = False
+
+def new_indexer(service_account_file: Optional[str] = None) -> GoogleInstantIndexer:
+    """Build an indexer (loads credentials; call it off the event loop)"""
+    return GoogleInstantIndexer(service_account_file=service_account_file, endpoints=ENDPOINTS,
+                                indexnow_key=INDEXNOW_KEY,
+                                sitemap_dir=SITEMAP_DIR, sitemap_base_url=SITEMAP_BASE_URL)
+
+def new_job_manager():
+    if QUEUE_DB:
+        return SQLiteJobQueue(QUEUE_DB, batch_size=JOB_CHUNK_SIZE)
+    sink = NDJSONResultSink(RESULTS_FILE, max_bytes=RESULTS_MAX_BYTES) if RESULTS_FILE else None
+    return JobManager(run_job_chunk, workers=JOB_WORKERS, chunk_size=JOB_CHUNK_SIZE, sink=sink,
+                      checkpoint_dir=CHECKPOINT_DIR or None)
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize indexer on startup"""
-    global indexer
-    indexer = GoogleInstantIndexer()
+    global indexer, job_manager, http_session
+    # The default pool is sized by CPU count (5 threads on one core), too few for file and SQLite waits
+    asyncio.get_running_loop().set_default_executor(
+        concurrent.futures.ThreadPoolExecutor(max_workers=API_THREADS, thread_name_prefix="api")
+    )
+    indexer = await asyncio.to_thread(new_indexer)
+    job_manager = await asyncio.to_thread(new_job_manager)
+    http_session = indexer.transport.async_session()
     print("✓ Google Indexer API started successfully")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    if job_manager:
+        await asyncio.to_thread(job_manager.shutdown)
+    if http_session:
+        await http_session.close()
+
+def run_job_chunk(urls: List[str], on_result: Callable[[dict], None]):
+    """Index one chunk of a job; each worker thread drives its own event loop"""
+    asyncio.run(indexer.rapid_index_bulk_async(urls, on_result=on_result))
+
+async def get_job_or_404(job_id: str):
+    job = await asyncio.to_thread(job_manager.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -72,9 +167,9 @@ async def configure(config: ConfigRequest):
     
     try:
         if config.use_google_api and config.service_account_file:
-            indexer = GoogleInstantIndexer(service_account_file=config.service_account_file)
+            indexer = await asyncio.to_thread(new_indexer, config.service_account_file)
         else:
-            indexer = GoogleInstantIndexer()
+            indexer = await asyncio.to_thread(new_indexer)
         
         return {
             "status": "success",
@@ -85,81 +180,139 @@ async def configure(config: ConfigRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/index")
-async def index_urls(request: IndexRequest, background_tasks: BackgroundTasks):
-    """Start indexing URLs"""
-    global indexing_in_progress, last_results
-    
-    if indexing_in_progress:
-        raise HTTPException(
-            status_code=400, 
-            detail="Indexing already in progress"
-        )
-    
+async def index_urls(request: IndexRequest):
+    """Queue a job to index URLs"""
+    global indexer
     if not request.urls:
         raise HTTPException(
             status_code=400,
             detail="No URLs provided"
         )
     
-    # Update indexer if Google API requested
-    if request.use_google_api and request.service_account_file:
+    # Update indexer if Google API requested with different credentials
+    if (request.use_google_api and request.service_account_file and
+            (indexer.indexing_service is None or indexer.service_account_file != request.service_account_file)):
         try:
-            global indexer
-            indexer = GoogleInstantIndexer(service_account_file=request.service_account_file)
+            indexer = await asyncio.to_thread(new_indexer, request.service_account_file)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to initialize Google API: {str(e)}"
             )
     
-    # Start indexing in background
-    def index_task():
-        global indexing_in_progress, last_results
-        indexing_in_progress = True
-        
-        try:
-            results = indexer.rapid_index_bulk(request.urls, max_workers=10)
-            last_results = results
-        except Exception as e:
-            last_results = [{"error": str(e)}]
-        finally:
-            indexing_in_progress = False
-    
-    background_tasks.add_task(index_task)
-    
+    job, urls, invalid = await asyncio.to_thread(queue_job, request)
     return {
         "status": "success",
-        "message": f"Started indexing {len(request.urls)} URLs",
-        "url_count": len(request.urls)
+        "message": f"Queued {len(urls)} URLs for indexing",
+        "job_id": job.id,
+        "url_count": len(urls),
+        "duplicates": len(request.urls) - len(urls) - len(invalid),
+        "invalid": invalid[:MAX_INVALID_REPORTED],
+        "invalid_count": len(invalid)
     }
 
-@app.get("/api/status")
-async def get_status():
-    """Get current indexing status"""
-    global indexing_in_progress, last_results
-    
-    if indexing_in_progress:
-        return {
-            "status": "indexing",
-            "in_progress": True,
-            "message": "Indexing in progress..."
-        }
-    
-    if last_results:
-        successful = sum(
-            1 for r in last_results 
-            if r.get('status') == 'success' or 
-            any(m.get('status') == 'success' for m in r.get('methods_used', []))
+def queue_job(request: IndexRequest):
+    """
+    Dedupe the request's URLs and submit them as a job (CPU and disk bound)
+    Returns: (job, URLs queued, invalid URLs)
+    """
+    # Variants of one page (case, ports, fragments, tracking params) are submitted once
+    urls, invalid = dedupe_urls(request.urls)
+    if not urls:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No valid URLs provided ({invalid[0]['error']})"
         )
-        
-        return {
-            "status": "complete",
-            "in_progress": False,
-            "total": len(last_results),
-            "successful": successful,
-            "failed": len(last_results) - successful,
-            "results": last_results
-        }
+    if QUEUE_DB:
+        # Queue workers build their own indexer from the job's options
+        google_file = request.service_account_file if request.use_google_api else None
+        return job_manager.submit(urls, options={"service_account_file": google_file}), urls, invalid
+    return job_manager.submit(urls), urls, invalid
+
+def job_status(job, cursor: int, limit: int) -> dict:
+    """
+    Status body shared by /api/status and /api/jobs/{job_id}
+    Counters are kept up to date by the job; results come one page at a time
+    """
+    summary = job.summary()
+    results, next_cursor = job.results_page(cursor, limit)
+    page = {"results": results, "cursor": cursor, "next_cursor": next_cursor}
+    if summary["in_progress"]:
+        status = "queued" if job.status == "queued" else "indexing"
+        return dict(summary, status=status, message="Indexing in progress...", **page)
+    return dict(summary, status=job.status, total=summary["processed"], **page)
+
+def sse_event(event: str, data, event_id: Optional[int] = None) -> str:
+    lines = [f"event: {event}", f"data: {json.dumps(data, default=str)}"]
+    if event_id is not None:
+        lines.insert(0, f"id: {event_id}")
+    return "\n".join(lines) + "\n\n"
+
+async def job_event_stream(job, cursor: int):
+    """Push each new result as it lands, then a final summary"""
+    while True:
+        results, next_cursor = await asyncio.to_thread(job.results_page, cursor, DEFAULT_PAGE_SIZE)
+        for offset, result in enumerate(results, start=cursor):
+            # The event id is the cursor to resume from (Last-Event-ID)
+            yield sse_event("result", result, event_id=offset + 1)
+        if results:
+            cursor += len(results)
+            yield sse_event("progress", await asyncio.to_thread(job.summary))
+        if next_cursor is None:
+            yield sse_event("done", await asyncio.to_thread(job.summary))
+            return
+        if not results:
+            await asyncio.sleep(EVENTS_POLL_INTERVAL)
+
+@app.get("/api/jobs")
+async def list_jobs():
+    """List queued, running and recently finished jobs"""
+    def summaries():
+        return [job.summary() for job in job_manager.jobs()]
+    return {"jobs": await asyncio.to_thread(summaries)}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, cursor: int = Query(0, ge=0),
+                  limit: int = Query(DEFAULT_PAGE_SIZE, ge=0, le=MAX_PAGE_SIZE)):
+    """Get the status of one job and a page of its results"""
+    job = await get_job_or_404(job_id)
+    return await asyncio.to_thread(job_status, job, cursor, limit)
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, cursor: int = Query(0, ge=0),
+                            last_event_id: Optional[str] = Header(None)):
+    """Server-Sent Events: one event per completed URL, starting at cursor"""
+    job = await get_job_or_404(job_id)
+    if last_event_id and last_event_id.isdigit():
+        cursor = int(last_event_id)
+    return StreamingResponse(
+        job_event_stream(job, cursor),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/jobs/{job_id}/resume")
+async def resume_job(job_id: str):
+    """Continue an interrupted or cancelled job from its checkpoint"""
+    job = await asyncio.to_thread(job_manager.resume, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No job or checkpoint with that id")
+    return job.summary()
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a job; chunks already being indexed finish first"""
+    await get_job_or_404(job_id)
+    job = await asyncio.to_thread(job_manager.cancel, job_id)
+    return await asyncio.to_thread(job.summary)
+
+@app.get("/api/status")
+async def get_status(cursor: int = Query(0, ge=0),
+                     limit: int = Query(DEFAULT_PAGE_SIZE, ge=0, le=MAX_PAGE_SIZE)):
+    """Get the status of the most recent job"""
+    job = await asyncio.to_thread(job_manager.latest) if job_manager else None
+    if job is not None:
+        return await asyncio.to_thread(job_status, job, cursor, limit)
     
     return {
         "status": "idle",
@@ -167,43 +320,75 @@ async def get_status():
         "message": "No indexing activity"
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: request latency and outcomes per channel, quota and queue depth"""
+    # Reads the shared quota file and, in queue mode, the SQLite queue
+    body, content_type = await asyncio.to_thread(metrics.render, indexer, job_manager)
+    return Response(body, headers={"Content-Type": content_type})
+
 @app.post("/api/check-url")
-async def check_url_status(url: str):
-    """Check if a URL is indexed"""
+async def check_url_status(url: str, force: bool = False):
+    """Check if a URL is indexed (cached; concurrent checks of one URL share a search)"""
     try:
-        result = indexer.check_indexing_status(url)
-        return result
+        return await indexer.check_indexing_status_async(url, force, session=http_session)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/check")
+async def check_urls_status(request: CheckRequest):
+    """
+    Check many URLs at once
+    Cached answers return immediately; the rest are searched in parallel
+    """
+    if not request.urls:
+        raise HTTPException(status_code=400, detail="No URLs provided")
+    if len(request.urls) > MAX_CHECK_URLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_CHECK_URLS} URLs per request")
+    
+    results = await indexer.check_indexing_statuses_async(request.urls, request.force, session=http_session)
+    return {
+        "results": results,
+        "total": len(results),
+        "cached": sum(1 for result in results if result.get("cached")),
+        "indexed": sum(1 for result in results if result.get("indexed") is True)
+    }
+
 @app.get("/api/methods")
 async def get_methods():
-    """Get available indexing methods"""
+    """Get available indexing methods, with live health of the ping services"""
+    # The quota lives in a lock-guarded file shared with other processes
+    remaining = await asyncio.to_thread(indexer.google_quota.remaining) if indexer else None
+    services = indexer.ping_service_health() if indexer else {}
+    google_ping = services.get(urlparse(indexer.endpoints["sitemap_ping"]).netloc, {}) if indexer else {}
     return {
         "methods": [
             {
                 "name": "Google Indexing API",
                 "speed": "Instant",
                 "limit": "200/day",
+                "remaining_today": remaining["daily"] if remaining else None,
                 "enabled": indexer.indexing_service is not None if indexer else False
             },
             {
                 "name": "IndexNow API",
                 "speed": "Fast",
                 "limit": "10,000/day",
-                "enabled": True
+                "enabled": indexer.indexnow_key is not None if indexer else False
             },
             {
                 "name": "Sitemap Ping",
                 "speed": "Moderate",
                 "limit": "Unlimited",
-                "enabled": True
+                "enabled": google_ping.get("healthy", True),
+                "health": google_ping or None
             },
             {
                 "name": "External Pings",
                 "speed": "Moderate",
                 "limit": "Unlimited",
-                "enabled": True
+                "enabled": any(service["healthy"] for service in services.values()) if services else True,
+                "services": list(services.values())
             }
         ]
     }
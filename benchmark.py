@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark - Google Instant Indexer
+Starts local stand-ins for the IndexNow, ping, search and Google Indexing API
+endpoints and measures the indexing engines against them, no internet needed
+
+Usage:
+    python benchmark.py                                   # 1k and 10k URLs, every engine
+    python benchmark.py --sizes 1000,100000,1000000 --engines threads,async
+    python benchmark.py --per-url-pings --latency-ms 50 --throttle-rate 0.05
+    python benchmark.py --indexnow --google --error-rate 0.01
+    python benchmark.py --engines checks --sizes 200 --latency-ms 500   # API responsiveness
+
+Each scenario runs in its own process so peak RSS is measured per scenario.
+Results are printed and appended to bench_output.txt.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+ENGINES = ("threads", "async", "stream", "api", "checks")
+PING_SERVICES = 3
+
+
+# ----------------------------------------------------------------------
+# Stand-in endpoints
+# ----------------------------------------------------------------------
+
+def run_mock_servers(config: dict, ready):
+    """
+    Serve every stand-in endpoint until the process is terminated
+
+    Port 0 serves IndexNow (/indexnow), search (/search), the Indexing API
+    (/google/v3/urlNotifications:publish, /google/batch), its token endpoint
+    (/token) and request counters (/_stats); ports 1..3 each serve one ping
+    service (/ping), so every service gets its own breaker and limiter
+    """
+    from aiohttp import web
+
+    stats = Counter()
+    latency = config["latency_ms"] / 1000.0
+    jitter = config["jitter_ms"] / 1000.0
+
+    def injected_failure():
+        """429 (with Retry-After), 500 or None, per the configured rates"""
+        roll = random.random()
+        if roll < config["throttle_rate"]:
+            return 429
+        if roll < config["throttle_rate"] + config["error_rate"]:
+            return 500
+        return None
+
+    async def respond(route: str, ok_status: int = 200, body: str = "ok", **kwargs):
+        await asyncio.sleep(latency + random.uniform(0, jitter))
+        status = injected_failure() or ok_status
+        stats[f"{route} {status}"] += 1
+        headers = {"Retry-After": str(config["retry_after"])} if status == 429 else None
+        if status != ok_status:
+            return web.Response(status=status, text="injected failure", headers=headers)
+        return web.Response(status=status, text=body, headers=headers, **kwargs)
+
+    async def indexnow(request):
+        await request.read()
+        return await respond("indexnow", 202, "")
+
+    async def ping(request):
+        return await respond("ping")
+
+    async def search(request):
+        query = request.query.get("q", "")
+        target = query[5:] if query.startswith("site:") else query
+        return await respond("search", body=f'<html><a href="/url?q={target}&amp;sa=U">result</a></html>',
+                             content_type="text/html")
+
+    async def token(request):
+        await request.read()
+        stats["token 200"] += 1
+        return web.json_response({"access_token": "bench-token", "expires_in": 3600, "token_type": "Bearer"})
+
+    async def publish(request):
+        body = await request.json()
+        return await respond("google", body=json.dumps({"urlNotificationMetadata": {"url": body.get("url")}}),
+                             content_type="application/json")
+
+    async def batch(request):
+        # Multipart batch: answer every part, each with its own injected failures
+        boundary = re.search(r'boundary="?([^";]+)"?', request.headers["Content-Type"]).group(1)
+        text = (await request.read()).decode("utf-8")
+        await asyncio.sleep(latency + random.uniform(0, jitter))
+        parts = []
+        for part in text.split(f"--{boundary}"):
+            content_id = re.search(r"Content-ID: <([^>]+)>", part)
+            if not content_id:
+                continue
+            status = injected_failure() or 200
+            stats[f"google_batch_item {status}"] += 1
+            reason = {200: "OK", 429: "Too Many Requests", 500: "Internal Server Error"}[status]
+            payload = "{}" if status == 200 else json.dumps({"error": {"code": status, "message": reason}})
+            parts.append(
+                f"--batch_bench\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id.group(1)}>\r\n\r\n"
+                f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                f"Retry-After: {config['retry_after']}\r\n\r\n{payload}\r\n"
+            )
+        stats["google_batch 200"] += 1
+        return web.Response(text="".join(parts) + "--batch_bench--\r\n",
+                            headers={"Content-Type": "multipart/mixed; boundary=batch_bench"})
+
+    async def get_stats(request):
+        return web.json_response(dict(stats))
+
+    async def main():
+        api = web.Application(client_max_size=1024 ** 3)
+        api.router.add_post("/indexnow", indexnow)
+        api.router.add_get("/search", search)
+        api.router.add_post("/token", token)
+        api.router.add_post("/google/v3/urlNotifications:publish", publish)
+        api.router.add_post("/google/batch", batch)
+        api.router.add_get("/_stats", get_stats)
+        apps = [api]
+        for _ in range(PING_SERVICES):
+            ping_app = web.Application()
+            ping_app.router.add_get("/ping", ping)
+            apps.append(ping_app)
+
+        ports = []
+        for app in apps:
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0, backlog=4096)
+            await site.start()
+            ports.append(site._server.sockets[0].getsockname()[1])
+        ready.put(ports)
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def mock_endpoints(ports) -> dict:
+    """Indexer endpoints pointing at the stand-ins"""
+    base = f"http://127.0.0.1:{ports[0]}"
+    return {
+        "indexnow": f"{base}/indexnow",
+        "sitemap_ping": f"http://127.0.0.1:{ports[1]}/ping?sitemap={{url}}",
+        "ping_services": [f"http://127.0.0.1:{port}/ping?sitemap={{url}}" for port in ports[1:]],
+        "search": f"{base}/search?q={{query}}",
+        "google_api": f"{base}/google/",
+    }
+
+
+def write_service_account(path: str, token_uri: str):
+    """Throwaway service account whose tokens come from the stand-in"""
+    import rsa
+
+    _, private_key = rsa.newkeys(2048)
+    with open(path, "w") as f:
+        json.dump({
+            "type": "service_account",
+            "project_id": "benchmark",
+            "private_key_id": "benchmark",
+            "private_key": private_key.save_pkcs1().decode(),
+            "client_email": "benchmark@benchmark.iam.gserviceaccount.com",
+            "client_id": "1",
+            "token_uri": token_uri,
+        }, f)
+
+
+# ----------------------------------------------------------------------
+# Scenarios (each runs in a child process)
+# ----------------------------------------------------------------------
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def generate_urls(size: int, hosts: int):
+    for i in range(size):
+        yield f"https://site{i % hosts}.example/page/{i}"
+
+
+def make_indexer(scenario: dict):
+    from google_indexer import GoogleInstantIndexer
+    from quota import QuotaBucket
+
+    class TimedIndexer(GoogleInstantIndexer):
+        """Records how long each URL's per-URL stage takes"""
+        latencies = []
+
+        def rapid_index_single_url(self, url, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return super().rapid_index_single_url(url, *args, **kwargs)
+            finally:
+                self.latencies.append(time.perf_counter() - start)
+
+        async def rapid_index_single_url_async(self, url, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await super().rapid_index_single_url_async(url, *args, **kwargs)
+            finally:
+                self.latencies.append(time.perf_counter() - start)
+
+    return TimedIndexer(
+        service_account_file=scenario.get("service_account_file"),
+        sitemap_base_url=f"http://127.0.0.1:{scenario['ports'][0]}/sitemaps",
+        indexnow_key="benchmarkkey" if scenario["indexnow"] else None,
+        google_quota=QuotaBucket(daily_limit=10 ** 9, per_minute_limit=10 ** 9, state_file=None),
+        endpoints=scenario["endpoints"],
+    )
+
+
+def run_engine(scenario: dict) -> dict:
+    engine = scenario["engine"]
+    size = scenario["size"]
+    urls = generate_urls(size, scenario["hosts"])
+    batch_pings = not scenario["per_url_pings"]
+    processed = 0
+
+    def count(result):
+        nonlocal processed
+        processed += 1
+
+    if engine == "api":
+        return run_api(scenario, list(urls))
+    if engine == "checks":
+        return run_checks(scenario, list(urls))
+
+    indexer = make_indexer(scenario)
+    start = time.perf_counter()
+    if engine == "threads":
+        indexer.rapid_index_bulk(list(urls), max_workers=scenario["workers"], batch_pings=batch_pings,
+                                 on_result=count, keep_results=False)
+    elif engine == "async":
+        asyncio.run(indexer.rapid_index_bulk_async(list(urls), max_concurrency=scenario["concurrency"],
+                                                   batch_pings=batch_pings, on_result=count,
+                                                   keep_results=False))
+    elif engine == "stream":
+        for result in indexer.rapid_index_stream(urls, max_workers=scenario["workers"], batch_pings=batch_pings):
+            count(result)
+    seconds = time.perf_counter() - start
+    return {
+        "processed": processed,
+        "seconds": seconds,
+        "p50_ms": percentile(indexer.latencies, 0.50) * 1000,
+        "p99_ms": percentile(indexer.latencies, 0.99) * 1000,
+        "latency_of": "per-URL stage",
+    }
+
+
+def serve_api(scenario: dict):
+    """Start api_server on a free port in a background thread; returns (server, thread, base URL)"""
+    import uvicorn
+
+    os.environ["INDEXER_ENDPOINTS"] = json.dumps(scenario["endpoints"])
+    import api_server
+
+    server = uvicorn.Server(uvicorn.Config(api_server.app, host="127.0.0.1", port=0, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def run_api(scenario: dict, urls) -> dict:
+    """Serve api_server in this process and drive a job through it over HTTP"""
+    import requests
+
+    server, thread, base = serve_api(scenario)
+    poll_latencies = []
+    start = time.perf_counter()
+    job_id = requests.post(f"{base}/api/index", json={"urls": urls}).json()["job_id"]
+    while True:
+        poll_start = time.perf_counter()
+        status = requests.get(f"{base}/api/jobs/{job_id}", params={"limit": 0}).json()
+        poll_latencies.append(time.perf_counter() - poll_start)
+        if not status["in_progress"]:
+            break
+        time.sleep(0.2)
+    seconds = time.perf_counter() - start
+    server.should_exit = True
+    thread.join(timeout=10)
+    return {
+        "processed": status["processed"],
+        "seconds": seconds,
+        "p50_ms": percentile(poll_latencies, 0.50) * 1000,
+        "p99_ms": percentile(poll_latencies, 0.99) * 1000,
+        "latency_of": "status poll",
+    }
+
+
+def run_checks(scenario: dict, urls) -> dict:
+    """
+    Serve api_server and send one /api/check-url per URL, all at once, while
+    probing /api/health every 50ms: the probe latency shows whether slow
+    searches hold up other clients
+    """
+    import aiohttp
+
+    server, thread, base = serve_api(scenario)
+    probe_latencies = []
+
+    async def drive():
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+            checking = True
+
+            async def probe():
+                while checking:
+                    probe_start = time.perf_counter()
+                    async with session.get(f"{base}/api/health") as response:
+                        await response.read()
+                    probe_latencies.append(time.perf_counter() - probe_start)
+                    await asyncio.sleep(0.05)
+
+            async def check(url):
+                async with session.post(f"{base}/api/check-url", params={"url": url, "force": "true"}) as response:
+                    await response.read()
+                    return response.status
+
+            prober = asyncio.ensure_future(probe())
+            statuses = await asyncio.gather(*(check(url) for url in urls))
+            checking = False
+            await prober
+            return statuses
+
+    start = time.perf_counter()
+    statuses = asyncio.run(drive())
+    seconds = time.perf_counter() - start
+    server.should_exit = True
+    thread.join(timeout=10)
+    return {
+        "processed": sum(1 for status in statuses if status == 200),
+        "seconds": seconds,
+        "p50_ms": percentile(probe_latencies, 0.50) * 1000,
+        "p99_ms": percentile(probe_latencies, 0.99) * 1000,
+        "latency_of": "health probe during checks",
+    }
+
+
+def run_child(scenario: dict):
+    """Entry point of a scenario process; writes its metrics as JSON"""
+    os.chdir(scenario["workdir"])
+    sys.stdout = open(os.devnull, "w")
+    metrics = run_engine(scenario)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    metrics["peak_rss_mb"] = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    with open(scenario["result_file"], "w") as f:
+        json.dump(metrics, f)
+
+
+# ----------------------------------------------------------------------
+# Driver
+# ----------------------------------------------------------------------
+
+def fetch_stats(ports) -> Counter:
+    import requests
+    return Counter(requests.get(f"http://127.0.0.1:{ports[0]}/_stats").json())
+
+
+def run_scenario(args, engine: str, size: int, ports, endpoints, service_account_file) -> dict:
+    with tempfile.TemporaryDirectory(prefix="indexer-bench-") as workdir:
+        scenario = {
+            "engine": engine,
+            "size": size,
+            "hosts": args.hosts,
+            "workers": args.workers,
+            "concurrency": args.concurrency,
+            "per_url_pings": args.per_url_pings,
+            "indexnow": args.indexnow,
+            "service_account_file": service_account_file,
+            "ports": ports,
+            "endpoints": endpoints,
+            "workdir": workdir,
+            "result_file": os.path.join(workdir, "metrics.json"),
+        }
+        before = fetch_stats(ports)
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", json.dumps(scenario)],
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=args.timeout,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+        )
+        if child.returncode != 0 or not os.path.exists(scenario["result_file"]):
+            return {"engine": engine, "size": size, "error": child.stderr.strip().splitlines()[-1:]}
+        with open(scenario["result_file"]) as f:
+            metrics = json.load(f)
+        requests_made = fetch_stats(ports) - before
+
+    metrics.update(engine=engine, size=size, urls_per_sec=metrics["processed"] / metrics["seconds"],
+                   requests=dict(requests_made))
+    return metrics
+
+
+def format_row(metrics: dict) -> str:
+    if "error" in metrics:
+        return f"{metrics['engine']:<8} {metrics['size']:>9,}  FAILED: {metrics['error']}"
+    return (f"{metrics['engine']:<8} {metrics['size']:>9,} {metrics['seconds']:>9.2f} "
+            f"{metrics['urls_per_sec']:>11,.0f} {metrics['p50_ms']:>9.2f} {metrics['p99_ms']:>9.2f} "
+            f"{metrics['peak_rss_mb']:>9.1f}  {metrics['latency_of']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the indexer against local stand-in endpoints")
+    parser.add_argument("--sizes", default="1000,10000", help="Comma-separated job sizes (URLs)")
+    parser.add_argument("--engines", default=",".join(ENGINES), help=f"Any of: {', '.join(ENGINES)}")
+    parser.add_argument("--workers", type=int, default=10, help="Threads for threads/stream")
+    parser.add_argument("--concurrency", type=int, default=1000, help="URLs in flight for async")
+    parser.add_argument("--hosts", type=int, default=10, help="Distinct hosts the URLs spread over")
+    parser.add_argument("--per-url-pings", action="store_true",
+                        help="Ping services once per URL instead of once per batch sitemap")
+    parser.add_argument("--indexnow", action="store_true", help="Also submit through IndexNow")
+    parser.add_argument("--google", action="store_true", help="Also publish through the Indexing API")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Stand-in response latency")
+    parser.add_argument("--jitter-ms", type=float, default=10, help="Random extra latency, up to this")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of responses that are 500s")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of responses that are 429s")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--timeout", type=float, default=3600, help="Seconds before a scenario is abandoned")
+    parser.add_argument("--output", default="bench_output.txt", help="File the results are appended to")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(json.loads(args.child))
+        return
+
+    engines = [engine.strip() for engine in args.engines.split(",") if engine.strip()]
+    unknown = set(engines) - set(ENGINES)
+    if unknown:
+        parser.error(f"unknown engines: {', '.join(sorted(unknown))}")
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    config = {
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "error_rate": args.error_rate,
+        "throttle_rate": args.throttle_rate,
+        "retry_after": args.retry_after,
+    }
+    context = multiprocessing.get_context("spawn")
+    ready = context.Queue()
+    mock = context.Process(target=run_mock_servers, args=(config, ready), daemon=True)
+    mock.start()
+    ports = ready.get(timeout=30)
+    endpoints = mock_endpoints(ports)
+
+    lines = [
+        f"# {datetime.now().isoformat(timespec='seconds')}  " + " ".join(sys.argv[1:]),
+        f"# stand-ins: {args.latency_ms:g}ms +{args.jitter_ms:g}ms, {args.error_rate:.1%} 500s, "
+        f"{args.throttle_rate:.1%} 429s (Retry-After {args.retry_after:g}s)",
+        f"{'engine':<8} {'urls':>9} {'seconds':>9} {'urls/sec':>11} {'p50 ms':>9} {'p99 ms':>9} "
+        f"{'rss MB':>9}  latency of",
+    ]
+    print("\n".join(lines))
+
+    with tempfile.TemporaryDirectory(prefix="indexer-bench-") as keys_dir:
+        service_account_file = None
+        if args.google:
+            service_account_file = os.path.join(keys_dir, "service-account.json")
+            write_service_account(service_account_file, f"http://127.0.0.1:{ports[0]}/token")
+        try:
+            for size in sizes:
+                for engine in engines:
+                    metrics = run_scenario(args, engine, size, ports, endpoints, service_account_file)
+                    row = format_row(metrics)
+                    print(row)
+                    if metrics.get("requests"):
+                        print(f"{'':<19} requests: " + ", ".join(
+                            f"{key}={value}" for key, value in sorted(metrics["requests"].items())))
+                    lines.append(row)
+        finally:
+            mock.terminate()
+
+    if args.output:
+        with open(args.output, "a") as f:
+            f.write("\n".join(lines) + "\n\n")
+        print(f"\nResults appended to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
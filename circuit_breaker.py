@@ -0,0 +1,134 @@
+"""
+Circuit breakers for Google Instant Indexer
+Per-service health tracking so dead ping endpoints are skipped instead of waited on
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 60.0,
+                 max_reset_timeout: float = 3600.0):
+        """
+        Initialize the breaker
+
+        Args:
+            name: Service the breaker guards
+            failure_threshold: Consecutive failures (or timeouts) that open the circuit
+            reset_timeout: Seconds the circuit stays open before a half-open probe
+            max_reset_timeout: Ceiling for the open period, which doubles each
+                               time a probe fails
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+
+        self._lock = threading.Lock()
+        self.state = BREAKER_CLOSED
+        self.consecutive_failures = 0
+        self.successes = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_error: Optional[str] = None
+        self._open_for = reset_timeout
+        self._retry_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go out now
+        While open, calls are refused until the reset timeout passes; then a
+        single probe is let through (half-open) and the rest keep being refused
+        """
+        with self._lock:
+            if self.state == BREAKER_CLOSED:
+                return True
+            if self.state == BREAKER_OPEN and time.time() >= self._retry_at:
+                self.state = BREAKER_HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == BREAKER_HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.skipped += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.state = BREAKER_CLOSED
+            self._open_for = self.reset_timeout
+            self._probe_in_flight = False
+
+    def record_failure(self, error: Optional[str] = None):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = error
+            if self.state == BREAKER_HALF_OPEN:
+                # The probe failed: stay open, and wait longer before the next one
+                self._open_for = min(self._open_for * 2, self.max_reset_timeout)
+                self._trip()
+            elif self.state == BREAKER_CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self._trip()
+
+    def release(self):
+        """Give back a half-open probe that ended without an answer (e.g. cancelled)"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _trip(self):
+        self.state = BREAKER_OPEN
+        self._retry_at = time.time() + self._open_for
+        self._probe_in_flight = False
+
+    def status(self) -> Dict:
+        with self._lock:
+            retry_at = None
+            if self.state == BREAKER_OPEN:
+                retry_at = datetime.fromtimestamp(self._retry_at).isoformat()
+            return {
+                "service": self.name,
+                "state": self.state,
+                "healthy": self.state == BREAKER_CLOSED,
+                "consecutive_failures": self.consecutive_failures,
+                "successes": self.successes,
+                "failures": self.failures,
+                "skipped": self.skipped,
+                "last_error": self.last_error,
+                "retry_at": retry_at
+            }
+
+
+class ServiceHealth:
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0,
+                 max_reset_timeout: float = 3600.0):
+        """One CircuitBreaker per service, created on first use with these settings"""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name, self.failure_threshold, self.reset_timeout,
+                                         self.max_reset_timeout)
+                self._breakers[name] = breaker
+            return breaker
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Health of every service seen so far"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.status() for breaker in breakers}
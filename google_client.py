@@ -0,0 +1,96 @@
+"""
+Google Indexing API client loading for Google Instant Indexer
+The Google client libraries are imported on first use, and built clients
+are cached per credentials file so new indexers reuse them
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+INDEXING_SCOPES = ["https://www.googleapis.com/auth/indexing"]
+# Socket timeout for Indexing API calls made on per-thread connections
+GOOGLE_HTTP_TIMEOUT = 30
+
+_lock = threading.Lock()
+# (absolute path, mtime, API endpoint) of a service account file -> IndexingClient
+_clients: Dict[Tuple[str, float, Optional[str]], "IndexingClient"] = {}
+
+
+class IndexingClient:
+    def __init__(self, credentials, service, batch_uri: Optional[str] = None):
+        """
+        A built Indexing API service plus per-thread HTTP connections
+
+        httplib2 connections are not thread-safe, so every thread publishes
+        over its own AuthorizedHttp. All of them share one credentials object,
+        whose token is refreshed by one thread at a time
+        """
+        self.credentials = credentials
+        self.service = service
+        self.batch_uri = batch_uri
+        self._local = threading.local()
+        self._refresh_lock = threading.Lock()
+
+    def http(self):
+        """This thread's authorized connection, with a current access token"""
+        import google_auth_httplib2
+        import httplib2
+
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(
+                self.credentials, http=httplib2.Http(timeout=GOOGLE_HTTP_TIMEOUT)
+            )
+            self._local.http = http
+        if not self.credentials.valid:
+            with self._refresh_lock:
+                # Another thread may have refreshed while this one waited
+                if not self.credentials.valid:
+                    self.credentials.refresh(google_auth_httplib2.Request(http.http))
+        return http
+
+    def new_batch(self, callback):
+        """Batch request, sent to the overridden API endpoint if there is one"""
+        if self.batch_uri is None:
+            return self.service.new_batch_http_request(callback=callback)
+        from googleapiclient.http import BatchHttpRequest
+        return BatchHttpRequest(callback=callback, batch_uri=self.batch_uri)
+
+
+def indexing_client(service_account_file: str, api_endpoint: Optional[str] = None) -> IndexingClient:
+    """
+    Indexing API client for a service account file
+    Built once per file (and rebuilt if the file changes), from the
+    discovery document bundled with the client library, so no network
+    round trip is needed. api_endpoint replaces the Indexing API root
+    """
+    path = os.path.abspath(service_account_file)
+    key = (path, os.path.getmtime(path), api_endpoint)
+    with _lock:
+        client = _clients.get(key)
+    if client is not None:
+        return client
+
+    from google.oauth2 import service_account
+    from googleapiclient.discovery import build
+
+    credentials = service_account.Credentials.from_service_account_file(path, scopes=INDEXING_SCOPES)
+    client_options = {"api_endpoint": api_endpoint} if api_endpoint else None
+    service = build('indexing', 'v3', credentials=credentials, client_options=client_options,
+                    static_discovery=True, cache_discovery=False)
+    # The batch URI comes from the discovery document, which ignores api_endpoint
+    batch_uri = api_endpoint.rstrip("/") + "/batch" if api_endpoint else None
+    client = IndexingClient(credentials, service, batch_uri)
+    with _lock:
+        # Drop clients built from older versions of the same file
+        for stale in [cached for cached in _clients if cached[0] == path and cached[2] == api_endpoint]:
+            del _clients[stale]
+        _clients[key] = client
+    return client
+
+
+def http_error_class():
+    """googleapiclient's HttpError, imported only when a service exists"""
+    from googleapiclient.errors import HttpError
+    return HttpError
@@ -3,28 +3,153 @@ Google Instant Indexer - Multi-Method Indexing System
 Supports: PDF Links, HTML Links, Forum Links, Web 2.0, Tier 1/2/3 Backlinks
 """
 
-import requests
+import aiohttp
+import asyncio
 import json
 import time
 from datetime import datetime
-from typing import List, Dict
+from typing import Callable, List, Dict, Iterable, Iterator, Optional
+from contextlib import asynccontextmanager
 import concurrent.futures
+import gzip
+import itertools
+import os
+import re
+import sys
+import uuid
 from urllib.parse import urlparse, quote
-import xml.etree.ElementTree as ET
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+import metrics
+from http_transport import HttpTransport
+from job_checkpoint import DEFAULT_CHECKPOINT_DIR, JobCheckpoint
+from job_manager import result_outcome
+from method_router import MethodRouter, Priority
+from google_client import indexing_client, http_error_class
+from adaptive_limiter import RETRY_STATUSES, backoff_delay, parse_retry_after
+from circuit_breaker import CircuitBreaker, ServiceHealth
+from status_checker import StatusChecker, parse_indexed
+from quota import QuotaBucket
+from sitemap_reader import DEFAULT_SITEMAP_STATE, SitemapState, iter_sitemap
+from sitemap_writer import SitemapWriter, SitemapEntry
+from submission_ledger import SubmissionLedger
+from url_normalizer import InvalidURL, URLFilter, canonical_key, normalize_url
+from result_sink import ResultSink, NDJSONResultSink
+
+INDEXNOW_ENDPOINT = "https://api.indexnow.org/indexnow"
+# Where each method sends its requests; override any of them with the
+# endpoints constructor argument (e.g. to point at local stand-ins)
+# {url} and {query} are filled in URL-quoted
+DEFAULT_ENDPOINTS = {
+    "indexnow": INDEXNOW_ENDPOINT,
+    "sitemap_ping": "https://www.google.com/ping?sitemap={url}",
+    "ping_services": [
+        "https://www.google.com/ping?sitemap={url}",
+        "https://www.bing.com/ping?sitemap={url}",
+        "https://submissions.ask.com/ping?sitemap={url}",
+    ],
+    "search": "https://www.google.com/search?q={query}",
+    # Indexing API root, e.g. "http://127.0.0.1:8080/" (None: Google's)
+    "google_api": None,
+}
+# IndexNow accepts at most 10,000 URLs per POST
+INDEXNOW_MAX_URLS = 10000
+# The Indexing API accepts at most 100 calls per batch request
+GOOGLE_BATCH_MAX = 100
+# Host the adaptive limiter tracks for Indexing API calls
+GOOGLE_API_HOST = "indexing.googleapis.com"
+
+# Submission channels, as recorded in the ledger
+CHANNEL_GOOGLE_API = "google_api"
+CHANNEL_INDEXNOW = "indexnow"
+CHANNEL_PINGS = "sitemap_ping"
+# Metrics label for index status searches (not a submission channel)
+CHANNEL_STATUS_CHECK = "status_check"
+# How often completed results are flushed to the ledger
+LEDGER_FLUSH_EVERY = 500
+# Streaming runs: URLs read per chunk, and per-URL tasks in flight per worker
+STREAM_CHUNK_SIZE = 10000
+STREAM_WINDOW_PER_WORKER = 4
+# URLs the streaming dedupe filter is sized for (~18MB at a 0.1% false positive rate)
+STREAM_DEDUPE_CAPACITY = 10_000_000
+# Batch sitemaps stay fetchable this long after their ping (crawlers fetch
+# pinged sitemaps hours or days later), then the next plan deletes them
+BATCH_SITEMAP_MAX_AGE = 7 * 24 * 3600
+# Names plan_sitemap_batches gives its sitemaps (and their .xml.gz parts);
+# nothing else in sitemap_dir is ever deleted
+BATCH_SITEMAP_NAME = re.compile(r"^sitemap_.+_\d{14}_[0-9a-f]{6}(-\d+)?\.xml(\.gz)?$")
+
+
+def iter_url_lines(path: str = "-") -> Iterator[str]:
+    """
+    Yield URLs from a text file, one per line, without reading it all
+    "-" reads stdin; a ".gz" path is decompressed. Blank lines and
+    lines starting with "#" are skipped
+    """
+    if path == "-":
+        source = sys.stdin
+    elif path.endswith(".gz"):
+        source = gzip.open(path, "rt", encoding="utf-8")
+    else:
+        source = open(path, encoding="utf-8")
+    try:
+        for line in source:
+            url = line.strip()
+            if url and not url.startswith("#"):
+                yield url
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
 
 class GoogleInstantIndexer:
-    def __init__(self, service_account_file: str = None):
+    def __init__(self, service_account_file: str = None,
+                 transport: Optional[HttpTransport] = None,
+                 sitemap_dir: str = ".", sitemap_base_url: Optional[str] = None,
+                 indexnow_key: Optional[str] = None, indexnow_gzip: bool = True,
+                 google_quota: Optional[QuotaBucket] = None,
+                 ledger: Optional[SubmissionLedger] = None,
+                 ping_health: Optional[ServiceHealth] = None,
+                 status_checker: Optional[StatusChecker] = None,
+                 endpoints: Optional[Dict] = None,
+                 router: Optional[MethodRouter] = None):
         """
         Initialize the indexer with multiple indexing methods
         
         Args:
             service_account_file: Path to Google service account JSON file
+            transport: Pooled HTTP transport (default: keep-alive pools sized for 10 workers)
+            sitemap_dir: Directory where bulk runs write their batch sitemaps
+            sitemap_base_url: Public URL that serves sitemap_dir; enables batch
+                              sitemap pings (default: none, so bulk runs ping
+                              each URL on its own)
+            indexnow_key: IndexNow API key; enables IndexNow in bulk runs
+            indexnow_gzip: Gzip-compress IndexNow request bodies in bulk runs
+            google_quota: Token bucket guarding the Google Indexing API
+                          (default: 200/day, 380/minute, kept in google_api_quota.json)
+            ledger: Submission ledger; bulk runs skip URLs it still considers fresh
+            ping_health: Circuit breakers for the ping services (default: open after
+                         3 consecutive failures, probe again after 60s)
+            status_checker: Cache for index status checks (default: answers kept 1h,
+                            10,000 URLs)
+            endpoints: Overrides for DEFAULT_ENDPOINTS
+            router: Decides which methods bulk runs use per URL (default: Google API
+                    quota to priority 5 and up, highest first; everything batched)
         """
         self.service_account_file = service_account_file
         self.indexing_service = None
+        self.google_client = None
+        self.transport = transport or HttpTransport()
+        self.sitemap_dir = sitemap_dir
+        self.sitemap_base_url = sitemap_base_url
+        self.indexnow_key = indexnow_key
+        self.indexnow_gzip = indexnow_gzip
+        self.google_quota = google_quota or QuotaBucket()
+        self.ledger = ledger
+        self.ping_health = ping_health or ServiceHealth()
+        self.status_checker = status_checker or StatusChecker()
+        self.endpoints = dict(DEFAULT_ENDPOINTS, **(endpoints or {}))
+        self.router = router or MethodRouter()
+        self._google_host = urlparse(self.endpoints["google_api"] or "").netloc or GOOGLE_API_HOST
+        self.last_job_report = {}
         self.results = []
         
         # Initialize Google Indexing API if credentials provided
@@ -32,17 +157,26 @@ class GoogleInstantIndexer:
             self._init_google_api()
     
     def _init_google_api(self):
-        """Initialize Google Indexing API"""
+        """
+        Initialize Google Indexing API
+        The Google client stack is imported here, on first use; the built
+        client is shared by every indexer using the same credentials file
+        """
         try:
-            SCOPES = ["https://www.googleapis.com/auth/indexing"]
-            credentials = service_account.Credentials.from_service_account_file(
-                self.service_account_file, scopes=SCOPES
-            )
-            self.indexing_service = build('indexing', 'v3', credentials=credentials)
+            self.google_client = indexing_client(self.service_account_file,
+                                                 api_endpoint=self.endpoints["google_api"])
+            self.indexing_service = self.google_client.service
             print("✓ Google Indexing API initialized successfully")
         except Exception as e:
             print(f"✗ Google Indexing API initialization failed: {e}")
     
+    def _google_http(self):
+        """
+        This thread's authorized connection for Indexing API calls
+        (None: the service's own connection, e.g. for a service set directly)
+        """
+        return self.google_client.http() if self.google_client else None
+    
     def index_via_google_api(self, url: str) -> Dict:
         """
         Index URL using official Google Indexing API
@@ -52,12 +186,27 @@ class GoogleInstantIndexer:
             return {"method": "Google API", "url": url, "status": "failed", 
                     "message": "API not initialized"}
         
+        if not self.google_quota.acquire(1):
+            return self._quota_deferred(url)
+        
+        limiter = self.transport.limiter
+        limiter.acquire(self._google_host)
+        metrics.request_started(CHANNEL_GOOGLE_API, self._google_host)
+        start = time.perf_counter()
+        throttled = False
+        adapt = False
+        status = "error"
         try:
             body = {
                 "url": url,
                 "type": "URL_UPDATED"
             }
-            response = self.indexing_service.urlNotifications().publish(body=body).execute()
+            # The client library retries 429/5xx itself with exponential backoff
+            response = self.indexing_service.urlNotifications().publish(body=body).execute(
+                http=self._google_http(), num_retries=self.transport.max_retries
+            )
+            adapt = True
+            status = 200
             return {
                 "method": "Google Indexing API",
                 "url": url,
@@ -65,7 +214,10 @@ class GoogleInstantIndexer:
                 "response": response,
                 "timestamp": datetime.now().isoformat()
             }
-        except HttpError as e:
+        except http_error_class() as e:
+            throttled = e.resp.status in RETRY_STATUSES
+            adapt = True
+            status = e.resp.status
             return {
                 "method": "Google Indexing API",
                 "url": url,
@@ -73,32 +225,175 @@ class GoogleInstantIndexer:
                 "error": str(e),
                 "timestamp": datetime.now().isoformat()
             }
+        finally:
+            metrics.request_finished(CHANNEL_GOOGLE_API, self._google_host, status, time.perf_counter() - start)
+            limiter.release(self._google_host, throttled=throttled, adapt=adapt)
     
-    def index_via_indexnow(self, urls: List[str], host: str, api_key: str) -> Dict:
+    def _quota_deferred(self, url: str) -> Dict:
+        """Result for a URL held back because the Google API quota is spent"""
+        metrics.quota_deferred()
+        return {
+            "method": "Google Indexing API",
+            "url": url,
+            "status": "deferred",
+            "message": "quota deferred: Google Indexing API quota exhausted",
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    def index_via_google_api_batch(self, urls: List[str]) -> List[Dict]:
         """
-        Index URLs using IndexNow API (Bing, Yandex, etc.)
-        Fast alternative indexing method
+        Publish up to GOOGLE_BATCH_MAX URLs in one batch HTTP request
+        Each notification still counts against the quota; callers take the tokens.
+        Notifications rejected with 429/5xx are resent in a follow-up batch
+        after a jittered backoff (honouring Retry-After)
         """
-        endpoint = "https://api.indexnow.org/indexnow"
+        results = [None] * len(urls)
+        pending = list(range(len(urls)))
+        for attempt in range(self.transport.max_retries + 1):
+            retry, retry_after = self._send_google_batch(urls, pending, results)
+            if not retry or attempt == self.transport.max_retries:
+                break
+            if retry_after is not None and retry_after > self.transport.max_retry_wait:
+                break
+            time.sleep(backoff_delay(attempt, retry_after))
+            metrics.request_retried(CHANNEL_GOOGLE_API, self._google_host)
+            pending = retry
+        return results
+    
+    def _send_google_batch(self, urls: List[str], indexes: List[int], results: List[Optional[Dict]]):
+        """
+        One batch request for urls[i] for i in indexes, filling results in place
+        Returns: (indexes worth retrying, longest Retry-After seen or None)
+        """
+        retry = []
+        retry_after = None
+        
+        def callback(request_id, response, exception):
+            nonlocal retry_after
+            index = int(request_id)
+            if exception is not None:
+                resp = getattr(exception, "resp", None)
+                status_code = getattr(resp, "status", None)
+                results[index] = {
+                    "method": "Google Indexing API",
+                    "url": urls[index],
+                    "status": "failed",
+                    "error": str(exception),
+                    "timestamp": datetime.now().isoformat()
+                }
+                if status_code in RETRY_STATUSES:
+                    retry.append(index)
+                    wait = parse_retry_after(resp.get("retry-after"))
+                    if wait is not None:
+                        retry_after = max(retry_after or 0.0, wait)
+            else:
+                results[index] = {
+                    "method": "Google Indexing API",
+                    "url": urls[index],
+                    "status": "success",
+                    "response": response,
+                    "timestamp": datetime.now().isoformat()
+                }
+        
+        if self.google_client:
+            batch = self.google_client.new_batch(callback)
+        else:
+            batch = self.indexing_service.new_batch_http_request(callback=callback)
+        for index in indexes:
+            body = {"url": urls[index], "type": "URL_UPDATED"}
+            batch.add(self.indexing_service.urlNotifications().publish(body=body),
+                      request_id=str(index))
+        
+        limiter = self.transport.limiter
+        limiter.acquire(self._google_host)
+        metrics.request_started(CHANNEL_GOOGLE_API, self._google_host)
+        start = time.perf_counter()
+        try:
+            batch.execute(http=self._google_http())
+        except Exception as e:
+            metrics.request_finished(CHANNEL_GOOGLE_API, self._google_host, "error", time.perf_counter() - start)
+            limiter.release(self._google_host, adapt=False)
+            for index in indexes:
+                if results[index] is None:
+                    results[index] = {
+                        "method": "Google Indexing API",
+                        "url": urls[index],
+                        "status": "failed",
+                        "error": str(e),
+                        "timestamp": datetime.now().isoformat()
+                    }
+            return [], None
+        metrics.request_finished(CHANNEL_GOOGLE_API, self._google_host, 200, time.perf_counter() - start)
+        # One batch is one HTTP request: any throttled entry means the host is pushing back
+        limiter.release(self._google_host, throttled=bool(retry), retry_after=retry_after)
+        return retry, retry_after
+    
+    def submit_google_api_batches(self, urls: List[str], max_workers: int = 10) -> Dict[str, List[Dict]]:
+        """
+        Publish URLs through batch requests while quota lasts
+        Batches go out in parallel, each thread on its own connection.
+        Once the quota runs out, the remaining URLs are deferred without calls
+        Returns: Google API results keyed by URL
+        """
+        results_by_url = {}
+        sent = deferred = 0
         
+        def publish(batch_id, batch_urls):
+            return batch_id, self.index_via_google_api_batch(batch_urls)
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = []
+            for start in range(0, len(urls), GOOGLE_BATCH_MAX):
+                batch_urls = urls[start:start + GOOGLE_BATCH_MAX]
+                # Stop asking once the bucket has run dry
+                granted = 0 if deferred else self.google_quota.acquire(len(batch_urls))
+                if granted:
+                    batch_id = f"google-{start // GOOGLE_BATCH_MAX + 1}"
+                    futures.append(executor.submit(publish, batch_id, batch_urls[:granted]))
+                    sent += granted
+                for url in batch_urls[granted:]:
+                    results_by_url[url] = [self._quota_deferred(url)]
+                    deferred += 1
+            for future in concurrent.futures.as_completed(futures):
+                batch_id, results = future.result()
+                for result in results:
+                    results_by_url[result["url"]] = [dict(result, batch_id=batch_id)]
+        print(f"Google Indexing API: {sent} sent in batches, {deferred} quota deferred")
+        return results_by_url
+    
+    def _indexnow_request(self, urls: List[str], host: str, api_key: str,
+                          compress: bool = False) -> Dict:
+        """Build the IndexNow POST body and headers"""
         payload = {
             "host": host,
             "key": api_key,
             "keyLocation": f"https://{host}/{api_key}.txt",
             "urlList": urls
         }
-        
+        headers = {"Content-Type": "application/json; charset=utf-8"}
+        body = json.dumps(payload).encode("utf-8")
+        if compress:
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        return {"data": body, "headers": headers}
+    
+    def index_via_indexnow(self, urls: List[str], host: str, api_key: str,
+                           compress: bool = False) -> Dict:
+        """
+        Index URLs using IndexNow API (Bing, Yandex, etc.)
+        Fast alternative indexing method
+        """
         try:
-            response = requests.post(
-                endpoint,
-                json=payload,
-                headers={"Content-Type": "application/json; charset=utf-8"}
+            response = self.transport.post(
+                self.endpoints["indexnow"], channel=CHANNEL_INDEXNOW,
+                **self._indexnow_request(urls, host, api_key, compress)
             )
             
+            # 202 means the key is still being validated; the URLs were accepted
             return {
                 "method": "IndexNow API",
                 "urls": urls,
-                "status": "success" if response.status_code == 200 else "failed",
+                "status": "success" if response.status_code in (200, 202) else "failed",
                 "status_code": response.status_code,
                 "timestamp": datetime.now().isoformat()
             }
@@ -116,11 +411,16 @@ class GoogleInstantIndexer:
         Ping Google with sitemap URL
         Good for: Batch indexing, regular updates
         """
-        ping_url = f"https://www.google.com/ping?sitemap={quote(sitemap_url)}"
+        ping_url = self.endpoints["sitemap_ping"].format(url=quote(sitemap_url))
+        breaker = self._ping_breaker(ping_url)
+        if not breaker.allow():
+            return dict(self._circuit_open(breaker), method="Sitemap Ping", sitemap_url=sitemap_url,
+                        timestamp=datetime.now().isoformat())
         
+        result = None
         try:
-            response = requests.get(ping_url, timeout=10)
-            return {
+            response = self.transport.get(ping_url, timeout=10, channel=CHANNEL_PINGS)
+            result = {
                 "method": "Sitemap Ping",
                 "sitemap_url": sitemap_url,
                 "status": "success" if response.status_code == 200 else "failed",
@@ -128,87 +428,301 @@ class GoogleInstantIndexer:
                 "timestamp": datetime.now().isoformat()
             }
         except Exception as e:
-            return {
+            result = {
                 "method": "Sitemap Ping",
                 "sitemap_url": sitemap_url,
                 "status": "failed",
                 "error": str(e),
                 "timestamp": datetime.now().isoformat()
             }
+        finally:
+            if result is None:
+                # Cancelled or interrupted mid-call: no verdict, so free a half-open probe
+                breaker.release()
+        self._record_ping(breaker, result)
+        return result
     
-    def create_dynamic_sitemap(self, urls: List[str], filename: str = "dynamic_sitemap.xml") -> str:
+    def create_dynamic_sitemap(self, urls: Iterable[SitemapEntry], filename: str = "dynamic_sitemap.xml",
+                               base_url: Optional[str] = None) -> str:
         """
         Create a dynamic sitemap for the URLs
+        Streams entries to disk; past 50,000 URLs or 50MB the URLs are split
+        into .xml.gz parts and filename becomes a sitemap index over them
+        
+        Args:
+            urls: URLs, (url, lastmod, priority) tuples or dicts with those keys
+            filename: Sitemap path (a ".gz" suffix compresses it)
+            base_url: Public URL of the sitemap's directory, for index entries
         Returns: Path to sitemap file
         """
-        urlset = ET.Element("urlset", xmlns="http://www.sitemaps.org/schemas/sitemap/0.9")
-        
-        for url in urls:
-            url_elem = ET.SubElement(urlset, "url")
-            loc = ET.SubElement(url_elem, "loc")
-            loc.text = url
-            lastmod = ET.SubElement(url_elem, "lastmod")
-            lastmod.text = datetime.now().strftime("%Y-%m-%d")
-            changefreq = ET.SubElement(url_elem, "changefreq")
-            changefreq.text = "daily"
-            priority = ET.SubElement(url_elem, "priority")
-            priority.text = "1.0"
-        
-        tree = ET.ElementTree(urlset)
-        tree.write(filename, encoding="utf-8", xml_declaration=True)
+        with SitemapWriter(filename, base_url=base_url) as writer:
+            writer.add_all(urls)
         return filename
     
+    def _ping_service_urls(self, url: str) -> List[str]:
+        """List of ping services for a URL"""
+        return [service.format(url=quote(url)) for service in self.endpoints["ping_services"]]
+    
+    def _ping_breaker(self, ping_url: str) -> CircuitBreaker:
+        """Circuit breaker for the service behind a ping URL (one per host)"""
+        return self.ping_health.breaker(urlparse(ping_url).netloc)
+    
+    def _circuit_open(self, breaker: CircuitBreaker) -> Dict:
+        """Result fields for a ping skipped because its service is unhealthy"""
+        metrics.circuit_skipped(breaker.name)
+        return {
+            "status": "skipped",
+            "message": f"circuit open: {breaker.name} is failing, skipped until it recovers"
+        }
+    
+    def _record_ping(self, breaker: CircuitBreaker, result: Dict):
+        if result["status"] == "success":
+            breaker.record_success()
+        else:
+            breaker.record_failure(result.get("error") or f"HTTP {result.get('status_code')}")
+    
+    def ping_service_health(self) -> Dict[str, Dict]:
+        """Circuit breaker state of every ping service, keyed by host"""
+        for service in self._ping_service_urls(""):
+            self._ping_breaker(service)
+        return self.ping_health.snapshot()
+    
     def ping_external_services(self, url: str) -> List[Dict]:
         """
         Ping multiple external indexing services
-        Increases chances of discovery
+        Increases chances of discovery; services whose circuit is open are
+        skipped immediately instead of waiting out their timeout
         """
         results = []
         
-        # List of ping services
-        services = [
-            f"https://www.google.com/ping?sitemap={quote(url)}",
-            f"https://www.bing.com/ping?sitemap={quote(url)}",
-            f"https://submissions.ask.com/ping?sitemap={quote(url)}",
-        ]
-        
-        for service in services:
+        for service in self._ping_service_urls(url):
+            breaker = self._ping_breaker(service)
+            if not breaker.allow():
+                results.append(dict(self._circuit_open(breaker), service=service))
+                continue
+            result = None
             try:
-                response = requests.get(service, timeout=5)
-                results.append({
+                response = self.transport.get(service, timeout=5, channel=CHANNEL_PINGS)
+                result = {
                     "service": service,
                     "status": "success" if response.status_code == 200 else "failed",
                     "status_code": response.status_code
-                })
+                }
             except Exception as e:
-                results.append({
+                result = {
                     "service": service,
                     "status": "failed",
                     "error": str(e)
-                })
+                }
+            finally:
+                if result is None:
+                    # Interrupted mid-call: no verdict, so free a half-open probe
+                    breaker.release()
+            self._record_ping(breaker, result)
+            results.append(result)
         
         return results
     
-    def check_indexing_status(self, url: str) -> Dict:
+    def _batch_pings_enabled(self, batch_pings: bool) -> bool:
         """
-        Check if URL is indexed on Google
+        Whether bulk runs can ping batch sitemaps: they are only fetchable
+        where sitemap_base_url serves sitemap_dir, so without one every URL
+        is pinged on its own
+        """
+        return batch_pings and bool(self.sitemap_base_url)
+    
+    def prune_batch_sitemaps(self, max_age: float = BATCH_SITEMAP_MAX_AGE) -> int:
+        """
+        Delete batch sitemaps older than max_age from sitemap_dir
+        Returns: Number of files deleted
+        """
+        cutoff = time.time() - max_age
+        deleted = 0
+        try:
+            entries = list(os.scandir(self.sitemap_dir))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            if not BATCH_SITEMAP_NAME.match(entry.name):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    deleted += 1
+            except FileNotFoundError:
+                # Another run pruned it first
+                continue
+        return deleted
+    
+    def plan_sitemap_batches(self, urls: List[str]) -> List[Dict]:
+        """
+        Group URLs by host and write one sitemap per group
+        Each plan gets its own file names, so neither later chunks nor
+        concurrent runs replace a sitemap before crawlers fetch it; files
+        older than BATCH_SITEMAP_MAX_AGE are pruned as each plan is written.
+        Needs sitemap_base_url; without it, bulk runs ping per URL instead
+        (see _batch_pings_enabled)
+        Returns: One batch per sitemap, with the URLs it covers
+        """
+        if not self.sitemap_base_url:
+            raise ValueError("sitemap batches need a sitemap_base_url that serves sitemap_dir")
+        plan_id = f"{datetime.now():%Y%m%d%H%M%S}_{uuid.uuid4().hex[:6]}"
+        groups = {}
+        for url in urls:
+            groups.setdefault(urlparse(url).netloc, []).append(url)
+        
+        os.makedirs(self.sitemap_dir, exist_ok=True)
+        self.prune_batch_sitemaps()
+        base_url = self.sitemap_base_url.rstrip('/')
+        batches = []
+        for host, host_urls in groups.items():
+            filename = f"sitemap_{host.replace(':', '_') or 'unknown'}_{plan_id}.xml"
+            sitemap_file = self.create_dynamic_sitemap(
+                host_urls, os.path.join(self.sitemap_dir, filename), base_url=base_url
+            )
+            batches.append({
+                "batch_id": f"sitemap-{len(batches) + 1}",
+                "host": host,
+                "sitemap_file": sitemap_file,
+                "sitemap_url": f"{base_url}/{filename}",
+                "urls": host_urls
+            })
+        return batches
+    
+    def _attach_batch_pings(self, batches: List[Dict], ping_results: List[List[Dict]]) -> Dict[str, List[Dict]]:
+        """Map each URL to the ping results of the batch sitemap that covered it"""
+        pings_by_url = {}
+        for batch, results in zip(batches, ping_results):
+            traced = [
+                dict(r, batch_id=batch["batch_id"], sitemap_url=batch["sitemap_url"])
+                for r in results
+            ]
+            for url in batch["urls"]:
+                pings_by_url[url] = traced
+        return pings_by_url
+    
+    def ping_sitemap_batches(self, batches: List[Dict], max_workers: int = 10) -> Dict[str, List[Dict]]:
+        """
+        Ping every external service once per batch sitemap
+        Returns: Ping results keyed by the URLs each batch covered
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            ping_results = list(executor.map(
+                lambda batch: self.ping_external_services(batch["sitemap_url"]), batches
+            ))
+        return self._attach_batch_pings(batches, ping_results)
+    
+    def plan_indexnow_chunks(self, urls: List[str], chunk_size: int = INDEXNOW_MAX_URLS) -> List[Dict]:
+        """
+        Group URLs by host and cut each group into protocol-sized chunks
+        IndexNow requires every URL in a request to share the request's host
+        """
+        groups = {}
+        for url in urls:
+            groups.setdefault(urlparse(url).netloc, []).append(url)
+        
+        chunk_size = min(chunk_size, INDEXNOW_MAX_URLS)
+        chunks = []
+        for host, host_urls in groups.items():
+            for start in range(0, len(host_urls), chunk_size):
+                chunks.append({
+                    "chunk_id": f"indexnow-{len(chunks) + 1}",
+                    "host": host,
+                    "urls": host_urls[start:start + chunk_size]
+                })
+        return chunks
+    
+    def _attach_indexnow_results(self, chunks: List[Dict], chunk_results: List[Dict]) -> Dict[str, List[Dict]]:
+        """Map each URL to the IndexNow request that carried it"""
+        results_by_url = {}
+        for chunk, result in zip(chunks, chunk_results):
+            traced = {k: v for k, v in result.items() if k != "urls"}
+            traced.update(chunk_id=chunk["chunk_id"], chunk_size=len(chunk["urls"]))
+            for url in chunk["urls"]:
+                results_by_url[url] = [traced]
+        return results_by_url
+    
+    def submit_indexnow_chunks(self, chunks: List[Dict], max_workers: int = 10) -> Dict[str, List[Dict]]:
+        """
+        Send IndexNow chunks in parallel
+        Returns: IndexNow results keyed by the URLs each chunk covered
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            chunk_results = list(executor.map(
+                lambda chunk: self.index_via_indexnow(
+                    chunk["urls"], chunk["host"], self.indexnow_key, compress=self.indexnow_gzip
+                ),
+                chunks
+            ))
+        return self._attach_indexnow_results(chunks, chunk_results)
+    
+    def _merge_batch_results(self, *results_by_url: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
+        """Combine per-URL results from several batch channels"""
+        merged = {}
+        for channel in results_by_url:
+            for url, results in channel.items():
+                merged.setdefault(url, []).extend(results)
+        return merged
+    
+    def _due(self, due: Optional[Dict[str, set]], channel: str, urls: List[str]) -> List[str]:
+        """URLs that still need submitting through a channel"""
+        if due is None:
+            return urls
+        return [url for url in urls if url in due[channel]]
+    
+    def run_batch_channels(self, urls: List[str], max_workers: int = 10,
+                           batch_pings: bool = True, batch_google_api: bool = True,
+                           due: Optional[Dict[str, set]] = None) -> Dict[str, List[Dict]]:
         """
+        Run the batched methods (Google API batches, IndexNow chunks,
+        sitemap pings) for a URL set
+        Returns: Batch results keyed by URL, ready to add to methods_used
+        """
+        channels = []
+        if self.indexing_service and batch_google_api:
+            google_urls = self._due(due, CHANNEL_GOOGLE_API, urls)
+            channels.append(self.submit_google_api_batches(google_urls, max_workers=max_workers))
+        if self.indexnow_key:
+            indexnow_urls = self._due(due, CHANNEL_INDEXNOW, urls)
+            chunks = self.plan_indexnow_chunks(indexnow_urls)
+            print(f"Planned {len(chunks)} IndexNow requests for {len(indexnow_urls)} URLs")
+            channels.append(self.submit_indexnow_chunks(chunks, max_workers=max_workers))
+        if self._batch_pings_enabled(batch_pings):
+            ping_urls = self._due(due, CHANNEL_PINGS, urls)
+            batches = self.plan_sitemap_batches(ping_urls)
+            self._batch_ping_summary(batches, len(ping_urls))
+            channels.append(self.ping_sitemap_batches(batches, max_workers=max_workers))
+        return self._merge_batch_results(*channels)
+    
+    def _status_search(self, url: str):
+        """(search URL, headers) for a site: query on url"""
         search_query = f"site:{url}"
-        search_url = f"https://www.google.com/search?q={quote(search_query)}"
+        search_url = self.endpoints["search"].format(query=quote(search_query))
         
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
-        
+        return search_url, headers
+    
+    def _status_result(self, url: str, status_code: int, text: str) -> Dict:
+        """Result dict for a site: search response"""
+        # Only links on the results page count, not any mention of the URL
+        is_indexed = parse_indexed(text, url) if status_code == 200 else None
+        result = {
+            "url": url,
+            "indexed": "unknown" if is_indexed is None else is_indexed,
+            "timestamp": datetime.now().isoformat()
+        }
+        if is_indexed is None:
+            result["error"] = f"search blocked or unavailable (HTTP {status_code})"
+        return result
+    
+    def _fetch_indexing_status(self, url: str) -> Dict:
+        search_url, headers = self._status_search(url)
         try:
-            response = requests.get(search_url, headers=headers, timeout=10)
-            # Simple check - if the URL appears in results
-            is_indexed = url in response.text
-            return {
-                "url": url,
-                "indexed": is_indexed,
-                "timestamp": datetime.now().isoformat()
-            }
+            response = self.transport.get(search_url, headers=headers, timeout=10,
+                                          channel=CHANNEL_STATUS_CHECK)
+            return self._status_result(url, response.status_code, response.text)
         except Exception as e:
             return {
                 "url": url,
@@ -217,7 +731,23 @@ class GoogleInstantIndexer:
                 "timestamp": datetime.now().isoformat()
             }
     
-    def rapid_index_single_url(self, url: str, use_all_methods: bool = True) -> Dict:
+    def check_indexing_status(self, url: str, force: bool = False) -> Dict:
+        """
+        Check if URL is indexed on Google
+        Answers come from the status cache while fresh (force=True skips it);
+        concurrent checks of the same URL share one search
+        """
+        return self.status_checker.check(url, self._fetch_indexing_status, force=force)
+    
+    def check_indexing_statuses(self, urls: List[str], force: bool = False) -> List[Dict]:
+        """
+        Check many URLs: cached answers at once, the rest searched in parallel
+        (status_checker.max_concurrency at a time)
+        """
+        return self.status_checker.check_many(urls, self._fetch_indexing_status, force=force)
+    
+    def rapid_index_single_url(self, url: str, use_all_methods: bool = True,
+                               use_google_api: bool = True) -> Dict:
         """
         Rapidly index a single URL using all available methods
         """
@@ -228,7 +758,7 @@ class GoogleInstantIndexer:
         }
         
         # Method 1: Google Indexing API (if available)
-        if self.indexing_service:
+        if self.indexing_service and use_google_api:
             api_result = self.index_via_google_api(url)
             results["methods_used"].append(api_result)
         
@@ -239,41 +769,728 @@ class GoogleInstantIndexer:
         
         return results
     
-    def rapid_index_bulk(self, urls: List[str], max_workers: int = 10) -> List[Dict]:
+    def _batch_ping_summary(self, batches: List[Dict], url_count: int):
+        """Report how many pings the batch plan saves"""
+        services = len(self._ping_service_urls(""))
+        print(f"Planned {len(batches)} sitemap batches: "
+              f"{len(batches) * services} pings instead of {url_count * services}")
+    
+    def _active_channels(self) -> List[str]:
+        """Channels a bulk run submits through with the current configuration"""
+        channels = [CHANNEL_PINGS]
+        if self.indexing_service:
+            channels.append(CHANNEL_GOOGLE_API)
+        if self.indexnow_key:
+            channels.append(CHANNEL_INDEXNOW)
+        return channels
+    
+    def _filter_urls(self, urls: List[str], url_filter: URLFilter):
+        """
+        Normalize URLs and drop the ones url_filter has already seen
+        Returns: (URLs to submit, failed results for invalid URLs, duplicates dropped)
+        """
+        duplicates = url_filter.duplicates
+        timestamp = datetime.now().isoformat()
+        kept = []
+        invalid = []
+        for url in urls:
+            normalized, error = url_filter.check(url)
+            if normalized is not None:
+                kept.append(normalized)
+            elif error is not None:
+                invalid.append({
+                    "url": url,
+                    "timestamp": timestamp,
+                    "status": "failed",
+                    "error": error,
+                    "methods_used": []
+                })
+        duplicates = url_filter.duplicates - duplicates
+        if duplicates or invalid:
+            print(f"Dedupe: dropped {duplicates} duplicate and {len(invalid)} invalid URLs")
+        return kept, invalid, duplicates
+    
+    def _priority_lookup(self, priorities: Optional[Dict[str, Priority]], dedupe: bool) -> Dict[str, Priority]:
+        """priorities keyed by canonical URL, so they match the URLs dedupe submits"""
+        lookup = {}
+        for url, priority in (priorities or {}).items():
+            try:
+                lookup[canonical_key(normalize_url(url) if dedupe else url)] = priority
+            except InvalidURL:
+                continue
+        return lookup
+    
+    def _plan_routes(self, urls: List[str], due: Optional[Dict[str, set]], batch_pings: bool,
+                     priorities: Dict[str, Priority]):
+        """
+        Route URLs through the router: the Google API quota left today goes
+        to the highest priorities, everything else only rides the batches
+        Returns: (due URLs per channel, route per URL)
+        """
+        scarce = {}
+        if self.indexing_service:
+            scarce[CHANNEL_GOOGLE_API] = self.google_quota.remaining()["daily"]
+        batched = {}
+        if self.indexnow_key:
+            batched[CHANNEL_INDEXNOW] = "batched: host-grouped IndexNow chunk"
+        batched[CHANNEL_PINGS] = "batched: one sitemap ping per host" if batch_pings else "pinged per URL"
+        
+        url_priorities = {}
+        if priorities:
+            for url in urls:
+                priority = priorities.get(canonical_key(url))
+                if priority is not None:
+                    url_priorities[url] = priority
+        routes = self.router.plan(urls, scarce, batched, due=due, priorities=url_priorities)
+        routed = {channel: set() for channel in self._active_channels()}
+        for url, route in routes.items():
+            for channel in route["channels"]:
+                routed[channel].add(url)
+        
+        self.last_job_report["routed"] = self.router.summary(routes)
+        if CHANNEL_GOOGLE_API in scarce:
+            print(f"Router: {len(routed[CHANNEL_GOOGLE_API])} of {len(urls)} URLs get the Google API "
+                  f"({scarce[CHANNEL_GOOGLE_API]} calls left today); the rest go batched only")
+        return routed, routes
+    
+    def _start_job(self, urls: List[str], skip_fresh: bool, url_filter: Optional[URLFilter] = None,
+                   batch_pings: bool = True, priorities: Optional[Dict[str, Priority]] = None):
+        """
+        Normalize and dedupe URLs (with a url_filter), check the ledger, then
+        route each URL (see _plan_routes) before a bulk run
+        priorities come from _priority_lookup
+        Returns: (due URLs per channel, results for invalid or fully skipped
+                  URLs, URLs left to submit, route per URL)
+        """
+        total = len(urls)
+        invalid = []
+        duplicates = 0
+        if url_filter is not None:
+            urls, invalid, duplicates = self._filter_urls(urls, url_filter)
+        self.last_job_report = {"total": total, "submitted": len(urls), "skipped_fresh": 0,
+                                "duplicates": duplicates, "invalid": len(invalid)}
+        if not (self.ledger and skip_fresh):
+            due, routes = self._plan_routes(urls, None, batch_pings, priorities)
+            return due, invalid, urls, routes
+        
+        due = {}
+        for channel in self._active_channels():
+            fresh = self.ledger.fresh_urls(urls, channel)
+            due[channel] = {url for url in urls if url not in fresh}
+        still_due = set().union(*due.values())
+        
+        skipped = []
+        remaining = []
+        timestamp = datetime.now().isoformat()
+        for url in urls:
+            if url in still_due:
+                remaining.append(url)
+            else:
+                skipped.append({
+                    "url": url,
+                    "timestamp": timestamp,
+                    "status": "skipped",
+                    "message": "recently submitted (ledger)",
+                    "methods_used": []
+                })
+        
+        self.last_job_report.update(
+            submitted=len(remaining),
+            skipped_fresh=len(skipped),
+            skipped_by_method={channel: len(urls) - len(pending) for channel, pending in due.items()}
+        )
+        print(f"Ledger: skipping {len(skipped)} of {len(urls)} URLs submitted within the last "
+              f"{self.ledger.ttl / 3600:g}h")
+        due, routes = self._plan_routes(remaining, due, batch_pings, priorities)
+        return due, invalid + skipped, remaining, routes
+    
+    def _ledger_entries(self, result: Dict):
+        """(url, channel, status) rows for one URL's result"""
+        outcomes = {}
+        for method in result.get("methods_used", []):
+            if "service" in method:
+                channel = CHANNEL_PINGS
+            elif method.get("method") in ("Google Indexing API", "Google API"):
+                channel = CHANNEL_GOOGLE_API
+            elif method.get("method") == "IndexNow API":
+                channel = CHANNEL_INDEXNOW
+            else:
+                continue
+            # Deferred and circuit-skipped calls never went out, so they are not submissions
+            if method.get("status") in ("deferred", "skipped"):
+                continue
+            if outcomes.get(channel) != "success":
+                outcomes[channel] = method.get("status", "failed")
+        return [(result["url"], channel, status) for channel, status in outcomes.items()]
+    
+    def _record_submissions(self, results: List[Dict]):
+        """Write completed results to the ledger"""
+        if self.ledger and results:
+            self.ledger.record(entry for result in results for entry in self._ledger_entries(result))
+    
+    def _attach_route(self, result: Dict, route: Optional[Dict]) -> Dict:
+        """Add a URL's route to its result, with a deferred entry for each call the router held back"""
+        if route is not None:
+            if CHANNEL_GOOGLE_API in route["deferred"]:
+                result["methods_used"].append(self._quota_deferred(result["url"]))
+            result["route"] = route
+        return result
+    
+    def _emit_result(self, result: Dict, all_results: List[Dict], keep_results: bool,
+                     sink: Optional[ResultSink], on_result: Optional[Callable[[Dict], None]]):
+        """Hand one completed result to the sink, the callback and the result list"""
+        metrics.url_finished(result)
+        if keep_results:
+            all_results.append(result)
+        if sink is not None:
+            sink.write(result)
+        if on_result:
+            on_result(result)
+    
+    def _iter_bulk(self, urls: List[str], executor: concurrent.futures.Executor, max_workers: int,
+                   window: int, batch_pings: bool, batch_google_api: bool,
+                   skip_fresh: bool, url_filter: Optional[URLFilter] = None,
+                   priorities: Optional[Dict[str, Priority]] = None) -> Iterator[Dict]:
+        """
+        Index one list of URLs on executor, yielding each result as it completes
+        At most window per-URL tasks are in flight; the next URL is only
+        submitted once an earlier one has finished
+        """
+        batch_pings = self._batch_pings_enabled(batch_pings)
+        due, skipped, urls, routes = self._start_job(urls, skip_fresh, url_filter, batch_pings, priorities)
+        yield from skipped
+        
+        batch_results = self.run_batch_channels(urls, max_workers=max_workers, batch_pings=batch_pings,
+                                                batch_google_api=batch_google_api, due=due)
+        
+        def index_one(url):
+            result = self.rapid_index_single_url(
+                url,
+                use_all_methods=not batch_pings and url in due[CHANNEL_PINGS],
+                use_google_api=not batch_google_api and url in due.get(CHANNEL_GOOGLE_API, ())
+            )
+            result["methods_used"].extend(batch_results.pop(url, []))
+            return self._attach_route(result, routes.get(url))
+        
+        def finished(done):
+            for future in done:
+                url = in_flight.pop(future)
+                try:
+                    result = future.result()
+                    pending.append(result)
+                    print(f"✓ Processed: {url}")
+                except Exception as e:
+                    print(f"✗ Failed: {url} - {e}")
+                    result = {
+                        "url": url,
+                        "status": "failed",
+                        "error": str(e)
+                    }
+                yield result
+            if len(pending) >= LEDGER_FLUSH_EVERY:
+                self._record_submissions(pending)
+                pending.clear()
+        
+        in_flight = {}
+        pending = []
+        for url in urls:
+            if len(in_flight) >= window:
+                done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                yield from finished(done)
+            in_flight[executor.submit(index_one, url)] = url
+        while in_flight:
+            done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+            yield from finished(done)
+        
+        self._record_submissions(pending)
+    
+    def rapid_index_bulk(self, urls: List[str], max_workers: int = 10,
+                         batch_pings: bool = True, batch_google_api: bool = True,
+                         skip_fresh: bool = True,
+                         on_result: Optional[Callable[[Dict], None]] = None,
+                         sink: Optional[ResultSink] = None, keep_results: bool = True,
+                         dedupe: bool = True, priorities: Optional[Dict[str, Priority]] = None) -> List[Dict]:
         """
         Index multiple URLs in parallel for speed
         Supports: PDF, HTML, Forum, Web 2.0, Tier 1/2/3 backlinks
+        
+        With batch_pings and a sitemap_base_url, URLs are grouped into one
+        sitemap per host and each ping service is hit once per sitemap instead
+        of once per URL.
+        With an indexnow_key, URLs also go out as host-grouped IndexNow chunks.
+        With batch_google_api, Google API calls are grouped into batch requests
+        and stop early ("quota deferred") once the quota bucket is empty.
+        With dedupe, URLs are normalized first (see url_normalizer), duplicate
+        variants of a page are dropped and invalid URLs fail without a request.
+        With a ledger and skip_fresh, URLs submitted within the ledger TTL are
+        skipped per method; see last_job_report for the counts.
+        The router then picks each URL's methods: the Google API quota left
+        today goes to the highest priorities (priorities maps URLs to 0-10 or
+        to tags, see MethodRouter), every URL rides the batched channels, and
+        each result's "route" says which methods it got and why.
+        on_result is called with each URL's result as soon as it completes,
+        and a sink receives it at the same moment. With keep_results=False
+        nothing is accumulated and an empty list is returned.
+        For inputs too large to hold in memory, use rapid_index_stream.
         """
-        all_results = []
+        self.transport.ensure_pool_size(max_workers)
         
         print(f"Starting bulk indexing for {len(urls)} URLs...")
         
+        all_results = []
         with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_url = {
-                executor.submit(self.rapid_index_single_url, url): url 
-                for url in urls
-            }
+            for result in self._iter_bulk(urls, executor, max_workers, max_workers * STREAM_WINDOW_PER_WORKER,
+                                          batch_pings, batch_google_api, skip_fresh,
+                                          URLFilter() if dedupe else None,
+                                          self._priority_lookup(priorities, dedupe)):
+                self._emit_result(result, all_results, keep_results, sink, on_result)
+        return all_results
+    
+    def rapid_index_stream(self, urls: Iterable[str], max_workers: int = 10,
+                           window: Optional[int] = None, chunk_size: int = STREAM_CHUNK_SIZE,
+                           batch_pings: bool = True, batch_google_api: bool = True,
+                           skip_fresh: bool = True,
+                           sink: Optional[ResultSink] = None, dedupe: bool = True,
+                           dedupe_capacity: int = STREAM_DEDUPE_CAPACITY,
+                           priorities: Optional[Dict[str, Priority]] = None) -> Iterator[Dict]:
+        """
+        Index URLs from any iterable, yielding results as they complete
+        
+        URLs are pulled lazily, chunk_size at a time (e.g. lines of a file or
+        stdin; see iter_url_lines). Each chunk goes through the batch channels
+        and the ledger like a rapid_index_bulk run, then at most window per-URL
+        tasks (default: 4 per worker) are kept in flight. The input is only
+        read further once the caller has consumed earlier results, so memory
+        follows chunk_size and window rather than the input size.
+        With dedupe, duplicates are dropped across the whole stream by a
+        Bloom filter sized for dedupe_capacity URLs, so memory stays fixed; a
+        unique URL is wrongly dropped about once per thousand at capacity.
+        Routing (see rapid_index_bulk) is planned per chunk, so the Google API
+        quota goes to the highest priorities of the earliest chunks.
+        last_job_report covers every chunk read so far.
+        """
+        window = window or max_workers * STREAM_WINDOW_PER_WORKER
+        self.transport.ensure_pool_size(max_workers)
+        
+        report = {"total": 0, "submitted": 0, "skipped_fresh": 0, "duplicates": 0, "invalid": 0}
+        url_filter = URLFilter(capacity=dedupe_capacity) if dedupe else None
+        priorities = self._priority_lookup(priorities, dedupe)
+        self.last_job_report = dict(report)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            iterator = iter(urls)
+            chunk_number = 0
+            while True:
+                chunk = list(itertools.islice(iterator, chunk_size))
+                if not chunk:
+                    break
+                chunk_number += 1
+                print(f"Streaming chunk {chunk_number}: {len(chunk)} URLs "
+                      f"({report['total'] + len(chunk)} read so far)...")
+                
+                for result in self._iter_bulk(chunk, executor, max_workers, window,
+                                              batch_pings, batch_google_api, skip_fresh, url_filter,
+                                              priorities):
+                    metrics.url_finished(result)
+                    if sink is not None:
+                        sink.write(result)
+                    yield result
+                
+                for key in ("total", "submitted", "skipped_fresh", "duplicates", "invalid"):
+                    report[key] += self.last_job_report.get(key, 0)
+                for key in ("skipped_by_method", "routed"):
+                    for channel, count in self.last_job_report.get(key, {}).items():
+                        by_method = report.setdefault(key, {})
+                        by_method[channel] = by_method.get(channel, 0) + count
+                self.last_job_report = dict(report)
+    
+    def start_job(self, urls: Iterable[str], job_id: Optional[str] = None,
+                  checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR, **options) -> str:
+        """
+        Register a resumable job and return its id; run it with resume(job_id)
+        The URLs (any iterable, e.g. iter_url_lines) are written to
+        checkpoint_dir once. options are rapid_index_stream arguments
+        (max_workers, batch_pings, ...) kept for every run of the job
+        """
+        checkpoint = JobCheckpoint.create(urls, checkpoint_dir, job_id=job_id, options=options)
+        print(f"Job {checkpoint.job_id}: {checkpoint.url_count} URLs checkpointed in {checkpoint_dir}")
+        return checkpoint.job_id
+    
+    def resume(self, job_id: str, checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR) -> Iterator[Dict]:
+        """
+        Run a job started with start_job, skipping URLs that already have a
+        checkpointed result, and yield this run's results as they complete
+        Results are checkpointed as they arrive, so a crash or Ctrl+C at any
+        point loses at most a few hundred URLs of progress
+        """
+        checkpoint = JobCheckpoint.load(job_id, checkpoint_dir)
+        done = checkpoint.done_keys()
+        print(f"Job {job_id}: {len(done)} of {checkpoint.url_count} URLs already done")
+        try:
+            yield from self.rapid_index_stream(checkpoint.pending_urls(done), sink=checkpoint,
+                                               **checkpoint.options)
+            checkpoint.finish()
+        finally:
+            checkpoint.close()
+    
+    def index_sitemap(self, source: str, state_path: str = DEFAULT_SITEMAP_STATE,
+                      sitemap_filename: Optional[str] = None, sitemap_base_url: Optional[str] = None,
+                      **options) -> Iterator[Dict]:
+        """
+        Index the URLs of a sitemap (or sitemap index) that are new or whose
+        lastmod changed since the last run, yielding results as they complete
+        
+        source is a path or URL, plain or gzipped, parsed incrementally (see
+        sitemap_reader). Each <loc>/<lastmod> is checked against the state in
+        state_path, and only new or changed URLs go to rapid_index_stream
+        (options are its arguments). With sitemap_filename they are also
+        written to a sitemap of their own, as create_dynamic_sitemap would.
+        Only URLs whose result succeeded (or that the ledger skipped as fresh)
+        are saved to the state, so failed, circuit-skipped or unreached URLs
+        are submitted again by the next run, even if interrupted;
+        last_job_report["sitemap"] has the seen/new/changed/saved counts
+        """
+        state = SitemapState(state_path)
+        writer = SitemapWriter(sitemap_filename, base_url=sitemap_base_url) if sitemap_filename else None
+        
+        def changed_urls():
+            for url, lastmod in state.diff(iter_sitemap(source, self.transport)):
+                if writer is not None:
+                    writer.add(url, lastmod)
+                yield url
+        
+        print(f"Reading sitemap {source} (changes since the last run only)")
+        try:
+            for result in self.rapid_index_stream(changed_urls(), **options):
+                if result_outcome(result) == "failed":
+                    state.forget(result["url"])
+                else:
+                    state.save(result["url"])
+                yield result
+        finally:
+            if writer is not None:
+                writer.close()
+            state.commit()
+            state.close()
+        report = state.report()
+        self.last_job_report["sitemap"] = report
+        print(f"Sitemap: {report['seen']} URLs, {report['new']} new, {report['changed']} changed, "
+              f"{report['unchanged']} unchanged, {report['saved']} saved as submitted")
+    
+    # ------------------------------------------------------------------
+    # Async engine: same methods and result dicts, one event loop
+    # ------------------------------------------------------------------
+    
+    @asynccontextmanager
+    async def _async_session(self, session: Optional[aiohttp.ClientSession] = None,
+                             limit: Optional[int] = None):
+        """Reuse the caller's session or open a temporary one from the transport"""
+        if session is not None:
+            yield session
+            return
+        async with self.transport.async_session(limit=limit) as new_session:
+            yield new_session
+    
+    async def index_via_indexnow_async(self, urls: List[str], host: str, api_key: str,
+                                       compress: bool = False,
+                                       session: Optional[aiohttp.ClientSession] = None) -> Dict:
+        """
+        Async version of index_via_indexnow
+        """
+        try:
+            async with self._async_session(session) as s:
+                response = await self.transport.async_request(
+                    s, "POST", self.endpoints["indexnow"], channel=CHANNEL_INDEXNOW,
+                    **self._indexnow_request(urls, host, api_key, compress)
+                )
+            status_code = response.status
             
-            for future in concurrent.futures.as_completed(future_to_url):
-                url = future_to_url[future]
+            return {
+                "method": "IndexNow API",
+                "urls": urls,
+                "status": "success" if status_code in (200, 202) else "failed",
+                "status_code": status_code,
+                "timestamp": datetime.now().isoformat()
+            }
+        except Exception as e:
+            return {
+                "method": "IndexNow API",
+                "urls": urls,
+                "status": "failed",
+                "error": str(e),
+                "timestamp": datetime.now().isoformat()
+            }
+    
+    async def ping_sitemap_async(self, sitemap_url: str,
+                                 session: Optional[aiohttp.ClientSession] = None) -> Dict:
+        """
+        Async version of ping_sitemap
+        """
+        ping_url = self.endpoints["sitemap_ping"].format(url=quote(sitemap_url))
+        breaker = self._ping_breaker(ping_url)
+        if not breaker.allow():
+            return dict(self._circuit_open(breaker), method="Sitemap Ping", sitemap_url=sitemap_url,
+                        timestamp=datetime.now().isoformat())
+        
+        result = None
+        try:
+            async with self._async_session(session) as s:
+                response = await self.transport.async_request(
+                    s, "GET", ping_url, timeout=aiohttp.ClientTimeout(total=10), channel=CHANNEL_PINGS
+                )
+            status_code = response.status
+            result = {
+                "method": "Sitemap Ping",
+                "sitemap_url": sitemap_url,
+                "status": "success" if status_code == 200 else "failed",
+                "status_code": status_code,
+                "timestamp": datetime.now().isoformat()
+            }
+        except Exception as e:
+            result = {
+                "method": "Sitemap Ping",
+                "sitemap_url": sitemap_url,
+                "status": "failed",
+                "error": str(e),
+                "timestamp": datetime.now().isoformat()
+            }
+        finally:
+            if result is None:
+                # Cancelled or interrupted mid-call: no verdict, so free a half-open probe
+                breaker.release()
+        self._record_ping(breaker, result)
+        return result
+    
+    async def _ping_service_async(self, session: aiohttp.ClientSession, service: str) -> Dict:
+        """Ping one external service, unless its circuit is open"""
+        breaker = self._ping_breaker(service)
+        if not breaker.allow():
+            return dict(self._circuit_open(breaker), service=service)
+        result = None
+        try:
+            response = await self.transport.async_request(
+                session, "GET", service, timeout=aiohttp.ClientTimeout(total=5), channel=CHANNEL_PINGS
+            )
+            result = {
+                "service": service,
+                "status": "success" if response.status == 200 else "failed",
+                "status_code": response.status
+            }
+        except Exception as e:
+            result = {
+                "service": service,
+                "status": "failed",
+                "error": str(e) or type(e).__name__
+            }
+        finally:
+            if result is None:
+                # Cancelled mid-call: no verdict, so free a half-open probe
+                breaker.release()
+        self._record_ping(breaker, result)
+        return result
+    
+    async def ping_external_services_async(self, url: str,
+                                           session: Optional[aiohttp.ClientSession] = None) -> List[Dict]:
+        """
+        Async version of ping_external_services
+        All services are pinged concurrently
+        """
+        async with self._async_session(session) as s:
+            return list(await asyncio.gather(
+                *(self._ping_service_async(s, service) for service in self._ping_service_urls(url))
+            ))
+    
+    async def _fetch_indexing_status_async(self, url: str,
+                                           session: Optional[aiohttp.ClientSession] = None) -> Dict:
+        search_url, headers = self._status_search(url)
+        try:
+            async with self._async_session(session) as s:
+                response = await self.transport.async_request(
+                    s, "GET", search_url, headers=headers, timeout=aiohttp.ClientTimeout(total=10),
+                    channel=CHANNEL_STATUS_CHECK
+                )
+                text = await response.text()
+            return self._status_result(url, response.status, text)
+        except Exception as e:
+            return {
+                "url": url,
+                "indexed": "unknown",
+                "error": str(e),
+                "timestamp": datetime.now().isoformat()
+            }
+    
+    async def check_indexing_status_async(self, url: str, force: bool = False,
+                                          session: Optional[aiohttp.ClientSession] = None) -> Dict:
+        """
+        Async version of check_indexing_status
+        Shares the status cache; concurrent checks of the same URL share one search
+        """
+        return await self.status_checker.check_async(
+            url, lambda u: self._fetch_indexing_status_async(u, session), force=force
+        )
+    
+    async def check_indexing_statuses_async(self, urls: List[str], force: bool = False,
+                                            session: Optional[aiohttp.ClientSession] = None) -> List[Dict]:
+        """Async version of check_indexing_statuses; the searches share one session"""
+        async with self._async_session(session) as s:
+            return await self.status_checker.check_many_async(
+                urls, lambda u: self._fetch_indexing_status_async(u, s), force=force
+            )
+    
+    async def rapid_index_single_url_async(self, url: str, use_all_methods: bool = True,
+                                           use_google_api: bool = True,
+                                           session: Optional[aiohttp.ClientSession] = None) -> Dict:
+        """
+        Async version of rapid_index_single_url
+        """
+        results = {
+            "url": url,
+            "timestamp": datetime.now().isoformat(),
+            "methods_used": []
+        }
+        
+        # Method 1: Google Indexing API (if available)
+        # The client library is blocking, so it runs in a worker thread
+        if self.indexing_service and use_google_api:
+            api_result = await asyncio.to_thread(self.index_via_google_api, url)
+            results["methods_used"].append(api_result)
+        
+        # Method 2: External pings
+        if use_all_methods:
+            ping_results = await self.ping_external_services_async(url, session=session)
+            results["methods_used"].extend(ping_results)
+        
+        return results
+    
+    async def ping_sitemap_batches_async(self, batches: List[Dict],
+                                         session: Optional[aiohttp.ClientSession] = None) -> Dict[str, List[Dict]]:
+        """
+        Async version of ping_sitemap_batches
+        """
+        async with self._async_session(session) as s:
+            ping_results = await asyncio.gather(
+                *(self.ping_external_services_async(batch["sitemap_url"], session=s) for batch in batches)
+            )
+        return self._attach_batch_pings(batches, ping_results)
+    
+    async def submit_indexnow_chunks_async(self, chunks: List[Dict],
+                                           session: Optional[aiohttp.ClientSession] = None) -> Dict[str, List[Dict]]:
+        """
+        Async version of submit_indexnow_chunks
+        """
+        async with self._async_session(session) as s:
+            chunk_results = await asyncio.gather(
+                *(self.index_via_indexnow_async(chunk["urls"], chunk["host"], self.indexnow_key,
+                                                compress=self.indexnow_gzip, session=s)
+                  for chunk in chunks)
+            )
+        return self._attach_indexnow_results(chunks, chunk_results)
+    
+    async def run_batch_channels_async(self, urls: List[str], batch_pings: bool = True,
+                                       batch_google_api: bool = True,
+                                       due: Optional[Dict[str, set]] = None,
+                                       session: Optional[aiohttp.ClientSession] = None) -> Dict[str, List[Dict]]:
+        """
+        Async version of run_batch_channels; the channels run concurrently
+        """
+        channels = []
+        if self.indexing_service and batch_google_api:
+            # The client library is blocking, so batches go out from worker threads
+            google_urls = self._due(due, CHANNEL_GOOGLE_API, urls)
+            channels.append(asyncio.to_thread(self.submit_google_api_batches, google_urls))
+        if self.indexnow_key:
+            indexnow_urls = self._due(due, CHANNEL_INDEXNOW, urls)
+            chunks = self.plan_indexnow_chunks(indexnow_urls)
+            print(f"Planned {len(chunks)} IndexNow requests for {len(indexnow_urls)} URLs")
+            channels.append(self.submit_indexnow_chunks_async(chunks, session=session))
+        if self._batch_pings_enabled(batch_pings):
+            # Sitemap files are written in a worker thread to keep the loop free
+            ping_urls = self._due(due, CHANNEL_PINGS, urls)
+            batches = await asyncio.to_thread(self.plan_sitemap_batches, ping_urls)
+            self._batch_ping_summary(batches, len(ping_urls))
+            channels.append(self.ping_sitemap_batches_async(batches, session=session))
+        return self._merge_batch_results(*await asyncio.gather(*channels))
+    
+    async def rapid_index_bulk_async(self, urls: List[str], max_concurrency: int = 1000,
+                                     batch_pings: bool = True, batch_google_api: bool = True,
+                                     skip_fresh: bool = True,
+                                     on_result: Optional[Callable[[Dict], None]] = None,
+                                     sink: Optional[ResultSink] = None, keep_results: bool = True,
+                                     dedupe: bool = True,
+                                     priorities: Optional[Dict[str, Priority]] = None) -> List[Dict]:
+        """
+        Index multiple URLs concurrently on a single event loop
+        Keeps up to max_concurrency URLs in flight; returns the same
+        result dicts as rapid_index_bulk
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        print(f"Starting async bulk indexing for {len(urls)} URLs...")
+        
+        batch_pings = self._batch_pings_enabled(batch_pings)
+        due, skipped, urls, routes = await asyncio.to_thread(self._start_job, urls, skip_fresh,
+                                                             URLFilter() if dedupe else None, batch_pings,
+                                                             self._priority_lookup(priorities, dedupe))
+        all_results = []
+        for result in skipped:
+            self._emit_result(result, all_results, keep_results, sink, on_result)
+        
+        async def index_one(session, url):
+            async with semaphore:
                 try:
-                    result = future.result()
-                    all_results.append(result)
-                    print(f"✓ Processed: {url}")
+                    result = await self.rapid_index_single_url_async(
+                        url,
+                        use_all_methods=not batch_pings and url in due[CHANNEL_PINGS],
+                        use_google_api=not batch_google_api and url in due.get(CHANNEL_GOOGLE_API, ()),
+                        session=session
+                    )
+                    result["methods_used"].extend(batch_results.get(url, []))
+                    return url, self._attach_route(result, routes.get(url))
                 except Exception as e:
-                    print(f"✗ Failed: {url} - {e}")
-                    all_results.append({
+                    return url, e
+        
+        # Each URL pings three services, so allow three sockets per URL in flight
+        async with self._async_session(limit=max_concurrency * 3) as session:
+            batch_results = await self.run_batch_channels_async(urls, batch_pings=batch_pings,
+                                                                batch_google_api=batch_google_api,
+                                                                due=due, session=session)
+            
+            tasks = [asyncio.ensure_future(index_one(session, url)) for url in urls]
+            
+            pending = []
+            for next_done in asyncio.as_completed(tasks):
+                url, result = await next_done
+                if isinstance(result, Exception):
+                    print(f"✗ Failed: {url} - {result}")
+                    result = {
                         "url": url,
                         "status": "failed",
-                        "error": str(e)
-                    })
+                        "error": str(result)
+                    }
+                else:
+                    pending.append(result)
+                    print(f"✓ Processed: {url}")
+                self._emit_result(result, all_results, keep_results, sink, on_result)
+                if len(pending) >= LEDGER_FLUSH_EVERY:
+                    await asyncio.to_thread(self._record_submissions, pending)
+                    pending = []
         
+        await asyncio.to_thread(self._record_submissions, pending)
         return all_results
     
-    def save_results(self, results: List[Dict], filename: str = "indexing_results.json"):
-        """Save indexing results to JSON file"""
-        with open(filename, 'w') as f:
-            json.dump(results, f, indent=2)
+    def save_results(self, results: Iterable[Dict], filename: str = "indexing_results.json"):
+        """
+        Save indexing results to JSON file
+        A .ndjson or .ndjson.gz filename streams one result per line instead
+        """
+        if filename.endswith((".ndjson", ".ndjson.gz")):
+            if os.path.exists(filename):
+                os.remove(filename)
+            with NDJSONResultSink(filename) as sink:
+                for result in results:
+                    sink.write(result)
+        else:
+            with open(filename, 'w') as f:
+                json.dump(list(results), f, indent=2)
         print(f"Results saved to {filename}")
 
 
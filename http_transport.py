@@ -0,0 +1,175 @@
+"""
+Pooled HTTP transport for Google Instant Indexer
+One keep-alive connection pool per host, shared by every indexing method
+"""
+
+import asyncio
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from adaptive_limiter import AdaptiveLimiter, RETRY_STATUSES, backoff_delay, parse_retry_after
+
+# Ceiling for a host's adaptive limit when max_per_host is not set
+DEFAULT_MAX_PER_HOST = 256
+
+
+class HttpTransport:
+    def __init__(self, max_workers: int = 10, max_per_host: Optional[int] = None,
+                 max_hosts: int = 32, keepalive_timeout: float = 30.0,
+                 max_retries: int = 3, max_retry_wait: float = 60.0,
+                 limiter: Optional[AdaptiveLimiter] = None):
+        """
+        Initialize the transport
+
+        Args:
+            max_workers: Connections kept alive per host (sized to the worker count)
+            max_per_host: Hard cap on concurrent requests to one host; below it the
+                          limit adapts (AIMD) to how the host responds
+            max_hosts: Number of per-host pools kept open at once
+            keepalive_timeout: Seconds an idle async connection is kept open
+            max_retries: Retries for throttled (429) or failing (5xx) responses
+            max_retry_wait: Longest Retry-After worth waiting for; longer ones
+                            return the throttled response instead
+            limiter: Per-host adaptive limiter (default: starts at max_workers per host)
+        """
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.max_hosts = max_hosts
+        self.keepalive_timeout = keepalive_timeout
+        self.max_retries = max_retries
+        self.max_retry_wait = max_retry_wait
+        self.limiter = limiter or AdaptiveLimiter(
+            initial_limit=min(max_workers, max_per_host or max_workers),
+            max_limit=max_per_host or DEFAULT_MAX_PER_HOST,
+            max_block=max_retry_wait,
+        )
+
+        self._lock = threading.Lock()
+        self.session = requests.Session()
+        self._mount_adapter()
+
+    def _mount_adapter(self):
+        """(Re)build the per-host connection pools"""
+        adapter = HTTPAdapter(
+            pool_connections=self.max_hosts,
+            pool_maxsize=self.max_workers,
+            pool_block=True,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def ensure_pool_size(self, max_workers: int):
+        """Grow the pools so max_workers threads never wait on a connection"""
+        with self._lock:
+            if max_workers <= self.max_workers:
+                return
+            self.max_workers = max_workers
+            self._mount_adapter()
+
+    def _retry_wait(self, attempt: int, retries: int, status: int, retry_after: Optional[float]) -> Optional[float]:
+        """Seconds to sleep before retrying, or None to return the response as is"""
+        if status not in RETRY_STATUSES or attempt >= retries:
+            return None
+        if retry_after is not None and retry_after > self.max_retry_wait:
+            return None
+        return backoff_delay(attempt, retry_after)
+
+    def request(self, method: str, url: str, max_retries: Optional[int] = None,
+                channel: str = "other", **kwargs) -> requests.Response:
+        """
+        Send a request through the pool within the host's adaptive limit
+        429/5xx responses are retried with jittered backoff, honouring Retry-After.
+        channel labels the request in the metrics
+        """
+        host = urlparse(url).netloc
+        retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            self.limiter.acquire(host)
+            metrics.request_started(channel, host)
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except Exception as e:
+                metrics.request_finished(channel, host, _error_status(e), time.perf_counter() - start)
+                self.limiter.release(host, adapt=False)
+                raise
+            metrics.request_finished(channel, host, response.status_code, time.perf_counter() - start)
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            self.limiter.release(host, throttled=response.status_code in RETRY_STATUSES,
+                                 retry_after=retry_after)
+            wait = self._retry_wait(attempt, retries, response.status_code, retry_after)
+            if wait is None:
+                return response
+            response.close()
+            metrics.request_retried(channel, host)
+            time.sleep(wait)
+            attempt += 1
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def async_session(self, limit: Optional[int] = None) -> aiohttp.ClientSession:
+        """
+        Create an aiohttp session with the same pooling rules
+        Must be called from inside a running event loop
+        """
+        connector = aiohttp.TCPConnector(
+            limit=limit or self.max_workers * self.max_hosts,
+            limit_per_host=self.max_per_host or 0,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        return aiohttp.ClientSession(connector=connector)
+
+    async def async_request(self, session: aiohttp.ClientSession, method: str, url: str,
+                            max_retries: Optional[int] = None, channel: str = "other",
+                            **kwargs) -> aiohttp.ClientResponse:
+        """
+        Async version of request on the given session
+        The body is read before returning, so response.text() works afterwards
+        """
+        host = urlparse(url).netloc
+        retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            await self.limiter.acquire_async(host)
+            metrics.request_started(channel, host)
+            start = time.perf_counter()
+            try:
+                async with session.request(method, url, **kwargs) as response:
+                    await response.read()
+            except BaseException as e:
+                metrics.request_finished(channel, host, _error_status(e), time.perf_counter() - start)
+                self.limiter.release(host, adapt=False)
+                raise
+            metrics.request_finished(channel, host, response.status, time.perf_counter() - start)
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            self.limiter.release(host, throttled=response.status in RETRY_STATUSES,
+                                 retry_after=retry_after)
+            wait = self._retry_wait(attempt, retries, response.status, retry_after)
+            if wait is None:
+                return response
+            metrics.request_retried(channel, host)
+            await asyncio.sleep(wait)
+            attempt += 1
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+def _error_status(error: BaseException) -> str:
+    """Metrics status for a request that got no response"""
+    if isinstance(error, (requests.Timeout, asyncio.TimeoutError)):
+        return "timeout"
+    return "error"
@@ -0,0 +1,162 @@
+"""
+Job checkpoints for Google Instant Indexer
+Keeps a bulk job's URL list and every completed result on disk, so a job
+cut short by a crash or restart resumes where it stopped instead of
+resubmitting everything
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional, Set
+
+from result_sink import NDJSONResultSink
+from url_normalizer import InvalidURL, canonical_key, normalize_url
+
+DEFAULT_CHECKPOINT_DIR = "checkpoints"
+CHECKPOINT_RUNNING = "running"
+CHECKPOINT_COMPLETE = "complete"
+
+
+def url_key(url: str) -> int:
+    """Compact, variant-insensitive key of a URL (8 bytes instead of the string)"""
+    try:
+        url = canonical_key(normalize_url(url))
+    except InvalidURL:
+        pass
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class JobCheckpoint(NDJSONResultSink):
+    def __init__(self, job_id: str, directory: str = DEFAULT_CHECKPOINT_DIR, flush_every: int = 200):
+        """
+        Checkpoint files of one job (use create or load rather than this directly)
+
+        A ResultSink: pass it as sink= and every result is appended to
+        <job_id>.results.ndjson, flushed every flush_every results. A crash
+        loses at most that many results, whose URLs are simply redone
+        """
+        self.job_id = job_id
+        self.directory = directory
+        self.meta_path = os.path.join(directory, f"{job_id}.json")
+        self.urls_path = os.path.join(directory, f"{job_id}.urls.gz")
+        super().__init__(os.path.join(directory, f"{job_id}.results.ndjson"), compress=False,
+                         flush_every=flush_every)
+        self.meta: Dict = {}
+
+    @classmethod
+    def create(cls, urls: Iterable[str], directory: str = DEFAULT_CHECKPOINT_DIR,
+               job_id: Optional[str] = None, options: Optional[Dict] = None) -> "JobCheckpoint":
+        """
+        Start a checkpoint: the URLs are streamed to disk once, up front
+        options are the run settings resume should reuse (e.g. max_workers)
+        """
+        os.makedirs(directory, exist_ok=True)
+        checkpoint = cls(job_id or uuid.uuid4().hex[:12], directory)
+        url_count = 0
+        with gzip.open(checkpoint.urls_path, "wt", encoding="utf-8") as f:
+            for url in urls:
+                f.write(url + "\n")
+                url_count += 1
+        # Written last: a checkpoint without its metadata was never started
+        checkpoint.meta = {
+            "job_id": checkpoint.job_id,
+            "status": CHECKPOINT_RUNNING,
+            "url_count": url_count,
+            "options": options or {},
+            "created_at": datetime.now().isoformat(),
+            "finished_at": None
+        }
+        checkpoint._save_meta()
+        return checkpoint
+
+    @classmethod
+    def load(cls, job_id: str, directory: str = DEFAULT_CHECKPOINT_DIR) -> "JobCheckpoint":
+        """Open an existing checkpoint; raises FileNotFoundError if there is none"""
+        checkpoint = cls(job_id, directory)
+        with open(checkpoint.meta_path) as f:
+            checkpoint.meta = json.load(f)
+        checkpoint._trim_partial_line()
+        return checkpoint
+
+    @staticmethod
+    def exists(job_id: str, directory: str = DEFAULT_CHECKPOINT_DIR) -> bool:
+        return os.path.exists(os.path.join(directory, f"{job_id}.json"))
+
+    def _save_meta(self):
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def _trim_partial_line(self):
+        """Drop a result cut off mid-line by a crash, so appends start on a fresh line"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            end = size
+            while end > 0:
+                start = max(0, end - 4096)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                end = start
+            if end < size:
+                f.truncate(end)
+
+    @property
+    def status(self) -> str:
+        return self.meta.get("status", CHECKPOINT_RUNNING)
+
+    @property
+    def url_count(self) -> int:
+        return self.meta.get("url_count", 0)
+
+    @property
+    def options(self) -> Dict:
+        return self.meta.get("options", {})
+
+    def urls(self) -> Iterator[str]:
+        with gzip.open(self.urls_path, "rt", encoding="utf-8") as f:
+            for line in f:
+                yield line.rstrip("\n")
+
+    def results(self) -> Iterator[Dict]:
+        """Every checkpointed result, from all runs of the job"""
+        self.flush()
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def done_keys(self) -> Set[int]:
+        return {url_key(result["url"]) for result in self.results() if result.get("url")}
+
+    def pending_urls(self, done: Optional[Set[int]] = None) -> Iterator[str]:
+        """URLs without a checkpointed result, in their original order"""
+        done = self.done_keys() if done is None else done
+        for url in self.urls():
+            if url_key(url) not in done:
+                yield url
+
+    def finish(self, status: str = CHECKPOINT_COMPLETE):
+        self.flush()
+        self.meta.update(status=status, finished_at=datetime.now().isoformat())
+        self._save_meta()
+
+    def remove(self):
+        """Delete the checkpoint's files"""
+        self.close()
+        for path in (self.meta_path, self.urls_path, self.path):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,305 @@
+"""
+Job manager for Google Instant Indexer
+Queues indexing jobs and shares a fixed worker pool fairly between them
+"""
+
+import threading
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from job_checkpoint import JobCheckpoint, url_key
+from result_store import ResultStore
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_CANCELLING = "cancelling"
+JOB_COMPLETE = "complete"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = (JOB_COMPLETE, JOB_CANCELLED)
+
+
+def result_succeeded(result: Dict) -> bool:
+    """A URL counts as successful if any method reported success"""
+    return (result.get("status") == "success" or
+            any(m.get("status") == "success" for m in result.get("methods_used", [])))
+
+
+def result_outcome(result: Dict) -> str:
+    """
+    "success", "skipped" (the ledger still considered the URL fresh, so
+    nothing was sent) or "failed"
+    """
+    if result.get("status") == "skipped":
+        return "skipped"
+    return "success" if result_succeeded(result) else "failed"
+
+
+class IndexingJob:
+    def __init__(self, job_id: str, urls: List[str]):
+        self.id = job_id
+        self.urls = urls
+        self.url_count = len(urls)
+        self.checkpoint: Optional[JobCheckpoint] = None
+        self.status = JOB_QUEUED
+        self.results = ResultStore()
+        self.successful = 0
+        self.skipped = 0
+        self.failed = 0
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self._next_offset = 0
+        self._chunks_running = 0
+        self._lock = threading.Lock()
+
+    @property
+    def has_pending_chunks(self) -> bool:
+        return self._next_offset < len(self.urls)
+
+    def add_result(self, result: Dict):
+        """Append one URL's result and keep the counters current"""
+        with self._lock:
+            self.results.append(result)
+            outcome = result_outcome(result)
+            if outcome == "success":
+                self.successful += 1
+            elif outcome == "skipped":
+                self.skipped += 1
+            else:
+                self.failed += 1
+
+    def results_page(self, cursor: int = 0, limit: int = 500) -> Tuple[List[Dict], Optional[int]]:
+        """
+        Slice of the results from cursor (results are append-only), as dicts
+        Returns: (results, next cursor or None once the job is done and read)
+        """
+        cursor = max(0, cursor)
+        page = self.results.page(cursor, limit)
+        next_cursor = cursor + len(page)
+        if next_cursor >= len(self.results) and self.status in FINISHED_STATES:
+            return page, None
+        return page, next_cursor
+
+    def summary(self) -> Dict:
+        """Job status without the per-URL results"""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "in_progress": self.status not in FINISHED_STATES,
+            "url_count": self.url_count,
+            "processed": len(self.results),
+            "successful": self.successful,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+class JobManager:
+    def __init__(self, run_batch: Callable[[List[str], Callable[[Dict], None]], object], workers: int = 4,
+                 chunk_size: int = 100, max_finished_jobs: int = 100,
+                 on_job_finished: Optional[Callable[[IndexingJob], None]] = None,
+                 sink=None, checkpoint_dir: Optional[str] = None):
+        """
+        Initialize the manager and start its workers
+
+        Args:
+            run_batch: Indexes a list of URLs, calling its second argument with
+                       each URL's result as soon as that URL completes
+            workers: Size of the fixed worker pool shared by all jobs
+            chunk_size: URLs a worker takes from a job at a time
+            max_finished_jobs: Finished jobs kept for status queries
+            on_job_finished: Called from a worker thread when a job completes or is cancelled
+            sink: ResultSink that receives every result, tagged with its job_id
+            checkpoint_dir: Directory where each job checkpoints its URLs and
+                            results, so resume(job_id) can finish it after a restart
+        """
+        self.run_batch = run_batch
+        self.on_job_finished = on_job_finished
+        self.sink = sink
+        self.checkpoint_dir = checkpoint_dir
+        self.chunk_size = chunk_size
+        self.max_finished_jobs = max_finished_jobs
+
+        self._jobs: "OrderedDict[str, IndexingJob]" = OrderedDict()
+        self._active: deque = deque()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"indexing-worker-{i + 1}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, urls: List[str]) -> IndexingJob:
+        """Queue a job; workers pick it up in turn with the other active jobs"""
+        job = IndexingJob(uuid.uuid4().hex[:12], list(urls))
+        if self.checkpoint_dir:
+            job.checkpoint = JobCheckpoint.create(job.urls, self.checkpoint_dir, job_id=job.id)
+        self._enqueue(job)
+        return job
+
+    def resume(self, job_id: str) -> Optional[IndexingJob]:
+        """
+        Continue a job from its checkpoint, e.g. after a restart or a cancel
+        Checkpointed results are loaded back and only the remaining URLs are
+        queued. A job that is still queued or running is returned as it is
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status not in FINISHED_STATES:
+                return job
+        if not self.checkpoint_dir or not JobCheckpoint.exists(job_id, self.checkpoint_dir):
+            return job
+
+        checkpoint = JobCheckpoint.load(job_id, self.checkpoint_dir)
+        job = IndexingJob(job_id, [])
+        done = set()
+        for result in checkpoint.results():
+            job.add_result(result)
+            if result.get("url"):
+                done.add(url_key(result["url"]))
+        job.urls = list(checkpoint.pending_urls(done))
+        job.url_count = checkpoint.url_count
+        job.checkpoint = checkpoint
+        self._enqueue(job)
+        return job
+
+    def _enqueue(self, job: IndexingJob):
+        with self._cond:
+            self._jobs[job.id] = job
+            if job.has_pending_chunks:
+                self._active.append(job)
+            else:
+                self._finish(job, JOB_COMPLETE)
+            self._prune()
+            self._cond.notify_all()
+
+    def get(self, job_id: str) -> Optional[IndexingJob]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[IndexingJob]:
+        with self._cond:
+            return list(self._jobs.values())
+
+    def latest(self) -> Optional[IndexingJob]:
+        with self._cond:
+            return next(reversed(self._jobs.values()), None)
+
+    def queued_urls(self) -> int:
+        """URLs in active jobs not yet handed to a worker"""
+        with self._cond:
+            return sum(len(job.urls) - job._next_offset for job in self._active)
+
+    def active_jobs(self) -> int:
+        """Jobs queued or running"""
+        with self._cond:
+            return sum(1 for job in self._jobs.values() if job.status not in FINISHED_STATES)
+
+    def cancel(self, job_id: str) -> Optional[IndexingJob]:
+        """Drop a job's queued chunks; chunks already running are allowed to finish"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return job
+            if job in self._active:
+                self._active.remove(job)
+            if job._chunks_running:
+                job.status = JOB_CANCELLING
+                return job
+            self._finish(job, JOB_CANCELLED)
+        self._notify_finished(job)
+        return job
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            unfinished = [job for job in self._jobs.values()
+                          if job.checkpoint is not None and job.status not in FINISHED_STATES]
+        # Flush what the unfinished jobs have done, for resume after the restart
+        for job in unfinished:
+            job.checkpoint.close()
+        if self.sink is not None:
+            self.sink.close()
+
+    def _finish(self, job: IndexingJob, status: str):
+        job.status = status
+        job.finished_at = datetime.now().isoformat()
+        if job.checkpoint is not None:
+            if status == JOB_COMPLETE:
+                # Nothing left to resume
+                job.checkpoint.remove()
+            else:
+                job.checkpoint.close()
+
+    def _notify_finished(self, job: IndexingJob):
+        if self.on_job_finished is None:
+            return
+        try:
+            self.on_job_finished(job)
+        except Exception as e:
+            print(f"✗ Job {job.id} finish hook failed: {e}")
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond max_finished_jobs"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+    def _next_chunk(self):
+        """Round-robin over active jobs so every job gets a fair share of workers"""
+        with self._cond:
+            while not self._active and not self._stopped:
+                self._cond.wait()
+            if self._stopped:
+                return None, None
+            job = self._active.popleft()
+            start = job._next_offset
+            chunk = job.urls[start:start + self.chunk_size]
+            job._next_offset = start + len(chunk)
+            job._chunks_running += 1
+            if job.status == JOB_QUEUED:
+                job.status = JOB_RUNNING
+                job.started_at = datetime.now().isoformat()
+            if job.has_pending_chunks:
+                self._active.append(job)
+            return job, chunk
+
+    def _worker(self):
+        while True:
+            job, chunk = self._next_chunk()
+            if job is None:
+                return
+            reported = set()
+
+            def on_result(result):
+                reported.add(result.get("url"))
+                job.add_result(result)
+                if job.checkpoint is not None:
+                    job.checkpoint.write(result)
+                if self.sink is not None:
+                    self.sink.write(dict(result, job_id=job.id))
+
+            try:
+                self.run_batch(chunk, on_result)
+            except Exception as e:
+                for url in chunk:
+                    if url not in reported:
+                        on_result({"url": url, "status": "failed", "error": str(e)})
+            with self._cond:
+                job._chunks_running -= 1
+                if job._chunks_running == 0 and not job.has_pending_chunks and job.status == JOB_RUNNING:
+                    self._finish(job, JOB_COMPLETE)
+                elif job._chunks_running == 0 and job.status == JOB_CANCELLING:
+                    self._finish(job, JOB_CANCELLED)
+                else:
+                    continue
+                self._prune()
+            self._notify_finished(job)
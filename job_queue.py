@@ -0,0 +1,354 @@
+"""
+Durable job queue for Google Instant Indexer
+SQLite-backed jobs, URL batches and results shared by every process on a
+box: HTTP servers enqueue and read status, worker processes (worker.py)
+lease batches and write results back
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from job_manager import FINISHED_STATES, JOB_CANCELLED, JOB_CANCELLING, JOB_COMPLETE, JOB_QUEUED, \
+    JOB_RUNNING, result_outcome
+
+BATCH_PENDING = "pending"
+BATCH_LEASED = "leased"
+BATCH_DONE = "done"
+
+# Seconds a worker holds a batch without reporting before others may take it over
+DEFAULT_LEASE_SECONDS = 300
+# Leases a batch gets before its remaining URLs are failed
+MAX_BATCH_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    options TEXT NOT NULL,
+    url_count INTEGER NOT NULL,
+    processed INTEGER NOT NULL DEFAULT 0,
+    successful INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    last_leased_at REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    host TEXT NOT NULL,
+    urls TEXT NOT NULL,
+    status TEXT NOT NULL,
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS batches_by_status ON batches (status, job_id);
+CREATE TABLE IF NOT EXISTS results (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    batch_id INTEGER NOT NULL,
+    url TEXT,
+    result TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_by_batch ON results (batch_id);
+"""
+
+
+def shard_by_host(urls: Iterable[str], batch_size: int) -> List[Tuple[str, List[str]]]:
+    """
+    (host, URLs) batches of at most batch_size, one host per batch
+    Keeps each host's IndexNow chunks, sitemaps and rate limit in one worker
+    """
+    groups: Dict[str, List[str]] = {}
+    for url in urls:
+        groups.setdefault(urlparse(url).netloc, []).append(url)
+    return [(host, host_urls[start:start + batch_size])
+            for host, host_urls in groups.items()
+            for start in range(0, len(host_urls), batch_size)]
+
+
+class QueuedJob:
+    def __init__(self, queue: "SQLiteJobQueue", row: sqlite3.Row):
+        """A job as last read from the queue; same read API as IndexingJob"""
+        self.queue = queue
+        self.id = row["id"]
+        self.status = row["status"]
+        self.options = json.loads(row["options"])
+        self._row = row
+
+    def results_page(self, cursor: int = 0, limit: int = 500) -> Tuple[List[Dict], Optional[int]]:
+        """
+        Slice of the results from cursor (results are append-only)
+        Returns: (results, next cursor or None once the job is done and read)
+        """
+        return self.queue.results_page(self.id, cursor, limit)
+
+    def summary(self) -> Dict:
+        """Job status without the per-URL results (re-read from the queue)"""
+        row = self.queue._job_row(self.id) or self._row
+        return {
+            "job_id": row["id"],
+            "status": row["status"],
+            "in_progress": row["status"] not in FINISHED_STATES,
+            "url_count": row["url_count"],
+            "processed": row["processed"],
+            "successful": row["successful"],
+            "skipped": row["skipped"],
+            "failed": row["failed"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"]
+        }
+
+
+class SQLiteJobQueue:
+    def __init__(self, path: str = "indexer_queue.db", batch_size: int = 500,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS, max_finished_jobs: int = 100):
+        """
+        Initialize the queue (the file is created on first use)
+
+        Args:
+            path: SQLite database shared by the HTTP servers and workers
+            batch_size: Most URLs per batch; every batch holds a single host
+            lease_seconds: How long a leased batch may go without a report
+                           before another worker takes it over
+            max_finished_jobs: Finished jobs kept, with their results
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_finished_jobs = max_finished_jobs
+        self._lock = threading.Lock()
+        # Transactions are explicit: BEGIN IMMEDIATE takes the write lock up front
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # Queues created before skipped URLs were counted apart
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "skipped" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN skipped INTEGER NOT NULL DEFAULT 0")
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """One write transaction, holding the database write lock throughout"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _job_row(self, job_id: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    # ------------------------------------------------------------------
+    # HTTP tier: same interface as JobManager
+    # ------------------------------------------------------------------
+
+    def submit(self, urls: List[str], options: Optional[Dict] = None) -> QueuedJob:
+        """
+        Queue a job, sharded into single-host batches for the workers
+        options (e.g. service_account_file) are passed to the worker that runs it
+        """
+        job_id = uuid.uuid4().hex[:12]
+        batches = shard_by_host(urls, self.batch_size)
+        status = JOB_QUEUED if batches else JOB_COMPLETE
+        now = datetime.now().isoformat()
+        with self._write() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, options, url_count, created_at, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, status, json.dumps(options or {}), len(urls), now, None if batches else now)
+            )
+            conn.executemany(
+                "INSERT INTO batches (job_id, host, urls, status) VALUES (?, ?, ?, ?)",
+                ((job_id, host, "\n".join(batch), BATCH_PENDING) for host, batch in batches)
+            )
+            self._prune(conn)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[QueuedJob]:
+        row = self._job_row(job_id)
+        return QueuedJob(self, row) if row is not None else None
+
+    def jobs(self) -> List[QueuedJob]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM jobs ORDER BY created_at").fetchall()
+        return [QueuedJob(self, row) for row in rows]
+
+    def latest(self) -> Optional[QueuedJob]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT 1").fetchone()
+        return QueuedJob(self, row) if row is not None else None
+
+    def cancel(self, job_id: str) -> Optional[QueuedJob]:
+        """Drop a job's pending batches; leased batches are allowed to finish"""
+        with self._write() as conn:
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is not None and row["status"] not in FINISHED_STATES:
+                conn.execute("DELETE FROM batches WHERE job_id = ? AND status = ?", (job_id, BATCH_PENDING))
+                leased = conn.execute("SELECT COUNT(*) FROM batches WHERE job_id = ? AND status = ?",
+                                      (job_id, BATCH_LEASED)).fetchone()[0]
+                if leased:
+                    conn.execute("UPDATE jobs SET status = ? WHERE id = ?", (JOB_CANCELLING, job_id))
+                else:
+                    self._finish(conn, job_id, JOB_CANCELLED)
+        return self.get(job_id)
+
+    def resume(self, job_id: str) -> Optional[QueuedJob]:
+        """
+        Queued jobs are durable: after a restart workers carry on by
+        themselves, and batches held by dead workers are re-leased
+        """
+        return self.get(job_id)
+
+    def results_page(self, job_id: str, cursor: int = 0, limit: int = 500) -> Tuple[List[Dict], Optional[int]]:
+        cursor = max(0, cursor)
+        with self._lock:
+            job = self._conn.execute("SELECT status, processed FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            rows = self._conn.execute(
+                "SELECT result FROM results WHERE job_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+                (job_id, cursor, limit)
+            ).fetchall()
+        page = [json.loads(row["result"]) for row in rows]
+        next_cursor = cursor + len(page)
+        if job is None or (next_cursor >= job["processed"] and job["status"] in FINISHED_STATES):
+            return page, None
+        return page, next_cursor
+
+    def queued_urls(self) -> int:
+        """URLs in batches no worker has taken yet (approximate: whole batches)"""
+        with self._lock:
+            rows = self._conn.execute("SELECT urls FROM batches WHERE status = ?", (BATCH_PENDING,))
+            return sum(urls.count("\n") + 1 for (urls,) in rows)
+
+    def active_jobs(self) -> int:
+        """Jobs queued or running"""
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE status NOT IN ({','.join('?' * len(FINISHED_STATES))})",
+                FINISHED_STATES
+            ).fetchone()[0]
+
+    def shutdown(self):
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def lease(self, owner: str) -> Optional[Tuple[int, str, Dict, List[str]]]:
+        """
+        Take the next batch: pending, or leased by a worker that stopped reporting
+        Jobs take turns (the one leased from longest ago goes first)
+        Returns: (batch id, job id, job options, URLs still without a result) or None
+        """
+        now = time.time()
+        with self._write() as conn:
+            while True:
+                row = conn.execute(
+                    "SELECT b.id, b.job_id, b.urls, b.attempts, j.options FROM batches b "
+                    "JOIN jobs j ON j.id = b.job_id "
+                    "WHERE b.status = ? OR (b.status = ? AND b.lease_expires < ?) "
+                    "ORDER BY j.last_leased_at, b.id LIMIT 1",
+                    (BATCH_PENDING, BATCH_LEASED, now)
+                ).fetchone()
+                if row is None:
+                    return None
+                done = {url for (url,) in conn.execute("SELECT url FROM results WHERE batch_id = ?",
+                                                       (row["id"],))}
+                urls = [url for url in row["urls"].split("\n") if url not in done]
+                if row["attempts"] >= MAX_BATCH_ATTEMPTS:
+                    # Workers keep dying on this batch: fail what is left instead of retrying forever
+                    error = f"batch abandoned after {row['attempts']} worker leases expired"
+                    self._add_results(conn, row["job_id"], row["id"],
+                                      [{"url": url, "status": "failed", "error": error} for url in urls])
+                    self._complete_batch(conn, row["job_id"], row["id"])
+                    continue
+                conn.execute(
+                    "UPDATE batches SET status = ?, owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                    "WHERE id = ?",
+                    (BATCH_LEASED, owner, now + self.lease_seconds, row["id"])
+                )
+                conn.execute(
+                    "UPDATE jobs SET last_leased_at = ?, status = CASE WHEN status = ? THEN ? ELSE status END, "
+                    "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                    (now, JOB_QUEUED, JOB_RUNNING, datetime.now().isoformat(), row["job_id"])
+                )
+                return row["id"], row["job_id"], json.loads(row["options"]), urls
+
+    def record(self, batch_id: int, owner: str, results: List[Dict], done: bool = False) -> bool:
+        """
+        Store results for a leased batch and extend the lease
+        With done=True the batch is finished (and its job, if it was the last).
+        Returns False if the lease was lost to another worker; the results are dropped
+        """
+        with self._write() as conn:
+            row = conn.execute("SELECT job_id, status, owner FROM batches WHERE id = ?", (batch_id,)).fetchone()
+            if row is None or row["status"] != BATCH_LEASED or row["owner"] != owner:
+                return False
+            self._add_results(conn, row["job_id"], batch_id, results)
+            if done:
+                self._complete_batch(conn, row["job_id"], batch_id)
+            else:
+                conn.execute("UPDATE batches SET lease_expires = ? WHERE id = ?",
+                             (time.time() + self.lease_seconds, batch_id))
+        return True
+
+    def _add_results(self, conn: sqlite3.Connection, job_id: str, batch_id: int, results: List[Dict]):
+        if not results:
+            return
+        processed = conn.execute("SELECT processed FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+        outcomes = [result_outcome(result) for result in results]
+        conn.executemany(
+            "INSERT INTO results (job_id, seq, batch_id, url, result) VALUES (?, ?, ?, ?, ?)",
+            ((job_id, processed + offset, batch_id, result.get("url"), json.dumps(result, default=str))
+             for offset, result in enumerate(results))
+        )
+        conn.execute(
+            "UPDATE jobs SET processed = processed + ?, successful = successful + ?, skipped = skipped + ?, "
+            "failed = failed + ? WHERE id = ?",
+            (len(results), outcomes.count("success"), outcomes.count("skipped"), outcomes.count("failed"), job_id)
+        )
+
+    def _complete_batch(self, conn: sqlite3.Connection, job_id: str, batch_id: int):
+        conn.execute("UPDATE batches SET status = ?, owner = NULL WHERE id = ?", (BATCH_DONE, batch_id))
+        open_batches = conn.execute("SELECT COUNT(*) FROM batches WHERE job_id = ? AND status != ?",
+                                    (job_id, BATCH_DONE)).fetchone()[0]
+        if open_batches:
+            return
+        status = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+        self._finish(conn, job_id, JOB_CANCELLED if status == JOB_CANCELLING else JOB_COMPLETE)
+
+    def _finish(self, conn: sqlite3.Connection, job_id: str, status: str):
+        conn.execute("UPDATE jobs SET status = ?, finished_at = ? WHERE id = ?",
+                     (status, datetime.now().isoformat(), job_id))
+        conn.execute("DELETE FROM batches WHERE job_id = ?", (job_id,))
+
+    def _prune(self, conn: sqlite3.Connection):
+        """Forget the oldest finished jobs beyond max_finished_jobs, with their results"""
+        stale = [row[0] for row in conn.execute(
+            f"SELECT id FROM jobs WHERE status IN ({','.join('?' * len(FINISHED_STATES))}) "
+            f"ORDER BY finished_at DESC LIMIT -1 OFFSET ?",
+            (*FINISHED_STATES, self.max_finished_jobs)
+        )]
+        for job_id in stale:
+            conn.execute("DELETE FROM results WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
@@ -0,0 +1,118 @@
+"""
+Method routing for Google Instant Indexer
+Decides which channels submit each URL, so scarce Google Indexing API
+quota goes to the highest-priority URLs and the bulk of a job rides the
+batched channels (IndexNow chunks, sitemap pings)
+"""
+
+from typing import Dict, Iterable, List, Optional, Set, Union
+
+PRIORITY_MIN = 0
+PRIORITY_MAX = 10
+DEFAULT_PRIORITY = 5
+
+# Example tag weights; pass your own tag_priorities to MethodRouter
+DEFAULT_TAG_PRIORITIES = {
+    "money": 10,
+    "new": 8,
+    "updated": 7,
+    "tier1": 6,
+    "tier2": 3,
+    "tier3": 1,
+}
+
+Priority = Union[int, Iterable[str]]
+
+
+class MethodRouter:
+    def __init__(self, scarce_min_priority: int = DEFAULT_PRIORITY, default_priority: int = DEFAULT_PRIORITY,
+                 tag_priorities: Optional[Dict[str, int]] = None):
+        """
+        Initialize the router
+
+        Args:
+            scarce_min_priority: Lowest priority that may spend a scarce channel
+                                 (the Google Indexing API); lower URLs only go
+                                 through the batched channels
+            default_priority: Priority of URLs given none
+            tag_priorities: Priority of each tag; a URL tagged several times
+                            gets its highest tag
+        """
+        self.scarce_min_priority = scarce_min_priority
+        self.default_priority = default_priority
+        self.tag_priorities = DEFAULT_TAG_PRIORITIES if tag_priorities is None else tag_priorities
+
+    def priority(self, value: Optional[Priority]) -> int:
+        """A URL's priority from a number, a list of tags, or nothing"""
+        if value is None:
+            return self.default_priority
+        if isinstance(value, (int, float)):
+            return max(PRIORITY_MIN, min(PRIORITY_MAX, int(value)))
+        if isinstance(value, str):
+            value = [value]
+        weights = [self.tag_priorities[tag] for tag in value if tag in self.tag_priorities]
+        return max(weights) if weights else self.default_priority
+
+    def plan(self, urls: List[str], scarce: Dict[str, int], batched: Dict[str, str],
+             due: Optional[Dict[str, Set[str]]] = None,
+             priorities: Optional[Dict[str, Priority]] = None) -> Dict[str, Dict]:
+        """
+        Route every URL
+
+        Args:
+            urls: URLs of the job (or chunk)
+            scarce: Channels with a budget -> calls left (e.g. the Google API quota).
+                    Budgets go to eligible URLs by priority, then input order
+            batched: Cheap channels -> why a URL goes through them; every due URL does
+            due: URLs each channel still needs to submit (the ledger's view);
+                 None means every URL
+            priorities: URL -> priority or tags
+        Returns: URL -> {"priority", "channels", "deferred", "reasons"}: the channels
+                 that submit it, the scarce ones it was eligible for but did not
+                 get, and a reason per channel
+        """
+        priorities = priorities or {}
+        routes = {}
+        for url in urls:
+            routes[url] = {"priority": self.priority(priorities.get(url)), "channels": [], "deferred": [],
+                           "reasons": {}}
+
+        for channel, budget in scarce.items():
+            candidates = [url for url in urls if due is None or url in due.get(channel, ())]
+            eligible = [url for url in candidates if routes[url]["priority"] >= self.scarce_min_priority]
+            # Stable sort: equal priorities keep their input order
+            eligible.sort(key=lambda url: -routes[url]["priority"])
+            chosen = set(eligible[:max(0, budget)])
+            for url in candidates:
+                route = routes[url]
+                if url in chosen:
+                    route["channels"].append(channel)
+                    route["reasons"][channel] = f"priority {route['priority']}: within the {budget} calls left"
+                elif route["priority"] < self.scarce_min_priority:
+                    route["reasons"][channel] = (f"priority {route['priority']} below "
+                                                 f"{self.scarce_min_priority}: batched channels only")
+                else:
+                    route["deferred"].append(channel)
+                    route["reasons"][channel] = f"deferred: the {budget} calls left went to higher-priority URLs"
+
+        for channel, reason in batched.items():
+            for url in urls:
+                if due is None or url in due.get(channel, ()):
+                    routes[url]["channels"].append(channel)
+                    routes[url]["reasons"][channel] = reason
+
+        if due is not None:
+            for url in urls:
+                for channel in list(scarce) + list(batched):
+                    if url not in due.get(channel, ()):
+                        routes[url]["reasons"][channel] = "recently submitted (ledger)"
+        return routes
+
+    @staticmethod
+    def summary(routes: Dict[str, Dict]) -> Dict[str, int]:
+        """URLs routed to each channel"""
+        counts: Dict[str, int] = {}
+        for route in routes.values():
+            for channel in route["channels"]:
+                counts[channel] = counts.get(channel, 0) + 1
+        return counts
@@ -0,0 +1,121 @@
+"""
+Prometheus metrics for Google Instant Indexer
+Per-channel / per-host request counters and latency, in-flight gauges,
+retries, quota deferrals and queue depth
+
+Recording is a cached label lookup plus an increment, cheap enough for the
+hot path. Without prometheus_client installed every recorder is a no-op.
+"""
+
+import threading
+from typing import Dict, Tuple
+
+from job_manager import result_outcome
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+    METRICS_ENABLED = True
+except ImportError:
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    METRICS_ENABLED = False
+
+# Latency buckets (seconds) spanning local calls to slow remote services
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+if METRICS_ENABLED:
+    REQUESTS = Counter("indexer_requests_total", "Requests sent, by channel, host and HTTP status",
+                       ["channel", "host", "status"])
+    REQUEST_SECONDS = Histogram("indexer_request_seconds", "Request latency, by channel and host",
+                                ["channel", "host"], buckets=LATENCY_BUCKETS)
+    IN_FLIGHT = Gauge("indexer_requests_in_flight", "Requests currently in flight",
+                      ["channel", "host"])
+    RETRIES = Counter("indexer_retries_total", "Requests retried after a 429/5xx",
+                      ["channel", "host"])
+    QUOTA_DEFERRED = Counter("indexer_quota_deferred_total",
+                             "Google Indexing API submissions deferred for lack of quota")
+    CIRCUIT_SKIPPED = Counter("indexer_circuit_skipped_total", "Pings skipped while a circuit was open",
+                              ["host"])
+    URLS = Counter("indexer_urls_total", "URLs finished by bulk runs, by outcome", ["outcome"])
+    QUEUE_DEPTH = Gauge("indexer_queue_depth_urls", "URLs queued in jobs but not yet handed to a worker")
+    ACTIVE_JOBS = Gauge("indexer_jobs_active", "Jobs queued or running")
+    HOST_LIMIT = Gauge("indexer_host_concurrency_limit", "Adaptive concurrency limit per host", ["host"])
+    CIRCUIT_OPEN = Gauge("indexer_circuit_open", "1 while a ping service's circuit is not closed",
+                         ["host"])
+    QUOTA_REMAINING = Gauge("indexer_google_quota_remaining", "Google Indexing API tokens left",
+                            ["window"])
+
+_children: Dict[Tuple, object] = {}
+_children_lock = threading.Lock()
+
+
+def _child(metric, *labels):
+    """metric.labels(*labels), cached so repeat lookups skip label validation"""
+    key = (id(metric),) + labels
+    child = _children.get(key)
+    if child is None:
+        with _children_lock:
+            child = _children.get(key)
+            if child is None:
+                child = metric.labels(*labels)
+                _children[key] = child
+    return child
+
+
+def request_started(channel: str, host: str):
+    if METRICS_ENABLED:
+        _child(IN_FLIGHT, channel, host).inc()
+
+
+def request_finished(channel: str, host: str, status, seconds: float):
+    """status: HTTP status code, or a short word ("error", "timeout") when there is none"""
+    if METRICS_ENABLED:
+        _child(IN_FLIGHT, channel, host).dec()
+        _child(REQUESTS, channel, host, str(status)).inc()
+        _child(REQUEST_SECONDS, channel, host).observe(seconds)
+
+
+def request_retried(channel: str, host: str):
+    if METRICS_ENABLED:
+        _child(RETRIES, channel, host).inc()
+
+
+def quota_deferred(count: int = 1):
+    if METRICS_ENABLED and count:
+        QUOTA_DEFERRED.inc(count)
+
+
+def circuit_skipped(host: str):
+    if METRICS_ENABLED:
+        _child(CIRCUIT_SKIPPED, host).inc()
+
+
+def url_finished(result: Dict):
+    """Count one URL's result by its outcome (see job_manager.result_outcome)"""
+    if not METRICS_ENABLED:
+        return
+    _child(URLS, result_outcome(result)).inc()
+
+
+def update_gauges(indexer=None, job_manager=None):
+    """Refresh the gauges that mirror other state; call before each scrape"""
+    if not METRICS_ENABLED:
+        return
+    if job_manager is not None:
+        QUEUE_DEPTH.set(job_manager.queued_urls())
+        ACTIVE_JOBS.set(job_manager.active_jobs())
+    if indexer is not None:
+        for host, state in indexer.transport.limiter.snapshot().items():
+            _child(HOST_LIMIT, host).set(state["limit"])
+        for host, health in indexer.ping_service_health().items():
+            _child(CIRCUIT_OPEN, host).set(0 if health["healthy"] else 1)
+        remaining = indexer.google_quota.remaining()
+        _child(QUOTA_REMAINING, "daily").set(remaining["daily"])
+        _child(QUOTA_REMAINING, "per_minute").set(remaining["per_minute"])
+
+
+def render(indexer=None, job_manager=None) -> Tuple[bytes, str]:
+    """(body, content type) for a /metrics response"""
+    if not METRICS_ENABLED:
+        return b"# prometheus_client is not installed\n", CONTENT_TYPE_LATEST
+    update_gauges(indexer, job_manager)
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -4,7 +4,9 @@ Quick Start Script - Google Instant Indexer
 Run this script to quickly index your URLs
 """
 
-from google_indexer import GoogleInstantIndexer
+from google_indexer import GoogleInstantIndexer, iter_url_lines
+from job_manager import result_outcome
+import argparse
 import json
 import time
 from datetime import datetime
@@ -17,7 +19,68 @@ def print_header():
     print("=" * 70)
     print()
 
+def stream_from_file(indexer, path=None, job_id=None):
+    """
+    Index a URL file (or stdin) of any size, writing results as they arrive
+    Runs as a checkpointed job: pass its job_id (and no path) to resume it
+    """
+    if job_id is None:
+        print(f"📋 Streaming URLs from: {'stdin' if path == '-' else path}")
+        job_id = indexer.start_job(iter_url_lines(path), max_workers=10)
+    print(f"🔖 Job ID: {job_id} (if interrupted, continue with: python quick_start.py --resume {job_id})")
+    print()
+    save_streamed_results(indexer, indexer.resume(job_id))
+
+def index_sitemap_changes(indexer, source):
+    """Index the URLs of a sitemap (file or URL) that changed since the last run"""
+    print(f"📋 Reading sitemap: {source}")
+    print()
+    save_streamed_results(indexer, indexer.index_sitemap(source, max_workers=10))
+
+def save_streamed_results(indexer, results):
+    """Write streamed results to an NDJSON file as they arrive, then print a summary"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    results_file = f"indexing_results_{timestamp}.ndjson"
+    
+    print("🚀 Starting rapid indexing...")
+    print("-" * 70)
+    
+    start_time = time.time()
+    outcomes = {'success': 0, 'skipped': 0, 'failed': 0}
+    
+    def counted(results):
+        for result in results:
+            outcomes[result_outcome(result)] += 1
+            yield result
+    
+    indexer.save_results(counted(results), results_file)
+    duration = time.time() - start_time
+    total = sum(outcomes.values())
+    
+    print("-" * 70)
+    print()
+    print("📊 INDEXING SUMMARY")
+    print("=" * 70)
+    print(f"✓ Successful: {outcomes['success']}/{total}")
+    print(f"↷ Skipped (recently submitted): {outcomes['skipped']}/{total}")
+    print(f"✗ Failed: {outcomes['failed']}/{total}")
+    print(f"⏱️  Time taken: {duration:.2f} seconds")
+    print(f"⚡ Speed: {total/duration:.2f} URLs/second" if total else "⚡ Nothing to index")
+    print(f"💾 Detailed results saved to: {results_file}")
+    print()
+
 def main():
+    parser = argparse.ArgumentParser(description="Quickly index your URLs")
+    parser.add_argument("urls_file", nargs="?",
+                        help="File with one URL per line ('-' for stdin); "
+                             "streamed, so it can be any size")
+    parser.add_argument("--resume", metavar="JOB_ID",
+                        help="Continue an interrupted urls_file run from its checkpoint")
+    parser.add_argument("--sitemap", metavar="FILE_OR_URL",
+                        help="Index the sitemap's new and changed URLs (compared with the "
+                             "previous run, kept in sitemap_state.db)")
+    args = parser.parse_args()
+    
     print_header()
     
     # Configuration
@@ -55,6 +118,14 @@ def main():
         print("🔧 Initializing with ping methods (no API key needed)...")
         indexer = GoogleInstantIndexer()
     
+    if args.sitemap:
+        index_sitemap_changes(indexer, args.sitemap)
+        return
+    
+    if args.urls_file or args.resume:
+        stream_from_file(indexer, args.urls_file, job_id=args.resume)
+        return
+    
     print(f"📋 URLs to index: {len(urls_to_index)}")
     print()
     
@@ -91,29 +162,17 @@ def main():
     print("-" * 70)
     print()
     
-    # Analyze results
-    successful = 0
-    failed = 0
-    
+    # Analyze results (bulk results succeed if any method did)
+    outcomes = {'success': 0, 'skipped': 0, 'failed': 0}
     for result in results:
-        if 'methods_used' in result:
-            # Bulk result format
-            success_methods = [m for m in result['methods_used'] 
-                             if m.get('status') == 'success']
-            if success_methods:
-                successful += 1
-            else:
-                failed += 1
-        elif result.get('status') == 'success':
-            successful += 1
-        else:
-            failed += 1
+        outcomes[result_outcome(result)] += 1
     
     # Print summary
     print("📊 INDEXING SUMMARY")
     print("=" * 70)
-    print(f"✓ Successful: {successful}/{len(urls_to_index)}")
-    print(f"✗ Failed: {failed}/{len(urls_to_index)}")
+    print(f"✓ Successful: {outcomes['success']}/{len(urls_to_index)}")
+    print(f"↷ Skipped (recently submitted): {outcomes['skipped']}/{len(urls_to_index)}")
+    print(f"✗ Failed: {outcomes['failed']}/{len(urls_to_index)}")
     print(f"⏱️  Time taken: {duration:.2f} seconds")
     print(f"⚡ Speed: {len(urls_to_index)/duration:.2f} URLs/second")
     print()
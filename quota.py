@@ -0,0 +1,152 @@
+"""
+Quota tracking for Google Instant Indexer
+Persistent daily / per-minute token bucket for the Google Indexing API
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process locking on Windows; each process then tracks its own usage
+    fcntl = None
+
+try:
+    from zoneinfo import ZoneInfo
+    # Google API quotas reset at midnight Pacific time
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+except Exception:
+    QUOTA_TIMEZONE = None
+
+
+class QuotaBucket:
+    def __init__(self, daily_limit: int = 200, per_minute_limit: int = 380,
+                 state_file: Optional[str] = "google_api_quota.json", max_wait: float = 60.0):
+        """
+        Initialize the bucket
+
+        Args:
+            daily_limit: Requests allowed per quota day
+            per_minute_limit: Requests allowed per rolling minute
+            state_file: JSON file that keeps usage across runs (None: in memory only).
+                        Processes sharing the file (queue workers) share the quota
+            max_wait: Longest a caller waits for the per-minute bucket to refill
+        """
+        self.daily_limit = daily_limit
+        self.per_minute_limit = per_minute_limit
+        self.state_file = state_file
+        self.max_wait = max_wait
+
+        self._lock = threading.Lock()
+        self._day = self._today()
+        self._used_today = 0
+        self._minute_tokens = float(per_minute_limit)
+        self._updated = time.time()
+        self._load()
+
+    def _today(self) -> str:
+        return datetime.now(QUOTA_TIMEZONE).strftime("%Y-%m-%d")
+
+    def _load(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get("day") == self._day:
+            self._used_today = int(state.get("used_today", 0))
+        self._minute_tokens = min(float(state.get("minute_tokens", self.per_minute_limit)),
+                                  float(self.per_minute_limit))
+        self._updated = float(state.get("updated", self._updated))
+
+    def _save(self):
+        if not self.state_file:
+            return
+        state = {
+            "day": self._day,
+            "used_today": self._used_today,
+            "minute_tokens": self._minute_tokens,
+            "updated": self._updated
+        }
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_file, self.state_file)
+
+    @contextmanager
+    def _shared_state(self):
+        """
+        Hold the state file's lock and start from its latest contents
+        Other processes may have spent tokens since this one last looked
+        """
+        if not self.state_file or fcntl is None:
+            yield
+            return
+        with open(f"{self.state_file}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if self._day != self._today():
+                    self._day = self._today()
+                    self._used_today = 0
+                self._load()
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refill(self):
+        """Roll the day over and top up the per-minute bucket"""
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._used_today = 0
+        now = time.time()
+        elapsed = max(0.0, now - self._updated)
+        self._minute_tokens = min(float(self.per_minute_limit),
+                                  self._minute_tokens + elapsed * self.per_minute_limit / 60.0)
+        self._updated = now
+
+    def acquire(self, count: int = 1) -> int:
+        """
+        Take up to count tokens
+        Waits (up to max_wait) for the per-minute bucket, never for the daily one
+        Returns: Number of tokens granted; the rest should be deferred
+        """
+        deadline = time.time() + self.max_wait
+        granted = 0
+        while granted < count:
+            with self._lock, self._shared_state():
+                self._refill()
+                daily_left = self.daily_limit - self._used_today
+                if daily_left <= 0:
+                    break
+                take = int(min(count - granted, daily_left, self._minute_tokens))
+                if take > 0:
+                    self._used_today += take
+                    self._minute_tokens -= take
+                    granted += take
+                    self._save()
+                    continue
+                wait = (1 - self._minute_tokens) * 60.0 / self.per_minute_limit
+            if time.time() + wait > deadline:
+                break
+            time.sleep(wait)
+        return granted
+
+    def remaining(self) -> Dict:
+        """Tokens left in each window"""
+        with self._lock, self._shared_state():
+            self._refill()
+            return {
+                "daily": max(0, self.daily_limit - self._used_today),
+                "per_minute": int(self._minute_tokens),
+                "daily_limit": self.daily_limit,
+                "per_minute_limit": self.per_minute_limit
+            }
@@ -0,0 +1,101 @@
+"""
+Result sinks for Google Instant Indexer
+Write each URL's result out as soon as it completes
+"""
+
+import gzip
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+
+class ResultSink:
+    """Base sink: receives one result dict per URL"""
+
+    def write(self, result: Dict):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class NDJSONResultSink(ResultSink):
+    def __init__(self, path: str = "indexing_results.ndjson", compress: Optional[bool] = None,
+                 max_bytes: Optional[int] = None, backup_count: int = 5, flush_every: int = 100):
+        """
+        Initialize the sink
+
+        Args:
+            path: Output file; results are appended, one JSON object per line
+            compress: Gzip the output (default: when path ends with ".gz")
+            max_bytes: Rotate once this many (uncompressed) bytes are written
+            backup_count: Rotated files kept as path.1 ... path.N
+            flush_every: Results between flushes; everything flushed survives a crash
+        """
+        self.path = path
+        self.compress = path.endswith(".gz") if compress is None else compress
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_every = flush_every
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._bytes = 0
+        self._unflushed = 0
+        self.count = 0
+
+    def _open(self):
+        # An existing file counts toward max_bytes (compressed files by their size on disk)
+        self._bytes = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if self.compress:
+            # Appending adds a new gzip member; readers see one continuous stream
+            self._file = gzip.open(self.path, "at", encoding="utf-8")
+        else:
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        if self.backup_count > 0:
+            for number in range(self.backup_count - 1, 0, -1):
+                older = f"{self.path}.{number}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.path}.{number + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def write(self, result: Dict):
+        line = json.dumps(result, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._open()
+            elif self.max_bytes and self._bytes + len(line) > self.max_bytes and self._bytes > 0:
+                self._rotate()
+                self._open()
+            self._file.write(line)
+            self._bytes += len(line)
+            self.count += 1
+            self._unflushed += 1
+            if self._unflushed >= self.flush_every:
+                self._file.flush()
+                self._unflushed = 0
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                self._unflushed = 0
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,207 @@
+"""
+Compact result storage for Google Instant Indexer
+Keeps per-URL results in columnar arrays instead of nested dicts, so jobs
+with millions of URLs hold tens of bytes per URL rather than kilobytes
+"""
+
+import math
+import threading
+from array import array
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Result statuses stored as one-byte codes; anything else stays in the layout
+STATUSES = ("success", "failed", "skipped", "deferred")
+_STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+# Stand-in for a field whose value lives in a column, inside an interned layout
+_COLUMN = object()
+# Layout code of rows whose layout could not be interned (kept in _extras)
+_UNINTERNED = 0
+# Tags of nested dicts and lists frozen into tuples, so layouts holding them intern
+_DICT = object()
+_LIST = object()
+
+_URL_COLUMNS = ("url", "timestamp", "status", "methods_used")
+_METHOD_COLUMNS = ("url", "timestamp", "status", "status_code")
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return (_DICT, tuple((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, list):
+        return (_LIST, tuple(_freeze(item) for item in value))
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, tuple) and value and (value[0] is _DICT or value[0] is _LIST):
+        if value[0] is _DICT:
+            return {key: _thaw(item) for key, item in value[1]}
+        return [_thaw(item) for item in value[1]]
+    return value
+
+
+def _epoch(value) -> Optional[float]:
+    """ISO timestamp string as epoch seconds, or None if it is not one"""
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+class ResultStore:
+    def __init__(self):
+        """
+        Append-only store of result dicts in the shape rapid_index_bulk produces
+
+        Each dict is split into columns (status codes, HTTP status codes,
+        epoch timestamps) plus a layout: the remaining keys and values, with
+        placeholders marking where column values go. Layouts are interned, so
+        the method names, services, batch and chunk ids repeated across
+        millions of URLs are held once, and so are repeated nested values
+        such as routes (frozen into tuples). Dicts are rebuilt, in their original
+        key order, only when a page or an export is read
+        """
+        self._lock = threading.Lock()
+        self._layouts: List[Optional[Tuple]] = [None]
+        self._layout_codes: Dict[Tuple, int] = {}
+        # Layouts holding values that cannot be frozen (e.g. sets), by row
+        self._extras: Dict[Tuple[str, int], Tuple] = {}
+
+        # One row per URL; a URL's methods are rows _method_end[i-1].._method_end[i]
+        self._urls: List[str] = []
+        self._layout = array("I")
+        self._status = array("b")
+        self._timestamp = array("d")
+        self._method_end = array("I")
+
+        # One row per entry in methods_used
+        self._m_layout = array("I")
+        self._m_status = array("b")
+        self._m_status_code = array("h")
+        self._m_timestamp = array("d")
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def _intern(self, kind: str, row: int, layout: Tuple) -> int:
+        try:
+            code = self._layout_codes.get(layout)
+        except TypeError:
+            self._extras[(kind, row)] = layout
+            return _UNINTERNED
+        if code is None:
+            code = len(self._layouts)
+            self._layouts.append(layout)
+            self._layout_codes[layout] = code
+        return code
+
+    def _split(self, item: Dict, columns: Tuple[str, ...], url: Optional[str]):
+        """(layout, status code, status_code, epoch) for one dict"""
+        layout = []
+        status = -1
+        status_code = -1
+        timestamp = math.nan
+        for key, value in item.items():
+            if key in columns:
+                if key == "url" and value == url:
+                    layout.append((key, _COLUMN))
+                    continue
+                if key == "timestamp":
+                    epoch = _epoch(value)
+                    if epoch is not None:
+                        timestamp = epoch
+                        layout.append((key, _COLUMN))
+                        continue
+                if key == "status" and value in _STATUS_CODES:
+                    status = _STATUS_CODES[value]
+                    layout.append((key, _COLUMN))
+                    continue
+                if key == "status_code" and isinstance(value, int) and 0 <= value < 32768:
+                    status_code = value
+                    layout.append((key, _COLUMN))
+                    continue
+                if key == "methods_used":
+                    layout.append((key, _COLUMN))
+                    continue
+            layout.append((key, _freeze(value)))
+        return tuple(layout), status, status_code, timestamp
+
+    def append(self, result: Dict):
+        """Add one URL's result"""
+        url = result.get("url")
+        with self._lock:
+            for method in result.get("methods_used", ()):
+                row = len(self._m_layout)
+                layout, status, status_code, timestamp = self._split(method, _METHOD_COLUMNS, url)
+                self._m_layout.append(self._intern("method", row, layout))
+                self._m_status.append(status)
+                self._m_status_code.append(status_code)
+                self._m_timestamp.append(timestamp)
+
+            row = len(self._urls)
+            layout, status, _, timestamp = self._split(result, _URL_COLUMNS, url)
+            self._layout.append(self._intern("url", row, layout))
+            self._status.append(status)
+            self._timestamp.append(timestamp)
+            self._method_end.append(len(self._m_layout))
+            # Appended last: readers go by len(self._urls)
+            self._urls.append(url)
+
+    def _layout_of(self, kind: str, row: int, code: int) -> Tuple:
+        return self._extras[(kind, row)] if code == _UNINTERNED else self._layouts[code]
+
+    def _method(self, row: int, url: str) -> Dict:
+        method = {}
+        for key, value in self._layout_of("method", row, self._m_layout[row]):
+            if value is _COLUMN:
+                if key == "url":
+                    value = url
+                elif key == "timestamp":
+                    value = datetime.fromtimestamp(self._m_timestamp[row]).isoformat()
+                elif key == "status":
+                    value = STATUSES[self._m_status[row]]
+                else:
+                    value = self._m_status_code[row]
+            else:
+                value = _thaw(value)
+            method[key] = value
+        return method
+
+    def _result(self, row: int) -> Dict:
+        url = self._urls[row]
+        result = {}
+        for key, value in self._layout_of("url", row, self._layout[row]):
+            if value is _COLUMN:
+                if key == "url":
+                    value = url
+                elif key == "timestamp":
+                    value = datetime.fromtimestamp(self._timestamp[row]).isoformat()
+                elif key == "status":
+                    value = STATUSES[self._status[row]]
+                else:
+                    start = self._method_end[row - 1] if row else 0
+                    value = [self._method(m, url) for m in range(start, self._method_end[row])]
+            else:
+                value = _thaw(value)
+            result[key] = value
+        return result
+
+    def page(self, start: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """Results start .. start + limit as dicts, in the order they were added"""
+        with self._lock:
+            stop = len(self._urls) if limit is None else min(len(self._urls), start + limit)
+            return [self._result(row) for row in range(max(0, start), stop)]
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Every result as a dict, converted one page at a time (for exports)"""
+        start = 0
+        while True:
+            page = self.page(start, 1000)
+            if not page:
+                return
+            yield from page
+            start += len(page)
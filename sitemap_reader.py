@@ -0,0 +1,233 @@
+"""
+Streaming sitemap reader for Google Instant Indexer
+Parses sitemaps and sitemap indexes (files or URLs, plain or gzipped)
+incrementally, and diffs their <loc>/<lastmod> against the state of the
+previous run, so daily runs only submit the URLs that are new or changed
+"""
+
+import hashlib
+import os
+import sqlite3
+import zlib
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+from http_transport import HttpTransport
+from sitemap_writer import SITEMAP_NS
+from url_normalizer import InvalidURL, canonical_key, normalize_url
+
+DEFAULT_SITEMAP_STATE = "sitemap_state.db"
+# Sitemap indexes may not nest; one level of slack for sites that do anyway
+MAX_INDEX_DEPTH = 2
+CHANNEL_SITEMAP_FETCH = "sitemap_fetch"
+# SQLite caps the number of bound parameters per statement
+LOOKUP_CHUNK = 500
+# Bytes read (or downloaded) and fed to the parser at a time
+READ_CHUNK = 64 * 1024
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def _is_url(source: str) -> bool:
+    return urlparse(source).scheme in ("http", "https")
+
+
+def _sitemap_name(tag: str) -> Optional[str]:
+    """Local name of a sitemap-protocol tag; None for extensions (image:, news:, ...)"""
+    if tag.startswith("{"):
+        namespace, _, name = tag[1:].partition("}")
+        return name if namespace == SITEMAP_NS else None
+    # Some generators leave out the namespace altogether
+    return tag
+
+
+def _read_chunks(source: str, transport: HttpTransport) -> Iterator[bytes]:
+    """Raw bytes of a sitemap file or URL, READ_CHUNK at a time"""
+    if _is_url(source):
+        response = transport.get(source, stream=True, timeout=30, channel=CHANNEL_SITEMAP_FETCH)
+        try:
+            response.raise_for_status()
+            # Undoes Content-Encoding only; a served .xml.gz file is still gzip data
+            yield from response.iter_content(READ_CHUNK)
+        finally:
+            response.close()
+        return
+    with open(source, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _xml_chunks(source: str, transport: HttpTransport) -> Iterator[bytes]:
+    """Sitemap XML READ_CHUNK at a time, gunzipped on the fly if it is gzip data"""
+    decompressor = None
+    for chunk in _read_chunks(source, transport):
+        if decompressor is None and chunk:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if chunk[:2] == GZIP_MAGIC else False
+        yield decompressor.decompress(chunk) if decompressor else chunk
+    if decompressor:
+        yield decompressor.flush()
+
+
+def iter_sitemap(source: str, transport: Optional[HttpTransport] = None,
+                 _depth: int = 0) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    (loc, lastmod) of every URL in a sitemap, read incrementally
+    A sitemap index is followed into each of its sitemaps (relative <loc>s
+    resolve against the index). Only <loc>/<lastmod> directly under a <url>
+    or <sitemap> count, so extension entries such as <image:loc> are ignored.
+    Each <url> element is discarded once read, so memory stays flat whatever
+    the file size
+
+    Args:
+        source: Path or http(s) URL of a sitemap or sitemap index, plain or gzipped
+        transport: Pooled transport for fetching URLs (default: a new one)
+    """
+    if _is_url(source) and transport is None:
+        transport = HttpTransport()
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root = None
+    # Root is depth 1, <url>/<sitemap> depth 2, their <loc>/<lastmod> depth 3
+    depth = 0
+    loc = lastmod = None
+    children: List[str] = []
+    for chunk in _xml_chunks(source, transport):
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == "start":
+                depth += 1
+                if root is None:
+                    root = element
+                continue
+            depth -= 1
+            name = _sitemap_name(element.tag)
+            if depth == 2 and name == "loc":
+                loc = (element.text or "").strip() or None
+            elif depth == 2 and name == "lastmod":
+                lastmod = (element.text or "").strip() or None
+            elif depth == 1 and name in ("url", "sitemap"):
+                if loc is not None:
+                    if name == "url":
+                        yield loc, lastmod
+                    else:
+                        children.append(loc)
+                loc = lastmod = None
+                root.clear()
+    parser.close()
+
+    # Child sitemap locations are few, so they are only followed after the index is read
+    if children and _depth >= MAX_INDEX_DEPTH:
+        raise ValueError(f"sitemap indexes nested deeper than {MAX_INDEX_DEPTH} levels at {source}")
+    base = source if _is_url(source) else os.path.abspath(source)
+    for child in children:
+        if not _is_url(child) and not _is_url(source):
+            child = os.path.join(os.path.dirname(base), child)
+        elif not _is_url(child):
+            child = urljoin(base, child)
+        yield from iter_sitemap(child, transport, _depth + 1)
+
+
+def _state_key(url: str) -> int:
+    """Signed 64-bit key of a URL's canonical form (an SQLite INTEGER PRIMARY KEY)"""
+    try:
+        url = canonical_key(normalize_url(url))
+    except InvalidURL:
+        pass
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+class SitemapState:
+    def __init__(self, path: str = DEFAULT_SITEMAP_STATE):
+        """
+        The <lastmod> last seen for each sitemap URL, kept between runs
+
+        Args:
+            path: SQLite database file (":memory:" for a throwaway state).
+                  Rows are an 8-byte key and the lastmod, so a 5M-URL site
+                  takes about 150MB
+        """
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sitemap_urls (
+                key INTEGER PRIMARY KEY,
+                lastmod TEXT
+            )
+        """)
+        self._conn.commit()
+        self.seen = 0
+        self.new = 0
+        self.changed = 0
+        self.saved = 0
+        # Lastmod of each entry diff yielded, until save() or forget() settles it
+        self._pending: Dict[int, Optional[str]] = {}
+
+    def _lookup(self, keys: List[int]) -> Dict[int, Optional[str]]:
+        placeholders = ",".join("?" * len(keys))
+        rows = self._conn.execute(f"SELECT key, lastmod FROM sitemap_urls WHERE key IN ({placeholders})", keys)
+        return dict(rows)
+
+    def diff(self, entries: Iterable[Tuple[str, Optional[str]]]) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        Entries that are new, or whose lastmod differs from the stored one
+        An entry without a lastmod only counts the first time it is seen.
+        Nothing is stored yet: call save(url) once an entry was submitted, so
+        entries that failed are yielded again by the next run
+        """
+        batch: List[Tuple[int, str, Optional[str]]] = []
+
+        def flush():
+            known = self._lookup(list({key for key, _, _ in batch}))
+            for key, url, lastmod in batch:
+                if key not in known:
+                    self.new += 1
+                elif lastmod is not None and lastmod != known[key]:
+                    self.changed += 1
+                else:
+                    continue
+                known[key] = lastmod if lastmod is not None else known.get(key)
+                self._pending[key] = known[key]
+                yield url, lastmod
+
+        for url, lastmod in entries:
+            self.seen += 1
+            batch.append((_state_key(url), url, lastmod))
+            if len(batch) >= LOOKUP_CHUNK:
+                yield from flush()
+                batch.clear()
+        if batch:
+            yield from flush()
+
+    def save(self, url: str):
+        """Store the lastmod of an entry diff yielded (kept on commit)"""
+        key = _state_key(url)
+        if key not in self._pending:
+            return
+        self._conn.execute("INSERT OR REPLACE INTO sitemap_urls (key, lastmod) VALUES (?, ?)",
+                           (key, self._pending.pop(key)))
+        self.saved += 1
+
+    def forget(self, url: str):
+        """Leave an entry diff yielded unstored, so the next run yields it again"""
+        self._pending.pop(_state_key(url), None)
+
+    def commit(self):
+        """Keep the entries saved so far"""
+        self._conn.commit()
+
+    def rollback(self):
+        """Drop the entries saved since the last commit"""
+        self._conn.rollback()
+
+    def report(self) -> Dict:
+        return {"seen": self.seen, "new": self.new, "changed": self.changed,
+                "unchanged": self.seen - self.new - self.changed, "saved": self.saved}
+
+    def close(self):
+        self._conn.close()
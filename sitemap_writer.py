@@ -0,0 +1,164 @@
+"""
+Streaming sitemap writer for Google Instant Indexer
+Writes URLs incrementally, rolls over at the sitemap protocol limits
+and ties the parts together with a sitemap index
+"""
+
+import gzip
+import os
+import shutil
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from xml.sax.saxutils import escape
+
+# Sitemap protocol limits per file (size is measured uncompressed)
+SITEMAP_MAX_URLS = 50000
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+URLSET_HEADER = f'<?xml version="1.0" encoding="utf-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n'
+URLSET_FOOTER = "</urlset>\n"
+
+# A URL, or (url, lastmod, priority), or {"url": ..., "lastmod": ..., "priority": ...}
+SitemapEntry = Union[str, Tuple, Dict]
+
+
+def _format_lastmod(lastmod) -> str:
+    if isinstance(lastmod, (datetime, date)):
+        return lastmod.isoformat()
+    return str(lastmod)
+
+
+def _normalize_entry(entry: SitemapEntry) -> Tuple[str, Optional[object], Optional[object]]:
+    if isinstance(entry, str):
+        return entry, None, None
+    if isinstance(entry, dict):
+        return entry["url"], entry.get("lastmod"), entry.get("priority")
+    url, *rest = entry
+    rest += [None] * (2 - len(rest))
+    return url, rest[0], rest[1]
+
+
+class SitemapWriter:
+    def __init__(self, path: str, base_url: Optional[str] = None,
+                 max_urls: int = SITEMAP_MAX_URLS, max_bytes: int = SITEMAP_MAX_BYTES):
+        """
+        Initialize the writer
+
+        Args:
+            path: Where the sitemap goes; becomes a sitemap index if the URLs
+                  need more than one file (a ".gz" suffix compresses it)
+            base_url: Public URL of path's directory, used for index entries
+            max_urls: URLs per file before rolling over
+            max_bytes: Uncompressed bytes per file before rolling over
+        """
+        self.path = path
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.max_urls = max_urls
+        self.max_bytes = max_bytes
+
+        name = os.path.basename(path)
+        for suffix in (".xml.gz", ".xml", ".gz"):
+            if name.endswith(suffix):
+                name = name[:-len(suffix)]
+                break
+        self._directory = os.path.dirname(path)
+        self._stem = name
+        self.parts: List[str] = []
+        self.url_count = 0
+        self._file = None
+        self._part_urls = 0
+        self._part_bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _part_path(self, number: int) -> str:
+        return os.path.join(self._directory, f"{self._stem}-{number}.xml.gz")
+
+    def _open(self, path: str):
+        if path.endswith(".gz"):
+            return gzip.open(path, "wt", encoding="utf-8")
+        return open(path, "w", encoding="utf-8")
+
+    def _start_part(self):
+        # The first part is written straight to path; it only becomes a
+        # numbered part if a rollover turns path into an index
+        path = self.path if not self.parts else self._part_path(len(self.parts) + 1)
+        self._file = self._open(path)
+        self._file.write(URLSET_HEADER)
+        self.parts.append(path)
+        self._part_urls = 0
+        self._part_bytes = len(URLSET_HEADER.encode("utf-8")) + len(URLSET_FOOTER)
+
+    def _finish_part(self):
+        self._file.write(URLSET_FOOTER)
+        self._file.close()
+        self._file = None
+
+    def _rollover(self):
+        self._finish_part()
+        if len(self.parts) == 1:
+            # Move the first part out of the way so path can hold the index
+            first_part = self._part_path(1)
+            if self.path.endswith(".gz"):
+                os.replace(self.path, first_part)
+            else:
+                with open(self.path, "rb") as src, gzip.open(first_part, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(self.path)
+            self.parts[0] = first_part
+        self._start_part()
+
+    def add(self, url: str, lastmod=None, priority=None):
+        """Append one URL, rolling over to a new file at the limits"""
+        element = f"  <url>\n    <loc>{escape(url)}</loc>\n"
+        if lastmod is not None:
+            element += f"    <lastmod>{escape(_format_lastmod(lastmod))}</lastmod>\n"
+        if priority is not None:
+            element += f"    <priority>{priority}</priority>\n"
+        element += "  </url>\n"
+        size = len(element.encode("utf-8"))
+
+        if self._file is None:
+            self._start_part()
+        elif self._part_urls >= self.max_urls or self._part_bytes + size > self.max_bytes:
+            self._rollover()
+
+        self._file.write(element)
+        self._part_urls += 1
+        self._part_bytes += size
+        self.url_count += 1
+
+    def add_all(self, entries: Iterable[SitemapEntry]):
+        """Append every entry from an iterator, one at a time"""
+        for entry in entries:
+            self.add(*_normalize_entry(entry))
+
+    def _write_index(self):
+        with self._open(self.path) as f:
+            f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+            f.write(f'<sitemapindex xmlns="{SITEMAP_NS}">\n')
+            lastmod = datetime.now().strftime("%Y-%m-%d")
+            for part in self.parts:
+                name = os.path.basename(part)
+                loc = f"{self.base_url}/{name}" if self.base_url else name
+                f.write(f"  <sitemap>\n    <loc>{escape(loc)}</loc>\n"
+                        f"    <lastmod>{lastmod}</lastmod>\n  </sitemap>\n")
+            f.write("</sitemapindex>\n")
+
+    def close(self) -> str:
+        """
+        Finish the last file and write the index if there are several parts
+        Returns: Path to the sitemap (or sitemap index) to submit
+        """
+        if self._file is None and not self.parts:
+            self._start_part()
+        if self._file is not None:
+            self._finish_part()
+        if len(self.parts) > 1:
+            self._write_index()
+        return self.path
@@ -0,0 +1,218 @@
+"""
+Index status checking for Google Instant Indexer
+TTL + LRU cache in front of site: searches, with single-flight coalescing
+and bounded-concurrency bulk checks, for threads or an event loop
+"""
+
+import asyncio
+import concurrent.futures
+import html
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlparse
+
+HREF_PATTERN = re.compile(r'href="([^"]+)"')
+NO_RESULTS_MARKERS = ("did not match any documents", "No results found for")
+BLOCKED_MARKERS = ("/sorry/", "unusual traffic from your computer network")
+
+
+def _normalize(url: str) -> Tuple[str, str]:
+    """Comparable form of a URL: (host without www., path without trailing slash + query)"""
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = parsed.path.rstrip("/") or "/"
+    if parsed.query:
+        path += "?" + parsed.query
+    return host, path
+
+
+def result_links(page: str) -> Set[Tuple[str, str]]:
+    """Normalized result URLs linked from a search results page"""
+    links = set()
+    for match in HREF_PATTERN.finditer(page):
+        href = html.unescape(match.group(1))
+        if href.startswith("/url?"):
+            # Plain-HTML result pages wrap targets as /url?q=<target>&sa=...
+            target = parse_qs(urlparse(href).query).get("q")
+            if not target:
+                continue
+            href = target[0]
+        if href.startswith(("http://", "https://")):
+            links.add(_normalize(href))
+    return links
+
+
+def parse_indexed(page: str, url: str) -> Optional[bool]:
+    """
+    Whether a site: results page lists url
+    Returns None when the page is a block or captcha page rather than results
+    """
+    if any(marker in page for marker in BLOCKED_MARKERS):
+        return None
+    if any(marker in page for marker in NO_RESULTS_MARKERS):
+        return False
+    return _normalize(url) in result_links(page)
+
+
+class StatusChecker:
+    def __init__(self, ttl: float = 3600, error_ttl: float = 60, max_entries: int = 10000,
+                 max_concurrency: int = 8):
+        """
+        Initialize the checker
+
+        Args:
+            ttl: Seconds a definite answer (indexed or not) is served from cache
+            error_ttl: Seconds an "unknown" answer is cached, so a blocked or
+                       failing search is not hammered by repeated checks
+            max_entries: Cached URLs kept; the least recently used go first
+            max_concurrency: Searches run at once by check_many
+        """
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.max_entries = max_entries
+        self.max_concurrency = max_concurrency
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._in_flight: Dict[str, concurrent.futures.Future] = {}
+        # Searches started by check_async; only touched from the event loop's thread
+        self._async_in_flight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def cached(self, url: str) -> Optional[Dict]:
+        """Cached result for url if still fresh, marked cached=True"""
+        with self._lock:
+            return self._cached(url)
+
+    def _cached(self, url: str) -> Optional[Dict]:
+        entry = self._cache.get(url)
+        if entry is None:
+            return None
+        expires, result = entry
+        if expires <= time.time():
+            del self._cache[url]
+            return None
+        self._cache.move_to_end(url)
+        self.hits += 1
+        return dict(result, cached=True)
+
+    def store(self, url: str, result: Dict):
+        """Cache a fresh result; how long depends on whether it is definite"""
+        ttl = self.ttl if result.get("indexed") in (True, False) else self.error_ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._cache[url] = (time.time() + ttl, result)
+            self._cache.move_to_end(url)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def check(self, url: str, fetch: Callable[[str], Dict], force: bool = False) -> Dict:
+        """
+        Status of url from cache, or from fetch(url)
+        Concurrent checks of the same URL share a single fetch
+        """
+        with self._lock:
+            if not force:
+                result = self._cached(url)
+                if result is not None:
+                    return result
+            future = self._in_flight.get(url)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                self._in_flight[url] = future
+                self.misses += 1
+        if not leader:
+            return dict(future.result(), cached=True)
+
+        result = {"url": url, "indexed": "unknown", "error": "status check interrupted"}
+        try:
+            result = fetch(url)
+            self.store(url, result)
+        except Exception as e:
+            result = {"url": url, "indexed": "unknown", "error": str(e)}
+        finally:
+            # Release the waiters whatever happened to the fetch
+            with self._lock:
+                del self._in_flight[url]
+            future.set_result(result)
+        return dict(result, cached=False)
+
+    def check_many(self, urls: List[str], fetch: Callable[[str], Dict], force: bool = False) -> List[Dict]:
+        """
+        Status of many URLs, in input order
+        Cached answers are used as is; the rest run max_concurrency at a time
+        """
+        results: List[Optional[Dict]] = [None] * len(urls)
+        misses = []
+        for index, url in enumerate(urls):
+            cached = None if force else self.cached(url)
+            if cached is not None:
+                results[index] = cached
+            else:
+                misses.append(index)
+        if misses:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                for index, result in zip(misses, executor.map(
+                        lambda i: self.check(urls[i], fetch, force=force), misses)):
+                    results[index] = result
+        return results
+
+    async def check_async(self, url: str, fetch: Callable[[str], Awaitable[Dict]], force: bool = False) -> Dict:
+        """
+        check for an event loop: fetch is a coroutine function, and concurrent
+        checks of the same URL await a single fetch
+        """
+        if not force:
+            result = self.cached(url)
+            if result is not None:
+                return result
+        future = self._async_in_flight.get(url)
+        if future is not None:
+            return dict(await asyncio.shield(future), cached=True)
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_in_flight[url] = future
+        with self._lock:
+            self.misses += 1
+        result = {"url": url, "indexed": "unknown", "error": "status check interrupted"}
+        try:
+            result = await fetch(url)
+            self.store(url, result)
+        except Exception as e:
+            result = {"url": url, "indexed": "unknown", "error": str(e)}
+        finally:
+            # Release the waiters whatever happened to the fetch
+            del self._async_in_flight[url]
+            future.set_result(result)
+        return dict(result, cached=False)
+
+    async def check_many_async(self, urls: List[str], fetch: Callable[[str], Awaitable[Dict]],
+                               force: bool = False) -> List[Dict]:
+        """check_many for an event loop: searches run max_concurrency at a time"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def check_one(url):
+            cached = None if force else self.cached(url)
+            if cached is not None:
+                return cached
+            async with semaphore:
+                return await self.check_async(url, fetch, force=force)
+
+        return list(await asyncio.gather(*(check_one(url) for url in urls)))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._cache),
+                "in_flight": len(self._in_flight) + len(self._async_in_flight),
+                "hits": self.hits,
+                "misses": self.misses
+            }
@@ -0,0 +1,82 @@
+"""
+Submission ledger for Google Instant Indexer
+Embedded SQLite record of when each URL was last submitted, per method
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Set, Tuple
+
+# SQLite caps the number of bound parameters per statement
+LOOKUP_CHUNK = 500
+
+
+class SubmissionLedger:
+    def __init__(self, path: str = "submission_ledger.db", ttl: float = 24 * 3600):
+        """
+        Initialize the ledger
+
+        Args:
+            path: SQLite database file (":memory:" for a throwaway ledger)
+            ttl: Seconds a successful submission stays fresh
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS submissions (
+                url TEXT NOT NULL,
+                method TEXT NOT NULL,
+                submitted_at REAL NOT NULL,
+                status TEXT NOT NULL,
+                PRIMARY KEY (url, method)
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    def fresh_urls(self, urls: Iterable[str], method: str, ttl: Optional[float] = None) -> Set[str]:
+        """
+        URLs successfully submitted via method within the TTL
+        Uses the (url, method) primary key, so cost grows with len(urls), not the ledger
+        """
+        cutoff = time.time() - (self.ttl if ttl is None else ttl)
+        fresh = set()
+        batch: List[str] = []
+
+        def lookup():
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT url FROM submissions WHERE method = ? AND status = 'success' "
+                f"AND submitted_at >= ? AND url IN ({placeholders})",
+                [method, cutoff, *batch]
+            )
+            fresh.update(row[0] for row in rows)
+
+        with self._lock:
+            for url in urls:
+                batch.append(url)
+                if len(batch) >= LOOKUP_CHUNK:
+                    lookup()
+                    batch.clear()
+            if batch:
+                lookup()
+        return fresh
+
+    def record(self, submissions: Iterable[Tuple[str, str, str]], submitted_at: Optional[float] = None):
+        """Store (url, method, status) outcomes, replacing older entries"""
+        submitted_at = time.time() if submitted_at is None else submitted_at
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO submissions (url, method, submitted_at, status) VALUES (?, ?, ?, ?)",
+                ((url, method, submitted_at, status) for url, method, status in submissions)
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+from circuit_breaker import BREAKER_CLOSED, BREAKER_OPEN, CircuitBreaker, ServiceHealth
+from google_indexer import GoogleInstantIndexer
+from quota import QuotaBucket
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure("down")
+    assert breaker.state == BREAKER_OPEN
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker("ping.example", failure_threshold=2, reset_timeout=0)
+    open_breaker(breaker)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == BREAKER_CLOSED and breaker.allow()
+
+
+class HangingTransport:
+    """Async requests that never answer"""
+
+    async def async_request(self, session, method, url, **kwargs):
+        await asyncio.sleep(3600)
+
+
+def test_cancelled_probe_is_released():
+    health = ServiceHealth(failure_threshold=1, reset_timeout=0)
+    indexer = GoogleInstantIndexer(ping_health=health, google_quota=QuotaBucket(state_file=None))
+    indexer.transport = HangingTransport()
+    service = indexer._ping_service_urls("https://example.com/")[0]
+    breaker = indexer._ping_breaker(service)
+    open_breaker(breaker)
+
+    async def cancel_probe():
+        task = asyncio.ensure_future(indexer._ping_service_async(None, service))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(cancel_probe())
+    time.sleep(0.001)
+    assert breaker.allow()
@@ -0,0 +1,35 @@
+import time
+
+from job_manager import FINISHED_STATES, JobManager
+from job_queue import SQLiteJobQueue
+
+
+def fresh(url):
+    return {"url": url, "status": "skipped", "message": "recently submitted (ledger)", "methods_used": []}
+
+
+def test_job_of_fresh_urls_counts_skips_not_failures():
+    manager = JobManager(lambda urls, on_result: [on_result(fresh(url)) for url in urls], workers=2, chunk_size=2)
+    try:
+        job = manager.submit([f"https://example.com/{i}" for i in range(5)])
+        deadline = time.time() + 5
+        while job.status not in FINISHED_STATES and time.time() < deadline:
+            time.sleep(0.01)
+        summary = job.summary()
+    finally:
+        manager.shutdown()
+    assert summary["status"] == "complete"
+    assert (summary["processed"], summary["successful"], summary["skipped"], summary["failed"]) == (5, 0, 5, 0)
+
+
+def test_queued_job_of_fresh_urls_counts_skips_not_failures(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / "queue.db"))
+    try:
+        job = queue.submit(["https://example.com/a", "https://example.com/b"])
+        batch_id, _, _, urls = queue.lease("worker")
+        ok = {"url": "https://example.com/c", "methods_used": [{"status": "success"}]}
+        assert queue.record(batch_id, "worker", [fresh(url) for url in urls] + [ok], done=True)
+        summary = queue.get(job.id).summary()
+    finally:
+        queue.shutdown()
+    assert (summary["successful"], summary["skipped"], summary["failed"]) == (1, 2, 0)
@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from job_queue import MAX_BATCH_ATTEMPTS, SQLiteJobQueue
+
+URLS = ["https://example.com/a", "https://example.com/b", "https://example.com/c"]
+
+
+def success(url):
+    return {"url": url, "methods_used": [{"status": "success"}]}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    # Leases lapse almost at once, so a worker that stops reporting is taken over
+    queue = SQLiteJobQueue(str(tmp_path / "queue.db"), lease_seconds=0.05)
+    yield queue
+    queue.shutdown()
+
+
+def expire_leases():
+    time.sleep(0.06)
+
+
+def test_lease_is_held_until_it_expires(queue):
+    queue.submit(URLS)
+    assert queue.lease("worker-1") is not None
+    assert queue.lease("worker-2") is None
+    expire_leases()
+    assert queue.lease("worker-2") is not None
+
+
+def test_takeover_gets_only_urls_without_a_result(queue):
+    job = queue.submit(URLS)
+    batch_id, job_id, _, urls = queue.lease("worker-1")
+    assert (job_id, urls) == (job.id, URLS)
+    assert queue.record(batch_id, "worker-1", [success(url) for url in URLS[:2]])
+    expire_leases()
+
+    batch_id_2, _, _, urls = queue.lease("worker-2")
+    assert (batch_id_2, urls) == (batch_id, URLS[2:])
+    # The first worker lost its lease: its late results are dropped
+    assert not queue.record(batch_id, "worker-1", [success(URLS[2])], done=True)
+    assert queue.record(batch_id, "worker-2", [success(URLS[2])], done=True)
+
+    summary = queue.get(job.id).summary()
+    assert (summary["status"], summary["processed"], summary["successful"]) == ("complete", 3, 3)
+
+
+def test_batch_is_abandoned_after_max_attempts(queue):
+    job = queue.submit(URLS)
+    for attempt in range(MAX_BATCH_ATTEMPTS):
+        batch_id, _, _, _ = queue.lease(f"worker-{attempt}")
+        if attempt == 0:
+            assert queue.record(batch_id, "worker-0", [success(URLS[0])])
+        expire_leases()
+
+    assert queue.lease("worker-last") is None
+    summary = queue.get(job.id).summary()
+    assert (summary["status"], summary["successful"], summary["failed"]) == ("complete", 1, 2)
+    results, _ = queue.results_page(job.id)
+    assert all("abandoned" in result["error"] for result in results[1:])
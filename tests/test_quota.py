@@ -0,0 +1,49 @@
+import time
+
+from google_indexer import GoogleInstantIndexer
+from quota import QuotaBucket
+
+
+def test_daily_limit_grants_what_is_left_then_nothing():
+    bucket = QuotaBucket(daily_limit=3, per_minute_limit=100, state_file=None)
+    assert bucket.acquire(5) == 3
+    started = time.time()
+    # The daily bucket is never waited on
+    assert bucket.acquire(1) == 0
+    assert time.time() - started < 0.5
+    assert bucket.remaining()["daily"] == 0
+
+
+def test_minute_limit_defers_past_max_wait():
+    bucket = QuotaBucket(daily_limit=100, per_minute_limit=2, state_file=None, max_wait=0)
+    assert bucket.acquire(5) == 2
+    assert bucket.acquire(1) == 0
+    assert bucket.remaining()["daily"] == 98
+
+
+def test_minute_limit_waits_for_refill_within_max_wait():
+    # 600 per minute refills one token every 0.1s
+    bucket = QuotaBucket(daily_limit=1000, per_minute_limit=600, state_file=None, max_wait=2)
+    assert bucket.acquire(600) == 600
+    started = time.time()
+    assert bucket.acquire(1) == 1
+    assert 0.05 < time.time() - started < 1
+
+
+def test_usage_is_shared_through_the_state_file(tmp_path):
+    state_file = str(tmp_path / "quota.json")
+    assert QuotaBucket(daily_limit=5, state_file=state_file).acquire(4) == 4
+    assert QuotaBucket(daily_limit=5, state_file=state_file).acquire(4) == 1
+
+
+class NeverCalled:
+    def urlNotifications(self):
+        raise AssertionError("a deferred URL must not reach the API")
+
+
+def test_exhausted_quota_defers_google_api_calls():
+    indexer = GoogleInstantIndexer(google_quota=QuotaBucket(daily_limit=0, state_file=None))
+    indexer.indexing_service = NeverCalled()
+    result = indexer.index_via_google_api("https://example.com/a")
+    assert result["status"] == "deferred"
+    assert result["message"].startswith("quota deferred")
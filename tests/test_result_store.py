@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+from result_store import ResultStore
+
+
+def bulk_result(i, now):
+    url = f"https://example.com/page-{i}"
+    return {
+        "url": url,
+        "timestamp": (now + timedelta(microseconds=i * 1234)).isoformat(),
+        "methods_used": [
+            {"method": "Google Indexing API", "url": url, "status": "deferred", "message": "quota deferred"},
+            {"service": f"https://ping.example/?url={url}", "status": "success", "status_code": 200,
+             "batch_id": "sitemap-1", "sitemap_url": "https://me.example/sitemap.xml"},
+            {"service": "https://other.example/ping", "status": "failed", "error": "timeout"},
+        ],
+        "route": {"priority": i % 11, "channels": ["sitemap_ping"], "deferred": [],
+                  "reasons": {"sitemap_ping": "batched: one sitemap ping per host"}},
+    }
+
+
+def test_round_trip_keeps_every_result_and_key_order():
+    now = datetime(2026, 1, 2, 3, 4, 5, 678901)
+    originals = [bulk_result(i, now) for i in range(50)]
+    originals += [
+        # Values that do not fit a column stay in the layout
+        {"url": "https://example.com/odd", "timestamp": "not a date", "status": "queued",
+         "methods_used": [{"url": "https://elsewhere.example/", "status_code": "200"}]},
+        {"status": "skipped", "url": "https://example.com/fresh", "message": "recently submitted (ledger)",
+         "methods_used": []},
+        # Unhashable values are kept apart instead of interned
+        {"url": "https://example.com/set", "tags": {"tier1"}, "methods_used": []},
+        {"url": None, "status": "failed", "error": "invalid URL"},
+    ]
+    store = ResultStore()
+    for result in originals:
+        store.append(result)
+
+    assert len(store) == len(originals)
+    assert list(store) == originals
+    assert [list(result) for result in store.page(0)] == [list(result) for result in originals]
+    assert [list(method) for method in store.page(3, 1)[0]["methods_used"]] == \
+        [list(method) for method in originals[3]["methods_used"]]
+
+
+def test_page_bounds():
+    store = ResultStore()
+    for i in range(5):
+        store.append({"url": f"https://example.com/{i}", "status": "success"})
+    assert [result["url"] for result in store.page(3, 10)] == ["https://example.com/3", "https://example.com/4"]
+    assert store.page(5) == []
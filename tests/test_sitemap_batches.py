@@ -0,0 +1,32 @@
+import os
+import time
+
+from google_indexer import GoogleInstantIndexer
+from quota import QuotaBucket
+
+
+def new_indexer(sitemap_dir):
+    return GoogleInstantIndexer(sitemap_dir=str(sitemap_dir), sitemap_base_url="https://me.example/sitemaps",
+                                google_quota=QuotaBucket(state_file=None))
+
+
+def test_each_plan_keeps_its_own_sitemap(tmp_path):
+    indexer = new_indexer(tmp_path)
+    first = indexer.plan_sitemap_batches(["https://a.com/p0", "https://a.com/p1"])
+    second = indexer.plan_sitemap_batches(["https://a.com/p2"])
+    assert first[0]["sitemap_url"] != second[0]["sitemap_url"]
+    with open(first[0]["sitemap_file"]) as f:
+        assert "https://a.com/p0" in f.read()
+
+
+def test_prune_only_deletes_old_batch_sitemaps(tmp_path):
+    indexer = new_indexer(tmp_path)
+    old, fresh = (batch["sitemap_file"] for plan in (["https://a.com/x"], ["https://b.com/y"])
+                  for batch in indexer.plan_sitemap_batches(plan))
+    own = tmp_path / "sitemap.xml"
+    own.write_text("<urlset/>")
+    long_ago = time.time() - 30 * 24 * 3600
+    for path in (old, own):
+        os.utime(path, (long_ago, long_ago))
+    assert indexer.prune_batch_sitemaps() == 1
+    assert sorted(os.listdir(tmp_path)) == sorted([os.path.basename(fresh), "sitemap.xml"])
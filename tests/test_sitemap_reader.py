@@ -0,0 +1,107 @@
+from google_indexer import GoogleInstantIndexer
+from job_manager import result_outcome
+from quota import QuotaBucket
+from sitemap_reader import SitemapState, iter_sitemap
+
+EXTENSION_SITEMAP = """<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
+        xmlns:image="http://www.google.com/schemas/sitemap-image/1.1"
+        xmlns:news="http://www.google.com/schemas/sitemap-news/0.9">
+  <url>
+    <loc>https://example.com/page</loc>
+    <lastmod>2024-01-01</lastmod>
+    <image:image>
+      <image:loc>https://cdn.example.com/photo.jpg</image:loc>
+    </image:image>
+  </url>
+  <url>
+    <loc>https://example.com/story</loc>
+    <news:news>
+      <news:publication_date>2024-02-02</news:publication_date>
+      <news:lastmod>2030-01-01</news:lastmod>
+    </news:news>
+  </url>
+</urlset>
+"""
+
+
+def test_extension_entries_do_not_replace_page_loc(tmp_path):
+    path = tmp_path / "sitemap.xml"
+    path.write_text(EXTENSION_SITEMAP)
+    assert list(iter_sitemap(str(path))) == [
+        ("https://example.com/page", "2024-01-01"),
+        ("https://example.com/story", None),
+    ]
+
+
+def test_sitemap_without_namespace(tmp_path):
+    path = tmp_path / "sitemap.xml"
+    path.write_text("<urlset><url><loc>https://example.com/a</loc></url></urlset>")
+    assert list(iter_sitemap(str(path))) == [("https://example.com/a", None)]
+
+
+def test_sitemap_index_is_followed(tmp_path):
+    (tmp_path / "child.xml").write_text(EXTENSION_SITEMAP)
+    index = tmp_path / "index.xml"
+    index.write_text('<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                     '<sitemap><loc>child.xml</loc></sitemap></sitemapindex>')
+    assert [loc for loc, _ in iter_sitemap(str(index))] == ["https://example.com/page", "https://example.com/story"]
+
+
+def test_state_diff_only_yields_new_or_changed():
+    state = SitemapState(":memory:")
+    entries = [("https://example.com/a", "1"), ("https://example.com/b", None)]
+    assert list(state.diff(entries)) == entries
+    for url, _ in entries:
+        state.save(url)
+    state.commit()
+    assert list(state.diff([("https://example.com/a", "2"), ("https://example.com/b", None)])) == [
+        ("https://example.com/a", "2")]
+    state.close()
+
+
+def test_unsaved_entries_are_yielded_again():
+    state = SitemapState(":memory:")
+    entries = [("https://example.com/a", "1"), ("https://example.com/b", "1")]
+    list(state.diff(entries))
+    state.save("https://example.com/a")
+    state.forget("https://example.com/b")
+    state.commit()
+    assert list(state.diff(entries)) == [("https://example.com/b", "1")]
+    state.close()
+
+
+class StubResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class StubTransport:
+    """Answers every ping with status_code"""
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def get(self, url, **kwargs):
+        return StubResponse(self.status_code)
+
+    def ensure_pool_size(self, size):
+        pass
+
+
+def test_index_sitemap_retries_urls_that_failed(tmp_path):
+    path = tmp_path / "sitemap.xml"
+    path.write_text(EXTENSION_SITEMAP)
+    state_path = str(tmp_path / "state.db")
+
+    def run(status_code):
+        indexer = GoogleInstantIndexer(transport=StubTransport(status_code), google_quota=QuotaBucket(state_file=None))
+        results = list(indexer.index_sitemap(str(path), state_path=state_path, max_workers=2))
+        return [result_outcome(result) for result in results], indexer.last_job_report["sitemap"]
+
+    outcomes, report = run(503)
+    assert outcomes == ["failed", "failed"] and report["saved"] == 0
+    outcomes, report = run(200)
+    assert outcomes == ["success", "success"] and report["new"] == 2
+    outcomes, report = run(200)
+    assert outcomes == [] and report["unchanged"] == 2
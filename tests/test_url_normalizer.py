@@ -0,0 +1,58 @@
+import pytest
+
+from url_normalizer import BloomFilter, InvalidURL, URLFilter, canonical_key, dedupe_urls, normalize_url
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTPS://Example.COM", "https://example.com/"),
+    ("https://example.com:443/a", "https://example.com/a"),
+    ("http://example.com:80/a", "http://example.com/a"),
+    ("https://example.com:8443/a", "https://example.com:8443/a"),
+    ("https://user:pw@example.com./a#top", "https://example.com/a"),
+    ("https://example.com/a?utm_source=x&id=7&gclid=abc", "https://example.com/a?id=7"),
+    ("https://example.com/a?b=2&a=1", "https://example.com/a?b=2&a=1"),
+    ("  https://[::1]:8080/x  ", "https://[::1]:8080/x"),
+])
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+@pytest.mark.parametrize("url", ["ftp://example.com/a", "example.com/a", "https:///a", "https://example.com:99999/"])
+def test_invalid_urls_are_rejected(url):
+    with pytest.raises(InvalidURL):
+        normalize_url(url)
+
+
+def test_trailing_slash_variants_share_a_key():
+    assert canonical_key("https://example.com/page/") == canonical_key("https://example.com/page")
+    assert canonical_key("https://example.com/") == "https://example.com/"
+    assert canonical_key("https://example.com/page/?q=1") == "https://example.com/page?q=1"
+
+
+def test_dedupe_keeps_the_first_variant_in_order():
+    unique, invalid = dedupe_urls([
+        "https://example.com/a/", "HTTPS://EXAMPLE.com/a?utm_medium=x", "mailto:me@example.com",
+        "https://example.com/b", "https://example.com/a#section",
+    ])
+    assert unique == ["https://example.com/a/", "https://example.com/b"]
+    assert [entry["url"] for entry in invalid] == ["mailto:me@example.com"]
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(10_000, error_rate=0.01)
+    # A unique item can look seen already (a false positive), never the reverse
+    wrongly_seen = sum(not bloom.add(f"https://example.com/{i}") for i in range(10_000))
+    assert wrongly_seen < 100
+    assert all(f"https://example.com/{i}" in bloom for i in range(10_000))
+    assert not bloom.add("https://example.com/0")
+    false_positives = sum(f"https://other.example/{i}" in bloom for i in range(10_000))
+    assert false_positives < 300
+
+
+def test_bloom_url_filter_counts_duplicates_across_calls():
+    url_filter = URLFilter(capacity=1000)
+    assert list(url_filter.filter(["https://example.com/a", "https://example.com/b"])) == [
+        "https://example.com/a", "https://example.com/b"]
+    assert list(url_filter.filter(["https://EXAMPLE.com/a/", "nope", "https://example.com/c"])) == [
+        "https://example.com/c"]
+    assert url_filter.report() == {"total": 5, "unique": 3, "duplicates": 1, "invalid": 1}
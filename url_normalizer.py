@@ -0,0 +1,182 @@
+"""
+URL normalization and deduplication for Google Instant Indexer
+Canonicalizes URLs before submission so variants of one page (uppercase
+hosts, default ports, fragments, tracking parameters, trailing slashes)
+cost one set of pings and one unit of quota instead of several
+"""
+
+import hashlib
+import math
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+ALLOWED_SCHEMES = ("http", "https")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Query parameters that only track the visit and never change the page
+TRACKING_PARAMS = {"gclid", "dclid", "fbclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+                   "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok", "oly_anon_id", "oly_enc_id"}
+TRACKING_PREFIXES = ("utm_",)
+
+
+class InvalidURL(ValueError):
+    pass
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalized form of url, the one that gets submitted
+    Lowercases scheme and host, drops default ports, fragments, userinfo
+    and tracking parameters, and gives an empty path "/"
+    Raises InvalidURL for non-http(s) schemes and URLs without a host
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError as e:
+        raise InvalidURL(f"invalid URL: {e}")
+    scheme = parts.scheme.lower()
+    if scheme not in ALLOWED_SCHEMES:
+        raise InvalidURL(f"invalid URL: scheme must be http or https, got {parts.scheme or 'none'!r}")
+    host = (parts.hostname or "").rstrip(".")
+    if not host:
+        raise InvalidURL("invalid URL: no host")
+
+    netloc = f"[{host}]" if ":" in host else host
+    if port is not None and port != DEFAULT_PORTS[scheme]:
+        netloc += f":{port}"
+
+    query = parts.query
+    if query:
+        params = parse_qsl(query, keep_blank_values=True)
+        kept = [(key, value) for key, value in params
+                if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)]
+        if len(kept) != len(params):
+            query = urlencode(kept)
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+def canonical_key(normalized_url: str) -> str:
+    """Dedupe key of a normalized URL: "/page/" and "/page" count as the same page"""
+    # Hot for streams, so string operations rather than a second urlsplit
+    base, separator, query = normalized_url.partition("?")
+    if base.endswith("/") and base.count("/") > 3:
+        base = base.rstrip("/")
+        if base.count("/") < 3:
+            base += "/"
+    return base + separator + query
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        """
+        Fixed-size set membership test with no false negatives
+
+        Args:
+            capacity: Items it is sized for; past that the false positive rate climbs
+            error_rate: Chance an unseen item is reported as seen, at capacity
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> List[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return [(first + i * second) % size for i in range(self.hashes)]
+
+    def add(self, item: str) -> bool:
+        """Add item; returns False if it was (probably) already present"""
+        bits = self._bits
+        added = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._bits)
+
+
+class URLFilter:
+    def __init__(self, capacity: Optional[int] = None, error_rate: float = 0.001):
+        """
+        Normalize URLs and drop duplicates, across any number of calls
+
+        Args:
+            capacity: None keeps an exact set of seen URLs. A number uses a
+                      BloomFilter sized for that many URLs instead, so memory is
+                      fixed however long the stream; a unique URL is then wrongly
+                      dropped as a duplicate with probability error_rate
+            error_rate: False positive rate of the BloomFilter
+        """
+        self._seen = set() if capacity is None else BloomFilter(capacity, error_rate)
+        self.total = 0
+        self.duplicates = 0
+        self.invalid = 0
+
+    def _first_seen(self, key: str) -> bool:
+        if isinstance(self._seen, set):
+            if key in self._seen:
+                return False
+            self._seen.add(key)
+            return True
+        return self._seen.add(key)
+
+    def check(self, url: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        (normalized URL, None) for a URL to submit, (None, None) for a
+        duplicate and (None, error) for an invalid URL
+        """
+        self.total += 1
+        try:
+            normalized = normalize_url(url)
+        except InvalidURL as e:
+            self.invalid += 1
+            return None, str(e)
+        if not self._first_seen(canonical_key(normalized)):
+            self.duplicates += 1
+            return None, None
+        return normalized, None
+
+    def filter(self, urls: Iterable[str]) -> Iterator[str]:
+        """Normalized URLs seen for the first time; invalid ones are dropped"""
+        for url in urls:
+            normalized, _ = self.check(url)
+            if normalized is not None:
+                yield normalized
+
+    def report(self) -> Dict:
+        return {"total": self.total, "unique": self.total - self.duplicates - self.invalid,
+                "duplicates": self.duplicates, "invalid": self.invalid}
+
+
+def dedupe_urls(urls: Iterable[str]) -> Tuple[List[str], List[Dict]]:
+    """
+    Normalized, unique URLs in input order (the first variant of a page wins)
+    Returns: (URLs to submit, [{"url", "error"} for each invalid URL])
+    """
+    url_filter = URLFilter()
+    unique = []
+    invalid = []
+    for url in urls:
+        normalized, error = url_filter.check(url)
+        if normalized is not None:
+            unique.append(normalized)
+        elif error is not None:
+            invalid.append({"url": url, "error": error})
+    return unique, invalid
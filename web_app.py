@@ -5,24 +5,56 @@ Access via browser for easy URL submission
 
 from flask import Flask, render_template, request, jsonify, send_file
 from google_indexer import GoogleInstantIndexer
-import json
+from job_manager import JobManager
+from job_queue import SQLiteJobQueue
+from result_sink import NDJSONResultSink
+from url_normalizer import dedupe_urls
 import os
-from datetime import datetime
-import threading
 
 app = Flask(__name__)
 
 # Global indexer instance
 indexer = None
-indexing_in_progress = False
-last_results = []
+
+def run_job_chunk(urls, on_result):
+    indexer.rapid_index_bulk(urls, max_workers=10, on_result=on_result)
+
+# Every result is appended to one rotating NDJSON file as it completes,
+# tagged with its job_id, instead of a new results file per job
+results_sink = NDJSONResultSink(
+    os.environ.get('INDEXER_RESULTS_FILE', 'results.ndjson'),
+    max_bytes=int(os.environ.get('INDEXER_RESULTS_MAX_BYTES', str(50 * 1024 * 1024))),
+    backup_count=5
+)
+
+# With INDEXER_QUEUE_DB set, jobs go to the shared SQLite queue and
+# worker.py processes run them; otherwise this process runs them itself
+if os.environ.get('INDEXER_QUEUE_DB'):
+    job_manager = SQLiteJobQueue(
+        os.environ['INDEXER_QUEUE_DB'],
+        batch_size=int(os.environ.get('INDEXER_JOB_CHUNK_SIZE', '500'))
+    )
+else:
+    job_manager = JobManager(
+        run_job_chunk,
+        workers=int(os.environ.get('INDEXER_JOB_WORKERS', '4')),
+        chunk_size=int(os.environ.get('INDEXER_JOB_CHUNK_SIZE', '500')),
+        sink=results_sink,
+        checkpoint_dir=os.environ.get('INDEXER_CHECKPOINT_DIR', 'checkpoints') or None
+    )
 
 def init_indexer(use_api=False, service_account_file=None):
     global indexer
+    # Batch sitemap pings need the public URL serving the sitemap directory
+    settings = {
+        'indexnow_key': os.environ.get('INDEXER_INDEXNOW_KEY') or None,
+        'sitemap_dir': os.environ.get('INDEXER_SITEMAP_DIR', 'sitemaps'),
+        'sitemap_base_url': os.environ.get('INDEXER_SITEMAP_BASE_URL') or None,
+    }
     if use_api and service_account_file and os.path.exists(service_account_file):
-        indexer = GoogleInstantIndexer(service_account_file=service_account_file)
+        indexer = GoogleInstantIndexer(service_account_file=service_account_file, **settings)
     else:
-        indexer = GoogleInstantIndexer()
+        indexer = GoogleInstantIndexer(**settings)
 
 # Initialize on startup
 init_indexer()
@@ -54,14 +86,6 @@ def config():
 
 @app.route('/api/index', methods=['POST'])
 def index_urls():
-    global indexing_in_progress, last_results
-    
-    if indexing_in_progress:
-        return jsonify({
-            'status': 'error',
-            'message': 'Indexing already in progress'
-        }), 400
-    
     data = request.json
     urls = data.get('urls', [])
     
@@ -75,58 +99,63 @@ def index_urls():
     if isinstance(urls, str):
         urls = [u.strip() for u in urls.split('\n') if u.strip()]
     
-    # Start indexing in background
-    def index_task():
-        global indexing_in_progress, last_results
-        indexing_in_progress = True
-        
-        try:
-            results = indexer.rapid_index_bulk(urls, max_workers=10)
-            last_results = results
-            
-            # Save to file
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"results_{timestamp}.json"
-            indexer.save_results(results, filename)
-            
-        except Exception as e:
-            last_results = [{'error': str(e)}]
-        finally:
-            indexing_in_progress = False
+    # Variants of one page (case, ports, fragments, tracking params) are submitted once
+    unique, invalid = dedupe_urls(urls)
+    if not unique:
+        return jsonify({
+            'status': 'error',
+            'message': f"No valid URLs provided ({invalid[0]['error']})"
+        }), 400
     
-    thread = threading.Thread(target=index_task)
-    thread.start()
+    job = job_manager.submit(unique)
     
     return jsonify({
         'status': 'success',
-        'message': f'Started indexing {len(urls)} URLs',
-        'url_count': len(urls)
+        'message': f'Queued {len(unique)} URLs for indexing',
+        'job_id': job.id,
+        'url_count': len(unique),
+        'duplicates': len(urls) - len(unique) - len(invalid),
+        'invalid': invalid[:100],
+        'invalid_count': len(invalid)
     })
 
-@app.route('/api/status')
-def status():
-    global indexing_in_progress, last_results
+def job_status(job):
+    summary = job.summary()
+    cursor = request.args.get('cursor', 0, type=int)
+    limit = min(request.args.get('limit', 500, type=int), 5000)
+    results, next_cursor = job.results_page(cursor, limit)
+    page = {'results': results, 'cursor': cursor, 'next_cursor': next_cursor}
+    if summary['in_progress']:
+        return dict(summary, status='queued' if job.status == 'queued' else 'indexing', **page)
+    return dict(summary, status=job.status, total=summary['processed'], **page)
+
+@app.route('/api/jobs')
+def list_jobs():
+    return jsonify({'jobs': [job.summary() for job in job_manager.jobs()]})
+
+@app.route('/api/jobs/<job_id>', methods=['GET', 'DELETE'])
+def job_detail(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
     
-    if indexing_in_progress:
-        return jsonify({
-            'status': 'indexing',
-            'in_progress': True
-        })
+    if request.method == 'DELETE':
+        return jsonify(job_manager.cancel(job_id).summary())
     
-    if last_results:
-        successful = sum(1 for r in last_results 
-                        if r.get('status') == 'success' or 
-                        any(m.get('status') == 'success' 
-                            for m in r.get('methods_used', [])))
-        
-        return jsonify({
-            'status': 'complete',
-            'in_progress': False,
-            'total': len(last_results),
-            'successful': successful,
-            'failed': len(last_results) - successful,
-            'results': last_results
-        })
+    return jsonify(job_status(job))
+
+@app.route('/api/jobs/<job_id>/resume', methods=['POST'])
+def resume_job(job_id):
+    job = job_manager.resume(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'No job or checkpoint with that id'}), 404
+    return jsonify(job.summary())
+
+@app.route('/api/status')
+def status():
+    job = job_manager.latest()
+    if job is not None:
+        return jsonify(job_status(job))
     
     return jsonify({
         'status': 'idle',
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Queue workers for Google Instant Indexer
+Pull single-host URL batches from the shared SQLite job queue and write the
+results back, so indexing scales across every core on the box while the
+HTTP servers (started with INDEXER_QUEUE_DB) only enqueue jobs
+
+    python worker.py --queue indexer_queue.db --processes 4
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from typing import Dict, List, Optional
+
+from google_indexer import GoogleInstantIndexer
+from job_queue import SQLiteJobQueue
+from submission_ledger import SubmissionLedger
+
+# Results are written back in groups: every this many, or this many seconds
+RESULT_FLUSH_EVERY = 100
+RESULT_FLUSH_SECONDS = 2.0
+
+
+class LeaseLost(Exception):
+    pass
+
+
+class QueueWorker:
+    def __init__(self, queue_path: str, concurrency: int = 200, poll_interval: float = 1.0,
+                 ledger_path: Optional[str] = None, indexnow_key: Optional[str] = None,
+                 endpoints: Optional[Dict] = None, sitemap_dir: str = "sitemaps",
+                 sitemap_base_url: Optional[str] = None):
+        """
+        One worker process
+
+        Args:
+            queue_path: SQLite job queue shared with the HTTP servers
+            concurrency: URLs in flight per batch (async engine)
+            poll_interval: Seconds to wait when the queue is empty
+            ledger_path: Submission ledger shared by all workers (skips fresh URLs)
+            indexnow_key: IndexNow API key for every job
+            endpoints: Overrides for the indexer's DEFAULT_ENDPOINTS
+            sitemap_dir: Where batch sitemaps are written
+            sitemap_base_url: Public URL serving sitemap_dir (none: per-URL pings)
+        """
+        self.queue = SQLiteJobQueue(queue_path)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.ledger = SubmissionLedger(ledger_path) if ledger_path else None
+        self.indexnow_key = indexnow_key
+        self.endpoints = endpoints
+        self.sitemap_dir = sitemap_dir
+        self.sitemap_base_url = sitemap_base_url
+        self._indexers: Dict[Optional[str], GoogleInstantIndexer] = {}
+        self._stopping = False
+
+    def indexer_for(self, options: Dict) -> GoogleInstantIndexer:
+        """Indexer for a job's options, one per service account file, reused across batches"""
+        service_account_file = options.get("service_account_file")
+        indexer = self._indexers.get(service_account_file)
+        if indexer is None:
+            indexer = GoogleInstantIndexer(service_account_file=service_account_file,
+                                           indexnow_key=self.indexnow_key, ledger=self.ledger,
+                                           endpoints=self.endpoints, sitemap_dir=self.sitemap_dir,
+                                           sitemap_base_url=self.sitemap_base_url)
+            self._indexers[service_account_file] = indexer
+        return indexer
+
+    def stop(self, *_):
+        """Finish the batch in hand, then exit"""
+        self._stopping = True
+
+    def run_batch(self, batch_id: int, options: Dict, urls: List[str]):
+        pending: List[Dict] = []
+        reported = set()
+        last_flush = time.time()
+        # on_result runs on the indexing event loop, so results are written by
+        # one thread of their own (in order): waiting on the queue's write lock
+        # never stalls the requests in flight
+        writer = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="results")
+        writes: List[concurrent.futures.Future] = []
+
+        def record(results: List[Dict], done: bool = False):
+            if not self.queue.record(batch_id, self.owner, results, done=done):
+                raise LeaseLost(f"batch {batch_id} was taken over by another worker")
+
+        def flush():
+            nonlocal last_flush
+            writes.append(writer.submit(record, list(pending)))
+            pending.clear()
+            last_flush = time.time()
+
+        def on_result(result):
+            # A finished write that lost the lease stops the batch
+            while writes and writes[0].done():
+                writes.pop(0).result()
+            reported.add(result.get("url"))
+            pending.append(result)
+            if len(pending) >= RESULT_FLUSH_EVERY or time.time() - last_flush >= RESULT_FLUSH_SECONDS:
+                flush()
+
+        try:
+            try:
+                if urls:
+                    indexer = self.indexer_for(options)
+                    asyncio.run(indexer.rapid_index_bulk_async(urls, max_concurrency=self.concurrency,
+                                                               on_result=on_result, keep_results=False))
+            except LeaseLost:
+                raise
+            except Exception as e:
+                print(f"✗ Batch {batch_id} failed: {e}")
+                pending.extend({"url": url, "status": "failed", "error": str(e)}
+                               for url in urls if url not in reported)
+            for write in writes:
+                write.result()
+            record(pending, done=True)
+        finally:
+            writer.shutdown()
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        print(f"Worker {self.owner} polling {self.queue.path}")
+        while not self._stopping:
+            leased = self.queue.lease(self.owner)
+            if leased is None:
+                time.sleep(self.poll_interval)
+                continue
+            batch_id, job_id, options, urls = leased
+            print(f"Worker {self.owner}: job {job_id}, batch {batch_id} ({len(urls)} URLs)")
+            try:
+                self.run_batch(batch_id, options, urls)
+            except LeaseLost as e:
+                print(f"✗ {e}")
+        print(f"Worker {self.owner} stopped")
+
+
+def run_worker(queue_path: str, concurrency: int, poll_interval: float,
+               ledger_path: Optional[str], indexnow_key: Optional[str], endpoints: Optional[Dict],
+               sitemap_dir: str, sitemap_base_url: Optional[str]):
+    QueueWorker(queue_path, concurrency=concurrency, poll_interval=poll_interval, ledger_path=ledger_path,
+                indexnow_key=indexnow_key, endpoints=endpoints, sitemap_dir=sitemap_dir,
+                sitemap_base_url=sitemap_base_url).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index URLs from the shared job queue")
+    parser.add_argument("--queue", default=os.environ.get("INDEXER_QUEUE_DB", "indexer_queue.db"),
+                        help="SQLite job queue (the HTTP servers' INDEXER_QUEUE_DB)")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: one per core)")
+    parser.add_argument("--concurrency", type=int, default=200, help="URLs in flight per process")
+    parser.add_argument("--poll-interval", type=float, default=1.0,
+                        help="Seconds between polls of an empty queue")
+    parser.add_argument("--ledger", default=None, help="Submission ledger shared by all workers")
+    parser.add_argument("--indexnow-key", default=os.environ.get("INDEXER_INDEXNOW_KEY") or None,
+                        help="IndexNow API key (the servers' INDEXER_INDEXNOW_KEY)")
+    parser.add_argument("--sitemap-dir", default=os.environ.get("INDEXER_SITEMAP_DIR", "sitemaps"),
+                        help="Where batch sitemaps are written")
+    parser.add_argument("--sitemap-base-url", default=os.environ.get("INDEXER_SITEMAP_BASE_URL") or None,
+                        help="Public URL serving --sitemap-dir; enables batch sitemap pings")
+    args = parser.parse_args()
+    endpoints = json.loads(os.environ["INDEXER_ENDPOINTS"]) if os.environ.get("INDEXER_ENDPOINTS") else None
+
+    # Create the schema once before the processes race to open it
+    SQLiteJobQueue(args.queue).shutdown()
+    processes = [
+        multiprocessing.Process(
+            target=run_worker, name=f"indexer-worker-{i + 1}",
+            args=(args.queue, args.concurrency, args.poll_interval, args.ledger, args.indexnow_key, endpoints,
+                  args.sitemap_dir, args.sitemap_base_url)
+        )
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    def stop(*_):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    # Workers stop after their current batch; Ctrl+C reaches them directly
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()